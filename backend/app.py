@@ -1,29 +1,54 @@
 # backend/app.py
 import os
-import uuid
 import json
+import time
+import asyncio
 import logging
+import threading
+import contextlib
 from typing import Optional, List
 from urllib.parse import urlparse
-import requests
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body, Request
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from tenacity import retry, stop_after_attempt, wait_fixed
 from core.config import settings
-from core.security import is_blocked_domain, safe_exec_plugin
-from core.utils import run_spectral
-from tools.api_scanner import run_api_scanner
-from tools.kiterunner import run_kiterunner
-from tools.zap import run_zap_scan
-from tools.postman import generate_postman_collection
-from tools.newman import run_newman
+from core import metrics
+from core.dns import resolver
+from core.ingest import Spec, SpecError, read_upload
+from core.fetch import spec_fetcher
+from core.pipeline import run_analysis
+from core.jobs import job_queue
+from core.store import scan_store
+from core.ratelimit import rate_limiter
+from core.plugins import plugin_registry
+from core.plugin_pool import plugin_pool
+from core.zap_pool import zap_pool
+from core.scheduler import scheduler, Overloaded
+from core.batch import read_archive, check_items, aggregate, to_sarif
+from core.utils import spectral_cache
+from core.incremental import incremental_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="VTB API Analyzer Pro", version="2.1")
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    plugin_pool.start()
+    # ZAP-демоны не запускаем здесь: пул поднимается первым динамическим сканом
+    job_queue.start()
+    loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    try:
+        yield
+    finally:
+        loop_monitor.cancel()
+        job_queue.stop()
+        plugin_pool.stop()
+        zap_pool.stop()
+        spec_fetcher.stop()
+
+app = FastAPI(title="VTB API Analyzer Pro", version="2.1", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,28 +58,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-PLUGINS_DIR = "/tmp/plugins"
+PLUGINS_DIR = settings.plugins_dir
 os.makedirs(PLUGINS_DIR, exist_ok=True)
 
-# Rate limiting
-REQUESTS_PER_IP = {}
-
 class AnalyzeRequest(BaseModel):
     url: Optional[str] = None
     dynamic_scan: bool = False
     plugins: List[str] = []
     ai: bool = False
+    deep: bool = False  # полный Spectral вместо встроенных правил
+    # Перепроверять только изменившиеся с прошлого скана части (статика; плагины — заново при любой правке спеки).
+    # Прошлый скан ищется по target_url, иначе по info.title + servers; без них флаг игнорируется
+    incremental: bool = False
+    timings: bool = False  # добавить в ответ блок timings (время и CPU/RSS стадий, время плагинов)
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def _admit():
+    # Под нехваткой памяти новые сканы не берём — клиент повторит позже
+    try:
+        scheduler.admit()
+    except Overloaded as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "30"})
 
 @app.middleware("http")
-async def rate_limiter(request: Request, call_next):
-    client_ip = request.client.host
-    now = __import__("time").time()
-    if client_ip not in REQUESTS_PER_IP:
-        REQUESTS_PER_IP[client_ip] = []
-    REQUESTS_PER_IP[client_ip] = [t for t in REQUESTS_PER_IP[client_ip] if now - t < 60]
-    if len(REQUESTS_PER_IP[client_ip]) > 10:
-        raise HTTPException(429, "Too many requests")
-    REQUESTS_PER_IP[client_ip].append(now)
+async def rate_limiter_middleware(request: Request, call_next):
+    client_ip = _client_ip(request)
+    # Транзакция SQLite может ждать блокировку другого процесса — не на event loop
+    allowed, retry_after = await run_in_threadpool(rate_limiter.check, client_ip, request.method, request.url.path)
+    if not allowed:
+        return JSONResponse(
+            {"detail": "Too many requests"},
+            status_code=429,
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
     return await call_next(request)
 
 # НОВОЕ: Управление плагинами
@@ -78,6 +116,7 @@ async def create_plugin(plugin_file: UploadFile = File(...)):
     path = os.path.join(PLUGINS_DIR, plugin_file.filename)
     with open(path, "wb") as f:
         f.write(await plugin_file.read())
+    plugin_registry.invalidate(plugin_file.filename[:-3])
     return {"status": "ok", "name": plugin_file.filename[:-3]}
 
 @app.put("/api/plugins/{name}")
@@ -87,6 +126,7 @@ async def update_plugin(name: str, plugin_file: UploadFile = File(...)):
         raise HTTPException(404, "Plugin not found")
     with open(path, "wb") as f:
         f.write(await plugin_file.read())
+    plugin_registry.invalidate(name)
     return {"status": "ok"}
 
 @app.delete("/api/plugins/{name}")
@@ -95,168 +135,344 @@ def delete_plugin(name: str):
     if not os.path.exists(path):
         raise HTTPException(404, "Plugin not found")
     os.unlink(path)
+    plugin_registry.invalidate(name)
     return {"status": "ok"}
 
+async def _read_spec_input(
+    request: Optional[AnalyzeRequest],
+    openapi_file: Optional[UploadFile],
+    plugins: List[str]
+):
+    # Общий разбор входа для /api/analyze-api и /api/jobs.
+    # Загрузка читается с лимитом размера и разбирается один раз.
+    spec = None
+    target_url = None
+    options = {"dynamic_scan": False, "selected_plugins": plugins, "deep": False, "incremental": False}  # fallback
+
+    if request:
+        target_url = request.url
+        options["dynamic_scan"] = request.dynamic_scan
+        options["selected_plugins"] = request.plugins or plugins
+        options["deep"] = request.deep
+        options["incremental"] = request.incremental
+        options["timings"] = request.timings
+
+    if openapi_file:
+        contents = await read_upload(openapi_file)
+        spec = await run_in_threadpool(Spec.parse, contents, openapi_file.filename)
+    elif not target_url:
+        raise HTTPException(400, "No spec")
+    return spec, target_url, options
+
 @app.post("/api/analyze-api")
-@retry(stop=stop_after_attempt(2), wait=wait_fixed(2))
 async def analyze_api(
+    http_request: Request,
     request: Optional[AnalyzeRequest] = Body(None),
     openapi_file: Optional[UploadFile] = File(None),
     plugins: List[str] = Form([])  # Для совместимости, но используем request.plugins
 ):
-    spec_data = None
-    target_url = None
-    spec_path = None
-    ai = False
-    dynamic_scan = False
-    selected_plugins = plugins  # fallback
-
+    _admit()
     try:
-        if request:
-            target_url = request.url
-            dynamic_scan = request.dynamic_scan
-            ai = request.ai
-            selected_plugins = request.plugins or plugins
-
-        if openapi_file:
-            contents = await openapi_file.read()
-            if openapi_file.filename.endswith(('.yaml', '.yml')):
-                import yaml
-                spec_data = yaml.safe_load(contents)
-            else:
-                spec_data = json.loads(contents)
-            spec_path = f"/tmp/spec_{uuid.uuid4().hex}.json"
-            with open(spec_path, "w") as f:
-                json.dump(spec_data, f)
-        elif target_url:
-            if is_blocked_domain(urlparse(target_url).hostname):
-                raise HTTPException(403, "Blocked domain")
-            r = requests.get(target_url, timeout=10)
-            if r.status_code != 200:
-                raise HTTPException(400, "Invalid spec URL")
-            try:
-                spec_data = r.json()
-            except:
-                import yaml
-                spec_data = yaml.safe_load(r.text)
-            spec_path = f"/tmp/spec_{uuid.uuid4().hex}.json"
-            with open(spec_path, "w") as f:
-                json.dump(spec_data, f)
-        else:
-            raise HTTPException(400, "No spec")
-
-        all_issues = []
-        dynamic_issues = []
-        ai_insights = []
-
-        # Spectral
-        spectral_res = run_spectral(spec_path)
-        all_issues.extend([{
-            "code": i.get("code", "SPECTRAL"),
-            "message": i.get("message", "")[:200],
-            "severity": i.get("severity", 1),
-            "path": ".".join(map(str, i.get("path", []))),
-            "range": i.get("range")
-        } for i in spectral_res if isinstance(i, dict)])
-
-        # Плагины
-        for plugin in selected_plugins:
-            path = os.path.join(PLUGINS_DIR, f"{plugin}.py")
-            if os.path.exists(path):
-                plugin_res = safe_exec_plugin(path, json.dumps(spec_data), plugin)
-                all_issues.extend(plugin_res)
-
-        # AI анализ (Grok) — ПОЛНОСТЬЮ ОТКЛЮЧЁН
-        # if ai and settings.xai_api_key:
-        #     try:
-        #         prompt = f"Анализируй OpenAPI spec на уязвимости по OWASP API Top 10: BOLA, IDOR, injections, auth, rate limits, data exposure. Верни JSON список: [{{'code': 'AI_OWASP', 'severity': 'high', 'message': 'desc'}}]"
-        #         res = requests.post(
-        #             "https://api.x.ai/v1/chat/completions",
-        #             headers={"Authorization": f"Bearer {settings.xai_api_key}"},
-        #             json={
-        #                 "model": "grok-beta",
-        #                 "messages": [{"role": "user", "content": prompt + "\n\n" + json.dumps(spec_data, indent=2)[:4000]}]
-        #             },
-        #             timeout=30
-        #         )
-        #         if res.status_code == 200:
-        #             content = res.json()["choices"][0]["message"]["content"]
-        #             try:
-        #                 ai_insights = json.loads(content)
-        #             except:
-        #                 ai_insights = [{"code": "AI_PARSE_ERR", "message": content[:500], "severity": "info"}]
-        #         else:
-        #             ai_insights = [{"code": "AI_ERROR", "message": f"HTTP {res.status_code}", "severity": "high"}]
-        #     except Exception as e:
-        #         ai_insights = [{"code": "AI_ERROR", "message": str(e), "severity": "high"}]
-        # else:
-        #     ai_insights = [{"code": "AI_DISABLED", "message": "Grok AI отключён в коде", "severity": "info"}]
-
-        # Динамический скан
-        if dynamic_scan and target_url:
-            # api_scanner
-            scanner_res = run_api_scanner(target_url)
-            dynamic_issues.extend(scanner_res.get("issues", []))
-
-            # Kiterunner
-            kite_res = run_kiterunner(target_url)
-            dynamic_issues.extend(kite_res)
-
-            # ZAP
-            zap_res = run_zap_scan(target_url)
-            dynamic_issues.extend(zap_res)
-
-            # Newman на найденных путях
-            endpoints = []
-            for i in dynamic_issues:
-                if i.get("code") == "KITE_FOUND":
-                    path = i["message"].split(": ", 1)[1] if ": " in i["message"] else ""
-                    if ".." not in path and not path.startswith("/etc") and not path.startswith("/proc"):
-                        endpoints.append(urlparse(target_url).scheme + "://" + urlparse(target_url).netloc + path)
-            if endpoints:
-                coll_path = f"/tmp/coll_{uuid.uuid4().hex}.json"
-                with open(coll_path, "w") as f:
-                    json.dump(generate_postman_collection(endpoints), f)
-                newman_res = run_newman(coll_path)
-                os.unlink(coll_path)
-                for fail in newman_res.get("failures", []):
-                    dynamic_issues.append({
-                        "code": "NEWMAN_FAIL",
-                        "message": fail.get("error", {}).get("message", "Test failed")[:200],
-                        "severity": "high"
-                    })
-
-            all_issues.extend(dynamic_issues)
-
-        counts = {"critical": 0, "high": 0, "medium": 0, "low": 0, "info": 0}
-        for i in all_issues:
-            sev = i.get("severity", "info").lower()
-            if sev in counts:
-                counts[sev] += 1
-
-        return {
-            "id": uuid.uuid4().hex,
-            "total": len(all_issues),
-            "truncated": len(all_issues) > 50,
-            "issues": all_issues[:50],
-            "dynamic_issues": dynamic_issues,
-            "ai_insights": [{"code": "AI_DISABLED", "message": "Grok AI отключён в коде", "severity": "info"}],
-            "summary": counts,
-            "plugins_used": selected_plugins + ["Spectral", "Kiterunner", "api_scanner", "ZAP", "Newman"]
-        }
+        spec, target_url, options = await _read_spec_input(request, openapi_file, plugins)
+        options["client"] = _client_ip(http_request)
+        if spec is None:
+            spec = await spec_fetcher.fetch(target_url)
+
+        # Пайплайн блокирующий (subprocess/requests) — уводим его с event loop
+        return await run_in_threadpool(lambda: run_analysis(spec, target_url, **options))
 
     except HTTPException:
         raise
+    except SpecError as e:
+        raise HTTPException(e.status, e.detail)
     except Exception as e:
         logger.error(f"Analyze error: {e}")
         raise HTTPException(500, "Server error")
-    finally:
-        if spec_path and os.path.exists(spec_path):
-            try:
-                os.unlink(spec_path)
-            except:
-                pass
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Стриминг: находки и прогресс стадий приходят по мере готовности (text/event-stream).
+# События: stage, issues, result (итог без списков — находки уже ушли в issues), error.
+@app.post("/api/analyze-api/stream")
+async def analyze_api_stream(
+    http_request: Request,
+    request: Optional[AnalyzeRequest] = Body(None),
+    openapi_file: Optional[UploadFile] = File(None),
+    plugins: List[str] = Form([])
+):
+    _admit()
+    try:
+        spec, target_url, options = await _read_spec_input(request, openapi_file, plugins)
+        options["client"] = _client_ip(http_request)
+        if spec is None:
+            spec = await spec_fetcher.fetch(target_url)
+    except HTTPException:
+        raise
+    except SpecError as e:
+        raise HTTPException(e.status, e.detail)
+    except Exception as e:
+        logger.error(f"Analyze stream error: {e}")
+        raise HTTPException(400, "Invalid spec")
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancel = threading.Event()
+    started = time.monotonic()
+
+    def emit(event: str, data):
+        # Вызывается из потоков стадий — передаём в event loop
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def analyze():
+        try:
+            result = run_analysis(spec, target_url, emit=emit, cancel=cancel, **options)
+            result.pop("issues")
+            result["truncated"] = False
+            result["elapsed"] = round(time.monotonic() - started, 3)
+            emit("result", result)
+        except Exception as e:
+            logger.error(f"Analyze stream error: {e}")
+            emit("error", {"detail": "Server error"})
+        finally:
+            emit(None, None)
+
+    async def stream():
+        loop.run_in_executor(None, analyze)
+        try:
+            yield _sse("stage", {"stage": "scan", "status": "started"})
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Комментарий-heartbeat: держит соединение через nginx, пока долгие стадии молчат
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield _sse(event, data)
+        finally:
+            # Клиент отключился — останавливаем стадии и их дочерние процессы
+            cancel.set()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Очередь задач: POST сразу возвращает job_id, результат забирается через GET
+@app.post("/api/jobs", status_code=202)
+async def submit_job(
+    http_request: Request,
+    request: Optional[AnalyzeRequest] = Body(None),
+    openapi_file: Optional[UploadFile] = File(None),
+    plugins: List[str] = Form([])
+):
+    _admit()
+    try:
+        spec, target_url, options = await _read_spec_input(request, openapi_file, plugins)
+        # Попадает в options задачи — воркер очереди передаст его в run_analysis
+        options["client"] = _client_ip(http_request)
+    except HTTPException:
+        raise
+    except SpecError as e:
+        raise HTTPException(e.status, e.detail)
+    except Exception as e:
+        logger.error(f"Job submit error: {e}")
+        raise HTTPException(400, "Invalid spec")
+    if spec is None and await resolver.is_blocked(urlparse(target_url).hostname):
+        raise HTTPException(403, "Blocked domain")
+    job_id = await run_in_threadpool(job_queue.submit, spec, target_url, options)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    job.pop("result")
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(500, job["error"] or "Job failed")
+    if job["status"] != "done":
+        raise HTTPException(409, f"Job is {job['status']}")
+    return job["result"]
+
+# Пакетный анализ: архив (zip/tar.gz) или несколько файлов — по задаче в общей очереди на спеку.
+# Динамический скан в пакете не запускается: у спек нет своих целевых URL.
+@app.post("/api/batch", status_code=202)
+async def submit_batch(
+    http_request: Request,
+    archive: Optional[UploadFile] = File(None),
+    files: List[UploadFile] = File([]),
+    plugins: List[str] = Form([]),
+    deep: bool = Form(False),
+    incremental: bool = Form(False)
+):
+    _admit()
+    try:
+        if archive is not None:
+            data = await read_upload(archive, settings.max_batch_bytes)
+            items = await run_in_threadpool(read_archive, data, archive.filename)
+        elif files:
+            items = [(f.filename or f"spec{n}", await read_upload(f)) for n, f in enumerate(files)]
+            check_items(items)
+        else:
+            raise HTTPException(400, "No specs")
+    except SpecError as e:
+        raise HTTPException(e.status, e.detail)
+    options = {
+        "dynamic_scan": False, "selected_plugins": plugins, "deep": deep, "incremental": incremental,
+        "client": _client_ip(http_request)
+    }
+    batch_id = await run_in_threadpool(job_queue.submit_batch, items, options)
+    return {"batch_id": batch_id, "specs": len(items), "status": "queued"}
+
+def _batch_entries(batch_id: str) -> List[dict]:
+    jobs = job_queue.batch(batch_id)
+    if not jobs:
+        raise HTTPException(404, "Batch not found")
+    return jobs
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    report = await run_in_threadpool(lambda: aggregate(_batch_entries(batch_id)))
+    report["batch_id"] = batch_id
+    report["status"] = "running" if report["specs_pending"] else "done"
+    return report
+
+@app.get("/api/batch/{batch_id}/sarif")
+async def get_batch_sarif(batch_id: str):
+    # Только завершённые спеки, находки — полные, из истории сканов
+    def build():
+        jobs = _batch_entries(batch_id)
+        return to_sarif([
+            (job["name"], scan_store.all_issues(job["id"])) for job in jobs if job["status"] == "done"
+        ])
+    return JSONResponse(await run_in_threadpool(build), media_type="application/sarif+json")
+
+# История сканов: полный список находок с фильтрами и курсорной пагинацией
+@app.get("/api/scans")
+async def list_scans(
+    spec_hash: Optional[str] = None,
+    target_url: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = None
+):
+    return await run_in_threadpool(scan_store.list_scans, spec_hash, target_url, limit, cursor)
+
+@app.get("/api/scans/{scan_id}")
+async def get_scan(scan_id: str):
+    scan = await run_in_threadpool(scan_store.get_scan, scan_id)
+    if scan is None:
+        raise HTTPException(404, "Scan not found")
+    return scan
+
+@app.get("/api/scans/{scan_id}/sarif")
+async def get_scan_sarif(scan_id: str):
+    scan = await run_in_threadpool(scan_store.get_scan, scan_id)
+    if scan is None:
+        raise HTTPException(404, "Scan not found")
+    issues = await run_in_threadpool(scan_store.all_issues, scan_id)
+    return JSONResponse(to_sarif([(scan.get("target_url") or scan_id, issues)]), media_type="application/sarif+json")
+
+@app.get("/api/scans/{scan_id}/issues")
+async def list_scan_issues(
+    scan_id: str,
+    severity: Optional[List[str]] = Query(None),
+    code: Optional[str] = None,
+    path: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = None
+):
+    if await run_in_threadpool(scan_store.get_scan, scan_id) is None:
+        raise HTTPException(404, "Scan not found")
+    return await run_in_threadpool(
+        lambda: scan_store.issues(scan_id, severity, code, path, source, limit=limit, cursor=cursor)
+    )
+
+@app.get("/api/scans/{scan_id}/summary")
+async def scan_summary(
+    scan_id: str,
+    group_by: str = "severity",
+    severity: Optional[List[str]] = Query(None),
+    code: Optional[str] = None,
+    path: Optional[str] = None,
+    source: Optional[str] = None
+):
+    if await run_in_threadpool(scan_store.get_scan, scan_id) is None:
+        raise HTTPException(404, "Scan not found")
+    try:
+        counts = await run_in_threadpool(
+            lambda: scan_store.summary(scan_id, group_by, severity, code, path, source)
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"scan_id": scan_id, "group_by": group_by, "counts": counts}
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "service": "VTB API Analyzer Pro v2.1"}
\ No newline at end of file
+    return {"status": "ok", "service": "VTB API Analyzer Pro v2.1"}
+
+# Метрики, которые считываются в момент скрейпа: кэши, очереди, пулы
+@metrics.gauge("vtb_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"), type="counter")
+def _cache_metrics():
+    values = {}
+    for name, cache in (("spectral", spectral_cache), ("incremental", incremental_cache), ("dns", resolver)):
+        values[(name, "hit")] = cache.hits
+        values[(name, "miss")] = cache.misses
+    return values
+
+@metrics.gauge("vtb_spec_fetch_total", "Remote spec fetches by result", ("result",), type="counter")
+def _fetch_metrics():
+    return {
+        ("fetched",): spec_fetcher.fetched,
+        ("not_modified",): spec_fetcher.not_modified,
+        ("shared",): spec_fetcher.shared
+    }
+
+@metrics.gauge("vtb_jobs", "Jobs in the persistent queue", ("status",))
+def _job_metrics():
+    return {(status,): n for status, n in job_queue.counts().items()}
+
+@metrics.gauge("vtb_tool_slots", "Scheduler slots of heavy tools", ("tool", "state"))
+def _scheduler_metrics():
+    snap = scheduler.snapshot()
+    values = {}
+    for tool, n in snap["running"].items():
+        values[(tool, "running")] = n
+        values[(tool, "queued")] = snap["queued"][tool]
+    return values
+
+@metrics.gauge("vtb_scans_rejected_total", "Scans rejected with 503 under memory pressure", type="counter")
+def _rejected_metrics():
+    return scheduler.rejected
+
+@metrics.gauge("vtb_available_memory_bytes", "Available memory as seen by the scheduler")
+def _memory_metrics():
+    return scheduler.snapshot()["available_memory"]
+
+@metrics.gauge("vtb_pool_workers", "Plugin and ZAP pool processes", ("pool", "state"))
+def _pool_metrics():
+    plugins, zap = plugin_pool.snapshot(), zap_pool.snapshot()
+    return {
+        ("plugin", "total"): plugins["workers"], ("plugin", "idle"): plugins["idle"],
+        ("zap", "total"): zap["daemons"], ("zap", "idle"): zap["idle"]
+    }
+
+@metrics.gauge("vtb_zap_recycled_total", "ZAP daemons restarted (crash, memory growth, scan limit)", type="counter")
+def _zap_metrics():
+    return zap_pool.recycled
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Текстовый формат Prometheus 0.0.4; лимитом запросов не ограничен
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
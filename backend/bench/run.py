@@ -0,0 +1,498 @@
+# backend/bench/run.py
+# Воспроизводимый бенчмарк пайплайна анализа. Запуск из backend/:
+#   python -m bench.run --sizes 10,100,1000,10000 --concurrency 1,4 --out bench-results.json
+#   python -m bench.run --scenarios analyze_api:static --baseline old.json
+# Всё локально: бэкенд (uvicorn в потоке), цель (bench/target.py) и заглушки spectral,
+# kiterunner, zap.sh, newman (bench/stubs/) с задаваемой задержкой. Результат — JSON,
+# результаты разных релизов сравниваются через --baseline.
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import platform
+import resource
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from bench.specs import spec_bytes, with_run
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# analyze_api — загрузка спеки в POST /api/analyze-api по HTTP (настройки по умолчанию);
+# pipeline:<режим> — тот же run_analysis, что вызывает эндпоинт, с блоком timings по стадиям
+SCENARIOS = ("analyze_api", "pipeline:static", "pipeline:deep", "pipeline:dynamic", "plugins", "api_scanner")
+# Задержки заглушек по умолчанию, секунды; _OP/_ITEM — на операцию спеки / запрос коллекции
+LATENCY = {
+    "SPECTRAL": 0.2, "SPECTRAL_OP": 0.00005, "KITERUNNER": 1.0, "NEWMAN": 0.3, "NEWMAN_ITEM": 0.01,
+    "ZAP": 1.0, "TARGET": 0.005,
+}
+
+# Плагины для сценария plugins: обход операций, схем и графа $ref.
+# В песочнице нет builtins — только циклы, методы dict и json.
+PLUGINS = {
+    "bench_no_auth": '''
+def analyze(spec):
+    issues = []
+    for path, item in spec["paths"].items():
+        for method, op in item.items():
+            security = op.get("security")
+            if security is not None and not security:
+                issues.append({"code": "BENCH_NO_AUTH", "message": method + " " + path, "severity": "medium", "path": path})
+    return issues
+''',
+    "bench_string_limits": '''
+def analyze(spec):
+    issues = []
+    for name, schema in spec["components"]["schemas"].items():
+        for prop, value in schema.get("properties", {}).items():
+            if value.get("type") == "string" and "maxLength" not in value and "format" not in value:
+                issues.append({"code": "BENCH_STRING", "message": name + "." + prop, "severity": "low"})
+    return issues
+''',
+    "bench_ref_depth": '''
+def analyze(spec):
+    schemas = spec["components"]["schemas"]
+
+    def depth(name, seen):
+        best = 0
+        for prop in schemas[name].get("properties", {}).values():
+            ref = prop.get("$ref")
+            if ref is None:
+                ref = prop.get("items", {}).get("$ref")
+            if ref is not None and ref not in seen:
+                d = depth(ref[21:], seen + [ref]) + 1
+                if d > best:
+                    best = d
+        return best
+
+    issues = []
+    for name in schemas:
+        if depth(name, []) >= 3:
+            issues.append({"code": "BENCH_DEEP_REF", "message": name, "severity": "info"})
+    return issues
+''',
+}
+
+
+def _free_port() -> int:
+    with contextlib.closing(socket.socket()) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_env(workdir: str, latency: Dict[str, float]):
+    # До импорта core: настройки читаются из окружения один раз (core/config.py).
+    # Заданные снаружи переменные не перетираются — так можно мерить любые настройки.
+    os.environ["PATH"] = os.path.join(BENCH_DIR, "stubs") + os.pathsep + os.environ.get("PATH", "")
+    for key, value in latency.items():
+        os.environ[f"BENCH_LATENCY_{key}"] = str(value)
+    defaults = {
+        "PLUGINS_DIR": os.path.join(workdir, "plugins"),
+        "JOBS_DB": os.path.join(workdir, "jobs.db"),
+        "SCANS_DB": os.path.join(workdir, "scans.db"),
+        "RATELIMIT_DB": os.path.join(workdir, "ratelimit.db"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "ZAP_HOME_DIR": os.path.join(workdir, "zap"),
+        "ZAP_BASE_PORT": str(_free_port()),
+        # Нагрузку даёт сам бенчмарк: лимиты запросов и отказ по памяти не должны её срезать
+        "RATE_LIMIT_SCANS": "1000000",
+        "RATE_LIMIT_DEFAULT": "1000000",
+        "MIN_FREE_MEMORY_MB": "0",
+        "NEWMAN_BATCH_WAIT": "0.5",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    os.makedirs(os.environ["PLUGINS_DIR"], exist_ok=True)
+    for name, source in PLUGINS.items():
+        with open(os.path.join(os.environ["PLUGINS_DIR"], f"{name}.py"), "w") as f:
+            f.write(source.lstrip())
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: List[float]) -> Optional[Dict]:
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 0.5), 4),
+        "p90": round(percentile(values, 0.9), 4),
+        "p99": round(percentile(values, 0.99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def _process_tree_rss(root: int) -> int:
+    # RSS процесса и всех потомков: воркеры плагинов, демоны ZAP, заглушки
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss[pid] = int(fields[21]) * resource.getpagesize()
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class MemorySampler:
+    # Пиковая память за время прогона: опрос /proc каждые interval секунд
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_self = 0
+        self.peak_tree = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-memory", daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while True:
+            try:
+                tree = _process_tree_rss(pid)
+                with open("/proc/self/statm") as f:
+                    own = int(f.read().split()[1]) * resource.getpagesize()
+            except OSError:
+                tree = own = 0
+            self.peak_self = max(self.peak_self, own)
+            self.peak_tree = max(self.peak_tree, tree)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _cpu() -> Tuple[float, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def run_load(op: Callable[[int], Optional[Dict]], requests: int, concurrency: int) -> Dict:
+    # op(n) -> блок timings ответа (или None); исключение — ошибка запроса
+    latencies: List[float] = []
+    timings: List[Dict] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(n: int):
+        started = time.monotonic()
+        try:
+            t = op(n)
+        except Exception as e:
+            with lock:
+                errors.append(str(e)[:200])
+            return
+        elapsed = time.monotonic() - started
+        with lock:
+            latencies.append(elapsed)
+            if t:
+                timings.append(t)
+
+    cpu_self, cpu_children = _cpu()
+    with MemorySampler() as memory:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as ex:
+            list(ex.map(one, range(requests)))
+        wall = time.monotonic() - started
+    cpu_self_end, cpu_children_end = _cpu()
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "wall": round(wall, 4),
+        "throughput": round(len(latencies) / wall, 4) if wall > 0 else None,
+        "latency": summarize(latencies),
+        "memory": {"peak_rss": memory.peak_self, "peak_tree_rss": memory.peak_tree},
+        "cpu": {"self": round(cpu_self_end - cpu_self, 3), "children": round(cpu_children_end - cpu_children, 3)},
+    }
+    if errors:
+        result["error_samples"] = sorted(set(errors))[:5]
+    if timings:
+        result.update(_timings(timings))
+    return result
+
+
+def _timings(timings: List[Dict]) -> Dict:
+    # Сводка блоков timings ответов: задержка и ресурсы по стадиям, время по плагинам
+    stages: Dict[str, Dict[str, List]] = {}
+    plugins: Dict[str, List[float]] = {}
+    for t in timings:
+        for name, s in t.get("stages", {}).items():
+            row = stages.setdefault(name, {"elapsed": [], "cpu": [], "max_rss": [], "statuses": []})
+            row["elapsed"].append(s["elapsed"])
+            row["cpu"].append(s.get("cpu", 0.0))
+            row["max_rss"].append(s.get("max_rss", 0))
+            row["statuses"].append(s["status"])
+        for name, seconds in t.get("plugins", {}).items():
+            plugins.setdefault(name, []).append(seconds)
+    return {
+        "stages": {
+            name: {
+                "latency": summarize(row["elapsed"]),
+                "cpu_mean": round(sum(row["cpu"]) / len(row["cpu"]), 4),
+                "max_rss": max(row["max_rss"]),
+                "statuses": {s: row["statuses"].count(s) for s in sorted(set(row["statuses"]))},
+            }
+            for name, row in stages.items()
+        },
+        "plugins": {name: summarize(values) for name, values in plugins.items()},
+    }
+
+
+def start_api(app) -> Tuple[str, Callable[[], None]]:
+    # Настоящий HTTP-сервер в потоке: замеры идут через тот же стек, что и в проде
+    import uvicorn
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="bench-api", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=30)
+        sock.close()
+
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", stop
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _key(r: Dict) -> Tuple:
+    return r["scenario"], r.get("mode"), r.get("operations"), r["concurrency"]
+
+
+def compare(results: List[Dict], baseline: Dict) -> List[Dict]:
+    # Отношение к базовому прогону: p50 задержки и пропускная способность
+    base = {_key(r): r for r in baseline.get("results", [])}
+    rows = []
+    for r in results:
+        b = base.get(_key(r))
+        if b is None or not r.get("latency") or not b.get("latency"):
+            continue
+        rows.append({
+            "scenario": r["scenario"], "mode": r.get("mode"), "operations": r.get("operations"),
+            "concurrency": r["concurrency"],
+            "p50_ratio": round(r["latency"]["p50"] / b["latency"]["p50"], 3) if b["latency"]["p50"] else None,
+            "throughput_ratio": round(r["throughput"] / b["throughput"], 3) if b.get("throughput") else None,
+            "peak_tree_rss_ratio": round(r["memory"]["peak_tree_rss"] / b["memory"]["peak_tree_rss"], 3)
+            if b["memory"].get("peak_tree_rss") else None,
+        })
+    return rows
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _latency_arg(value: str) -> Dict[str, float]:
+    # spectral=0.5,zap=2 -> {"SPECTRAL": 0.5, "ZAP": 2.0}
+    out = {}
+    for part in value.split(","):
+        if part:
+            name, _, seconds = part.partition("=")
+            out[name.strip().upper()] = float(seconds)
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="VTB API Analyzer — pipeline benchmark")
+    parser.add_argument("--sizes", type=_ints, default=[10, 100, 1000, 10000], help="operations per spec")
+    parser.add_argument("--ref-depth", type=int, default=4, help="depth of the $ref graph under each response")
+    parser.add_argument("--concurrency", type=_ints, default=[1, 4], help="parallel clients")
+    parser.add_argument("--repeat", type=int, default=3, help="requests per client")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured requests before each run")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=_latency_arg, default={}, help="stub latency, e.g. spectral=0.5,zap=2,target=0.01")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    latency = dict(LATENCY, **args.latency)
+    workdir = tempfile.mkdtemp(prefix="vtb_bench_")
+    prepare_env(workdir, latency)
+
+    import httpx
+    from app import app
+    from core import metrics
+    from core.config import settings
+    from core.plugin_pool import plugin_pool
+    from core.pipeline import run_analysis, fetch_spec
+    from tools.api_scanner import run_api_scanner
+    from bench.target import TargetServer, allow_target
+    allow_target()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    api, stop_api = start_api(app)
+    client = httpx.Client(base_url=api, timeout=settings.scan_deadline + 60)
+    results: List[Dict] = []
+
+    def record(result: Dict):
+        results.append(result)
+        lat = result.get("latency") or {}
+        print(
+            f"{result['scenario']:<22} {str(result.get('mode') or ''):<8} ops={str(result.get('operations') or '-'):<6} "
+            f"c={result['concurrency']:<3} p50={lat.get('p50')}s p99={lat.get('p99')}s "
+            f"rps={result['throughput']} errors={result['errors']}",
+            file=sys.stderr
+        )
+
+    def measure(op: Callable[[int], Optional[Dict]], concurrency: int, **labels):
+        for n in range(args.warmup):
+            try:
+                op(-1 - n)
+            except Exception as e:
+                print(f"warmup failed: {e}", file=sys.stderr)
+        record({**labels, **run_load(op, concurrency * args.repeat, concurrency)})
+
+    started = datetime.now(timezone.utc).isoformat()
+    # run_api_scanner печатает отчёт в stdout; прогресс бенчмарка идёт в stderr
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for size in args.sizes:
+                raw = spec_bytes(size, args.ref_depth, args.seed)
+                with TargetServer(raw, latency=latency["TARGET"]) as target:
+                    if "analyze_api" in scenarios:
+                        def upload(n):
+                            r = client.post(
+                                "/api/analyze-api",
+                                files={"openapi_file": ("openapi.json", with_run(raw, n), "application/json")},
+                                data={"plugins": list(PLUGINS)}
+                            )
+                            r.raise_for_status()
+                            return None
+
+                        for c in args.concurrency:
+                            measure(upload, c, scenario="analyze_api", mode="http", operations=size, spec_bytes=len(raw))
+
+                    for scenario in scenarios:
+                        if not scenario.startswith("pipeline:"):
+                            continue
+                        mode = scenario.split(":", 1)[1]
+                        url = f"{target.url}/openapi.json"
+
+                        def analyze(n, mode=mode, url=url):
+                            # Как эндпоинт с url в запросе: спека скачивается с цели, она же — цель динамики
+                            spec = fetch_spec(url)
+                            result = run_analysis(
+                                spec, url, dynamic_scan=mode == "dynamic", selected_plugins=list(PLUGINS),
+                                deep=mode == "deep", timings=True, client=f"bench-{n}"
+                            )
+                            return result["timings"]
+
+                        for c in args.concurrency:
+                            measure(analyze, c, scenario="pipeline", mode=mode, operations=size, spec_bytes=len(raw))
+
+                    if "plugins" in scenarios:
+                        spec_data = json.loads(raw)
+                        names = list(PLUGINS)
+
+                        def plugins(n):
+                            def on_result(name, issues):
+                                if any(i.get("code") == "PLUGIN_BLOCKED" for i in issues):
+                                    raise RuntimeError(issues[0]["message"])
+
+                            with metrics.plugin_times() as times:
+                                plugin_pool.run(names, spec_data, on_result=on_result, spec_bytes=raw)
+                            return {"plugins": dict(times)}
+
+                        for c in args.concurrency:
+                            measure(plugins, c, scenario="plugins", operations=size, spec_bytes=len(raw))
+
+            if "api_scanner" in scenarios:
+                # Не зависит от размера спеки: проверки идут по фиксированному списку путей
+                with TargetServer(latency=latency["TARGET"]) as target:
+                    def scan(n):
+                        issues = run_api_scanner(target.url, concurrency=settings.probe_concurrency)["issues"]
+                        errors = [i for i in issues if i["code"] == "SCANNER_ERROR"]
+                        if errors:
+                            raise RuntimeError(errors[0]["message"])
+                        return None
+
+                    for c in args.concurrency:
+                        measure(scan, c, scenario="api_scanner")
+    finally:
+        client.close()
+        stop_api()
+
+    report = {
+        "schema": 1,
+        "meta": {
+            "started": started,
+            "finished": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "app_version": app.version,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {
+                "sizes": args.sizes, "ref_depth": args.ref_depth, "concurrency": args.concurrency,
+                "repeat": args.repeat, "warmup": args.warmup, "scenarios": scenarios, "seed": args.seed,
+            },
+            "latency": latency,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"] = {"file": args.baseline, "compare": compare(results, json.load(f))}
+        for row in report["baseline"]["compare"]:
+            print(
+                f"{row['scenario']:<22} {str(row['mode'] or ''):<8} ops={str(row['operations'] or '-'):<6} "
+                f"c={row['concurrency']:<3} p50 x{row['p50_ratio']} rps x{row['throughput_ratio']}",
+                file=sys.stderr
+            )
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results: {args.out}", file=sys.stderr)
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
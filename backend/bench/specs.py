@@ -0,0 +1,106 @@
+# backend/bench/specs.py
+# Синтетические OpenAPI 3.0 спеки для бенчмарков: от десятков до десятков тысяч операций.
+# Генерация детерминирована (seed), так что одинаковые параметры дают байт-в-байт одну спеку
+# и результаты разных релизов сравнимы.
+import json
+import random
+from typing import Dict, List
+
+METHODS = ("get", "post", "put", "patch", "delete")
+# Операции одного ресурса: (путь с {id}, метод)
+OPERATIONS = ((False, "get"), (False, "post"), (True, "get"), (True, "put"), (True, "patch"), (True, "delete"))
+# Подставляется в info.version при отдаче спеки — так каждая загрузка уникальна и не попадает в кэш
+RUN_MARKER = "__BENCH_RUN__"
+
+
+def _schema_chain(schemas: Dict, prefix: str, depth: int, rnd: random.Random, shared: List[str]) -> str:
+    # Цепочка $ref глубиной depth; часть узлов ссылается на общие схемы (граф, а не дерево)
+    names = [f"{prefix}L{level}" for level in range(depth)]
+    for level, name in enumerate(names):
+        props = {
+            "id": {"type": "string", "format": "uuid"},
+            "name": {"type": "string", "maxLength": 128},
+            "amount": {"type": "number"},
+            "created": {"type": "string", "format": "date-time"},
+        }
+        if level + 1 < depth:
+            props["child"] = {"$ref": f"#/components/schemas/{names[level + 1]}"}
+            props["items"] = {"type": "array", "items": {"$ref": f"#/components/schemas/{names[level + 1]}"}}
+        if shared and rnd.random() < 0.5:
+            props["meta"] = {"$ref": f"#/components/schemas/{rnd.choice(shared)}"}
+        if rnd.random() < 0.3:
+            # Без ограничений — повод для находок правил
+            props["payload"] = {"type": "string"}
+        schemas[name] = {"type": "object", "required": ["id"], "properties": props}
+    return names[0]
+
+
+def generate_spec(operations: int, ref_depth: int = 4, seed: int = 1) -> Dict:
+    # operations — число операций (путь x метод), ref_depth — глубина графа $ref от ответа
+    rnd = random.Random(f"{seed}:{operations}:{ref_depth}")
+    schemas: Dict[str, Dict] = {}
+    shared = []
+    for n in range(max(1, min(16, operations // 50))):
+        name = f"Shared{n}"
+        schemas[name] = {
+            "type": "object",
+            "properties": {"key": {"type": "string"}, "value": {"type": "string"}, "tags": {"type": "array", "items": {"type": "string"}}}
+        }
+        shared.append(name)
+
+    paths: Dict[str, Dict] = {}
+    resources = max(1, operations // len(OPERATIONS))
+    roots = [_schema_chain(schemas, f"Res{r}", ref_depth, rnd, shared) for r in range(resources)]
+    for n in range(operations):
+        # Ресурсы заполняются по очереди; когда кончаются — следующая версия API
+        r = n // len(OPERATIONS) % resources
+        version = n // (len(OPERATIONS) * resources) + 1
+        by_id, method = OPERATIONS[n % len(OPERATIONS)]
+        path = f"/api/v{version}/res{r}" + ("/{id}" if by_id else "")
+        op = {
+            "operationId": f"{method}Res{r}v{version}{'ById' if by_id else ''}",
+            "summary": f"{method.upper()} resource {r}",
+            "tags": [f"res{r}"],
+            "responses": {
+                "200": {
+                    "description": "OK",
+                    "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{roots[r]}"}}}
+                },
+                "404": {"description": "Not found"}
+            }
+        }
+        if by_id:
+            op["parameters"] = [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}]
+        if method in ("post", "put", "patch"):
+            op["requestBody"] = {
+                "required": True,
+                "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{roots[r]}"}}}
+            }
+        if rnd.random() < 0.2:
+            # Операция без авторизации
+            op["security"] = []
+        paths.setdefault(path, {})[method] = op
+
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": f"Bench API {operations}", "version": RUN_MARKER},
+        "servers": [{"url": "/"}],
+        "security": [{"bearer": []}],
+        "paths": paths,
+        "components": {
+            "securitySchemes": {"bearer": {"type": "http", "scheme": "bearer"}},
+            "schemas": schemas
+        }
+    }
+
+
+def spec_bytes(operations: int, ref_depth: int = 4, seed: int = 1) -> bytes:
+    return json.dumps(generate_spec(operations, ref_depth, seed), separators=(",", ":")).encode("utf-8")
+
+
+def with_run(raw: bytes, run: int) -> bytes:
+    return raw.replace(RUN_MARKER.encode(), f"1.0.{run}".encode(), 1)
+
+
+def count_operations(spec: Dict) -> int:
+    return sum(1 for item in spec["paths"].values() for m in item if m in METHODS)
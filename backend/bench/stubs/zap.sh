@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# Заглушка zap.sh для бенчмарков. Два режима, как у настоящего ZAP:
+#   -cmd -quickurl URL -quickout REPORT — холодный скан, BENCH_LATENCY_ZAP секунд;
+#   -daemon -port P -config api.key=K ... — демон с минимальным REST API для core/zap_pool.py:
+#     старт BENCH_ZAP_START секунд, spider и active scan — по BENCH_LATENCY_ZAP секунд.
+import os
+import sys
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ALERTS = [
+    {"pluginId": "10038", "alert": "Content Security Policy (CSP) Header Not Set", "risk": "Medium"},
+    {"pluginId": "10035", "alert": "Strict-Transport-Security Header Not Set", "risk": "Low"},
+    {"pluginId": "10021", "alert": "X-Content-Type-Options Header Missing", "risk": "Low"},
+    {"pluginId": "10049", "alert": "Storable and Cacheable Content", "risk": "Informational"},
+]
+
+
+def latency(name: str, default: str = "0") -> float:
+    return float(os.getenv(f"BENCH_LATENCY_{name}", os.getenv("BENCH_LATENCY", default)))
+
+
+def quick(args):
+    time.sleep(latency("ZAP"))
+    alerts = [
+        {"pluginid": a["pluginId"], "alert": a["alert"], "risk": a["risk"], "instances": [{"uri": args[args.index("-quickurl") + 1]}]}
+        for a in ALERTS
+    ]
+    with open(args[args.index("-quickout") + 1], "w") as f:
+        json.dump({"site": [{"alerts": alerts}]}, f)
+    return 0
+
+
+def daemon(args):
+    port = int(args[args.index("-port") + 1])
+    key = next(a.split("=", 1)[1] for a in args if a.startswith("api.key="))
+    duration = latency("ZAP")
+    time.sleep(float(os.getenv("BENCH_ZAP_START", "0.5")))
+    state = {"alerts": [], "started": {}}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.headers.get("X-ZAP-API-Key") != key:
+                self.send_response(403)
+                self.end_headers()
+                return
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            path = url.path.strip("/").split("/", 1)[1]
+            if path == "core/action/newSession":
+                state["alerts"], state["started"] = [], {}
+            elif path == "context/action/newContext":
+                return self.reply({"contextId": "1"})
+            elif path.endswith("/action/scan"):
+                state["started"][path.split("/")[0]] = time.monotonic()
+                return self.reply({"scan": "0"})
+            elif path.endswith("/view/status"):
+                started = state["started"].get(path.split("/")[0], time.monotonic())
+                progress = 100 if duration <= 0 else min(100, int((time.monotonic() - started) / duration * 100))
+                state["alerts"] = ALERTS[:max(1, len(ALERTS) * progress // 100)]
+                return self.reply({"status": str(progress)})
+            elif path == "pscan/view/recordsToScan":
+                return self.reply({"recordsToScan": "0"})
+            elif path == "core/view/alerts":
+                start, count = int(q.get("start", 0)), int(q.get("count", 500))
+                return self.reply({"alerts": state["alerts"][start:start + count]})
+            elif path == "core/action/shutdown":
+                self.reply({"Result": "OK"})
+                os._exit(0)
+            self.reply({"Result": "OK"})
+
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def main():
+    args = sys.argv[1:]
+    if "-daemon" in args:
+        return daemon(args)
+    return quick(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# backend/bench/target.py
+# Локальная цель для бенчмарков: отдаёт спеку (/openapi.json) и отвечает на любые запросы
+# сканеров с заданной задержкой. Поднимается в потоке того же процесса на 127.0.0.1.
+import json
+import time
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from core.dns import resolver
+from bench.specs import with_run
+
+HOST = "127.0.0.1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "TargetServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes, content_type: str = "application/json"):
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = self.path.split("?", 1)[0]
+        self.server.requests += 1
+        if path == "/openapi.json" and self.server.spec is not None:
+            # Каждая загрузка — новая версия спеки: кэши результатов не срабатывают
+            return self._reply(200, with_run(self.server.spec, next(self.server.runs)))
+        if path == "/admin":
+            return self._reply(401, b'{"error":"unauthorized"}')
+        self._reply(200, json.dumps({"path": path, "method": self.command}).encode())
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+
+class TargetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, spec: Optional[bytes] = None, latency: float = 0.0):
+        super().__init__((HOST, 0), _Handler)
+        self.spec = spec
+        self.latency = latency
+        self.requests = 0
+        self.runs = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{HOST}:{self.server_address[1]}"
+
+    def start(self) -> "TargetServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="bench-target", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def allow_target():
+    # Цель живёт на 127.0.0.1, который SSRF-защита (core/dns.py) справедливо запрещает.
+    # Только для процесса бенчмарка: разрешаем этот адрес, остальные проверяются как обычно.
+    pin, pin_sync = resolver.pin, resolver.pin_sync
+    is_blocked, is_blocked_sync = resolver.is_blocked, resolver.is_blocked_sync
+
+    async def pin_async(host):
+        return HOST if host == HOST else await pin(host)
+
+    async def is_blocked_async(host):
+        return False if host == HOST else await is_blocked(host)
+
+    resolver.pin = pin_async
+    resolver.pin_sync = lambda host: HOST if host == HOST else pin_sync(host)
+    resolver.is_blocked = is_blocked_async
+    resolver.is_blocked_sync = lambda host: False if host == HOST else is_blocked_sync(host)
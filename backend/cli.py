@@ -0,0 +1,127 @@
+# backend/cli.py
+# Пакетный скан без HTTP-сервера: тот же пайплайн, пул плагинов и кэши, что у API.
+#   python cli.py specs/ other.yaml bundle.zip --deep --out reports/ --fail-on high
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import List, Tuple
+from core.config import settings
+from core.ingest import SpecError
+from core.batch import SPEC_SUFFIXES, read_archive, check_items, run_batch, aggregate, to_sarif, worst_severity
+from core.findings import SEVERITY_RANK
+from core.plugin_pool import plugin_pool
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def collect(paths: List[str]) -> List[Tuple[str, bytes]]:
+    # Файлы спек, каталоги (рекурсивно) и архивы; имена — относительные пути
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "node_modules")
+                for name in sorted(names):
+                    if name.lower().endswith(SPEC_SUFFIXES) and not name.startswith("."):
+                        full = os.path.join(root, name)
+                        with open(full, "rb") as f:
+                            items.append((os.path.relpath(full, path), f.read()))
+        elif path.lower().endswith(ARCHIVE_SUFFIXES):
+            with open(path, "rb") as f:
+                items.extend(read_archive(f.read(), path))
+        else:
+            with open(path, "rb") as f:
+                items.append((path, f.read()))
+    check_items(items)
+    return items
+
+
+def _report_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") + ".report.json"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="VTB API Analyzer — batch scan of OpenAPI specs")
+    parser.add_argument("paths", nargs="+", help="spec files, directories or archives (zip/tar)")
+    parser.add_argument("--plugins", default="", help="comma-separated plugin names")
+    parser.add_argument("--deep", action="store_true", help="full Spectral instead of built-in rules")
+    parser.add_argument("--incremental", action="store_true", help="re-check only parts changed since the last scan")
+    parser.add_argument("--workers", type=int, default=settings.scan_workers, help="specs analysed in parallel")
+    parser.add_argument("--out", help="directory for report.json, per-spec reports and results.sarif")
+    parser.add_argument("--format", choices=("summary", "json", "sarif"), default="summary", help="stdout output")
+    parser.add_argument("--fail-on", choices=tuple(SEVERITY_RANK), help="exit 1 if any finding is this severe or worse")
+    # Коды выхода: 0 — ок, 1 — сработал --fail-on, 2 — ошибка входа или спеки, которые не удалось проанализировать
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        items = collect(args.paths)
+    except (OSError, SpecError) as e:
+        print(f"error: {getattr(e, 'detail', e)}", file=sys.stderr)
+        return 2
+
+    options = {
+        "selected_plugins": [p for p in args.plugins.split(",") if p],
+        "deep": args.deep,
+        "incremental": args.incremental,
+        "client": "cli"
+    }
+    started = time.monotonic()
+    done = [0]
+
+    def on_done(entry):
+        done[0] += 1
+        status = entry["result"]["total"] if entry["status"] == "done" else f"failed: {entry.get('error')}"
+        print(f"[{done[0]}/{len(items)}] {entry['name']}: {status}", file=sys.stderr)
+
+    plugin_pool.start()
+    try:
+        entries = run_batch(items, options, args.workers, on_done=on_done)
+    finally:
+        plugin_pool.stop()
+
+    report = aggregate(entries)
+    report["elapsed"] = round(time.monotonic() - started, 3)
+    sarif = to_sarif([(e["name"], e["issues"]) for e in entries if e["status"] == "done"])
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, "report.json"), "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(args.out, "results.sarif"), "w") as f:
+            json.dump(sarif, f, ensure_ascii=False)
+        specs_dir = os.path.join(args.out, "specs")
+        os.makedirs(specs_dir, exist_ok=True)
+        for e in entries:
+            if e["status"] == "done":
+                # Полный отчёт по спеке: все находки, а не первые 50
+                full = dict(e["result"], issues=e["issues"], truncated=False, name=e["name"])
+                with open(os.path.join(specs_dir, _report_name(e["name"])), "w") as f:
+                    json.dump(full, f, ensure_ascii=False, indent=2)
+
+    if args.format == "json":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.format == "sarif":
+        json.dump(sarif, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        s = report["summary"]
+        print(
+            f"{report['specs_total']} specs ({report['specs_failed']} failed), {report['issues_total']} issues "
+            f"in {report['elapsed']}s: " + ", ".join(f"{k} {v}" for k, v in s.items())
+        )
+
+    worst = worst_severity(entries)
+    if args.fail_on and worst is not None and SEVERITY_RANK[worst] >= SEVERITY_RANK[args.fail_on]:
+        return 1
+    # Не все спеки удалось разобрать/проанализировать
+    return 2 if report["specs_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# backend/core/batch.py
+# Пакетный анализ многих спек: разбор архива/списка файлов, сводный отчёт и SARIF.
+# Общий код для POST /api/batch (задачи в общей очереди) и backend/cli.py (в процессе).
+import io
+import os
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from core.config import settings
+from core.ingest import Spec, SpecError
+from core.findings import SEVERITY_RANK
+from core.pipeline import run_analysis
+from core.store import scan_store
+
+SPEC_SUFFIXES = (".json", ".yaml", ".yml")
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+# SARIF знает только error / warning / note
+SARIF_LEVELS = {"critical": "error", "high": "error", "medium": "warning", "low": "note", "info": "note"}
+
+Item = Tuple[str, bytes]
+
+
+def _is_spec_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return name.lower().endswith(SPEC_SUFFIXES) and not base.startswith(".")
+
+
+def _check_size(name: str, size: int, total: int, count: int):
+    if size > settings.max_spec_bytes:
+        raise SpecError(413, f"{name}: spec too large (limit {settings.max_spec_bytes} bytes)")
+    if total > settings.max_batch_bytes:
+        raise SpecError(413, f"Batch too large (limit {settings.max_batch_bytes} bytes unpacked)")
+    if count > settings.max_batch_specs:
+        raise SpecError(413, f"Too many specs in batch (limit {settings.max_batch_specs})")
+
+
+def _iter_zip(data: bytes) -> Iterator[Item]:
+    total = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        entries = [i for i in zf.infolist() if not i.is_dir() and _is_spec_name(i.filename)]
+        for count, info in enumerate(entries, 1):
+            # Размер из заголовка проверяем до распаковки (zip-бомбы), фактический — при чтении
+            total += info.file_size
+            _check_size(info.filename, info.file_size, total, count)
+            with zf.open(info) as f:
+                raw = f.read(settings.max_spec_bytes + 1)
+            _check_size(info.filename, len(raw), total, count)
+            yield info.filename, raw
+
+
+def _iter_tar(data: bytes) -> Iterator[Item]:
+    total, count = 0, 0
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tf:
+        for member in tf:
+            # Ссылки и устройства пропускаем — читаем только обычные файлы
+            if not member.isfile() or not _is_spec_name(member.name):
+                continue
+            count += 1
+            total += member.size
+            _check_size(member.name, member.size, total, count)
+            yield member.name, tf.extractfile(member).read()
+
+
+def read_archive(data: bytes, filename: Optional[str] = None) -> List[Item]:
+    # zip или tar(.gz/.bz2/.xz); на диск ничего не распаковывается
+    try:
+        if zipfile.is_zipfile(io.BytesIO(data)):
+            items = list(_iter_zip(data))
+        else:
+            items = list(_iter_tar(data))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise SpecError(400, f"Invalid archive {filename or ''}: {e}".strip())
+    if not items:
+        raise SpecError(400, "No .json/.yaml specs found in archive")
+    return items
+
+
+def check_items(items: List[Item]):
+    # Лимиты для списка отдельных файлов — те же, что для архива
+    total = 0
+    for count, (name, raw) in enumerate(items, 1):
+        total += len(raw)
+        _check_size(name, len(raw), total, count)
+
+
+def run_batch(
+    items: List[Item],
+    options: Dict,
+    workers: int,
+    on_done: Optional[Callable[[Dict], None]] = None,
+    cancel: Optional[threading.Event] = None
+) -> List[Dict]:
+    # Все спеки в одном процессе: общий пул плагинов, реестр и кэши.
+    # Запись: {"name", "status": done|failed, "result"?, "issues"?, "error"?} в порядке items.
+
+    def analyze(name: str, raw: bytes) -> Dict:
+        try:
+            spec = Spec.parse(raw, name)
+        except SpecError as e:
+            return {"name": name, "status": "failed", "error": e.detail}
+        issues: List[Dict] = []
+
+        def emit(event, data):
+            # Полный список находок (в result — только первые 50); словари те же,
+            # что в индексе находок, поэтому слияния дубликатов в них уже учтены
+            if event == "issues":
+                issues.extend(data["issues"])
+
+        try:
+            result = run_analysis(spec, emit=emit, cancel=cancel, **options)
+        except Exception as e:
+            return {"name": name, "status": "failed", "error": str(e)[:500]}
+        return {"name": name, "status": "done", "result": result, "issues": issues}
+
+    entries: List[Optional[Dict]] = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as ex:
+        futures = {ex.submit(analyze, name, raw): idx for idx, (name, raw) in enumerate(items)}
+        for fut in as_completed(futures):
+            entry = fut.result()
+            entries[futures[fut]] = entry
+            if on_done is not None:
+                on_done(entry)
+    return entries
+
+
+def _counts(result: Dict, issues: Optional[List[Dict]]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    # (по severity, по кодам) для всех находок скана: в result["issues"] только первые 50,
+    # поэтому считаем по истории сканов. Скан не попал в историю — по тому, что есть в памяти
+    if result["total"]:
+        by_code = scan_store.summary(result["id"], "code")
+        if by_code:
+            return scan_store.summary(result["id"]), by_code
+    by_code: Dict[str, int] = {}
+    for i in issues or result.get("issues", []):
+        by_code[i.get("code", "")] = by_code.get(i.get("code", ""), 0) + 1
+    return result["summary"], by_code
+
+
+def aggregate(entries: List[Dict]) -> Dict:
+    # Сводный отчёт: суммы по severity и кодам + краткая строка на каждую спеку.
+    # Читает историю сканов — из async-обработчиков вызывать через пул потоков
+    summary = {s: 0 for s in SEVERITIES}
+    by_code: Dict[str, int] = {}
+    specs = []
+    for e in entries:
+        row = {"name": e["name"], "status": e["status"]}
+        result = e.get("result")
+        if result is not None:
+            row.update(scan_id=result["id"], total=result["total"], summary=result["summary"])
+            severities, codes = _counts(result, e.get("issues"))
+            for sev, n in severities.items():
+                summary[sev] = summary.get(sev, 0) + n
+            for code, n in codes.items():
+                by_code[code] = by_code.get(code, 0) + n
+        if e.get("error"):
+            row["error"] = e["error"]
+        specs.append(row)
+    return {
+        "specs_total": len(entries),
+        "specs_failed": sum(1 for e in entries if e["status"] == "failed"),
+        "specs_pending": sum(1 for e in entries if e["status"] not in ("done", "failed")),
+        "issues_total": sum(r.get("total", 0) for r in specs),
+        "summary": summary,
+        "by_code": dict(sorted(by_code.items(), key=lambda kv: -kv[1])),
+        "specs": specs
+    }
+
+
+def worst_severity(entries: List[Dict]) -> Optional[str]:
+    worst = None
+    for e in entries:
+        for sev, n in ((e.get("result") or {}).get("summary") or {}).items():
+            if n and (worst is None or SEVERITY_RANK.get(sev, 0) > SEVERITY_RANK.get(worst, 0)):
+                worst = sev
+    return worst
+
+
+def _sarif_location(name: str, issue: Dict) -> Dict:
+    location: Dict = {"physicalLocation": {"artifactLocation": {"uri": name}}}
+    rng = issue.get("range") or {}
+    start = rng.get("start") if isinstance(rng, dict) else None
+    if isinstance(start, dict) and "line" in start:
+        # Spectral считает строки с 0, SARIF — с 1
+        region = {"startLine": start["line"] + 1}
+        if "character" in start:
+            region["startColumn"] = start["character"] + 1
+        location["physicalLocation"]["region"] = region
+    where = issue.get("path") or issue.get("endpoint")
+    if where:
+        if issue.get("method") and not issue.get("path"):
+            where = f"{issue['method']} {where}"
+        location["logicalLocations"] = [{"fullyQualifiedName": str(where)}]
+    return location
+
+
+def to_sarif(entries: List[Tuple[str, List[Dict]]], version: str = "2.1") -> Dict:
+    # entries — (имя спеки, её находки). Один run на весь пакет, правила — по коду находки.
+    rules: Dict[str, Dict] = {}
+    results = []
+    for name, issues in entries:
+        for i in issues:
+            code = str(i.get("code", "UNKNOWN"))
+            sev = str(i.get("severity", "info")).lower()
+            if code not in rules:
+                rules[code] = {
+                    "id": code,
+                    "shortDescription": {"text": str(i.get("message", code))[:200] or code},
+                    "defaultConfiguration": {"level": SARIF_LEVELS.get(sev, "note")}
+                }
+            result = {
+                "ruleId": code,
+                "level": SARIF_LEVELS.get(sev, "note"),
+                "message": {"text": str(i.get("message", "")) or code},
+                "locations": [_sarif_location(name, i)],
+                "properties": {"severity": sev, "tool": i.get("tool"), "source": i.get("source")}
+            }
+            if i.get("fingerprint"):
+                result["partialFingerprints"] = {"vtbFinding/v1": i["fingerprint"]}
+            results.append(result)
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {
+                "name": "VTB API Analyzer Pro",
+                "version": version,
+                "rules": list(rules.values())
+            }},
+            "results": results
+        }]
+    }
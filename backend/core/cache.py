@@ -0,0 +1,164 @@
+# backend/core/cache.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Полный обход каталога (протухшие записи, сверка размера с другими процессами) — не чаще раза в столько секунд
+SWEEP_INTERVAL = 60
+
+
+def content_hash(*parts: Any) -> str:
+    # Ключ по содержимому: dict/list нормализуем (сортировка ключей, без пробелов),
+    # чтобы одинаковая спека с другим форматированием давала тот же хэш
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            h.update(part)
+        elif isinstance(part, str):
+            h.update(part.encode("utf-8"))
+        else:
+            # Одним вызовом: iterencode всегда идёт через медленный Python-энкодер, dumps — через C
+            h.update(json.dumps(part, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCache:
+    # Двухуровневый кэш: LRU в памяти + JSON-файлы на диске.
+    # Диск ограничен по размеру (max_bytes) и возрасту записей (max_age, секунды).
+    # Размер на диске считается по ходу записи; каталог обходится, только когда он
+    # превышен или прошло SWEEP_INTERVAL — запись не стоит O(числа файлов).
+    def __init__(self, directory: str, max_bytes: int, max_age: int, memory_items: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_items = memory_items
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._bytes: Optional[int] = None  # None — ещё не считали
+        self._last_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.max_age:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at >= self.max_age:
+                os.unlink(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, stored_at, value)
+        return value
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps(value).encode("utf-8")
+        try:
+            old = os.path.getsize(path)
+        except OSError:
+            old = 0
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            written = len(data) - old
+        except OSError as e:
+            logger.error(f"Cache write failed: {e}")
+            written = 0
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        with self._lock:
+            self._remember(key, now, value)
+            if self._bytes is not None:
+                self._bytes += written
+            due = self._bytes is None or self._bytes > self.max_bytes or now - self._last_sweep >= SWEEP_INTERVAL
+        if due:
+            self._evict()
+
+    def _remember(self, key: str, stored_at: float, value: Any):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Сначала выкидываем протухшие записи, потом самые старые — пока не влезем в max_bytes.
+        # Обход уже идёт в другом потоке — второй не нужен
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            self._sweep()
+        finally:
+            self._evict_lock.release()
+
+    def _sweep(self):
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for e in it:
+                    if not e.name.endswith(".json"):
+                        continue
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    if now - st.st_mtime >= self.max_age:
+                        self._unlink(e.path)
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        except OSError:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._unlink(path)
+            total -= size
+        with self._lock:
+            self._bytes = total
+            self._last_sweep = now
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
@@ -6,6 +6,86 @@ class Settings(BaseSettings):
     xai_api_key: str = os.getenv("XAI_API_KEY", "")
     zap_proxy: str = os.getenv("ZAP_PROXY", "http://127.0.0.1:8081")  # но мы его отключим
     dynamic_scan: bool = False  # по дефолту — без ZAP
+    plugins_dir: str = os.getenv("PLUGINS_DIR", "/tmp/plugins")
+
+    # Rate limiting (запросов в минуту на клиента), состояние общее для всех воркеров
+    ratelimit_db: str = os.getenv("RATELIMIT_DB", "/tmp/vtb_ratelimit.db")
+    rate_limit_scans: int = int(os.getenv("RATE_LIMIT_SCANS", "10"))
+    rate_limit_default: int = int(os.getenv("RATE_LIMIT_DEFAULT", "60"))
+    ratelimit_idle_ttl: int = int(os.getenv("RATELIMIT_IDLE_TTL", "600"))
+    # Сколько ждать блокировку базы лимитера (секунды); не дождались — запрос пропускается
+    ratelimit_busy_timeout: float = float(os.getenv("RATELIMIT_BUSY_TIMEOUT", "0.05"))
+
+    # Очередь задач сканирования (SQLite, переживает рестарт)
+    jobs_db: str = os.getenv("JOBS_DB", "/tmp/vtb_jobs.db")
+    scan_workers: int = int(os.getenv("SCAN_WORKERS", "4"))
+    # Аренда задачи процессом (секунды): задачу умершего процесса другой заберёт по её истечении
+    job_lease: float = float(os.getenv("JOB_LEASE", "60"))
+    # Общий бюджет времени на один скан (все стадии идут параллельно)
+    scan_deadline: int = int(os.getenv("SCAN_DEADLINE", "1200"))
+    # api_scanner: одновременных запросов к целевому хосту
+    probe_concurrency: int = int(os.getenv("PROBE_CONCURRENCY", "8"))
+    # Newman проверяет найденные Kiterunner пути пачками, параллельно с поиском
+    newman_workers: int = int(os.getenv("NEWMAN_WORKERS", "4"))
+    newman_batch_size: int = int(os.getenv("NEWMAN_BATCH_SIZE", "25"))
+    # Неполная пачка уходит в Newman, если новых путей нет дольше этого (секунды)
+    newman_batch_wait: float = float(os.getenv("NEWMAN_BATCH_WAIT", "2"))
+
+    # ZAP: пул тёплых демонов, запускается первым динамическим сканом (0 — каждый скан запускает zap.sh -quickurl).
+    # У каждого процесса uvicorn свои zap_pool_size демонов на портах от zap_base_port (см. core/zap_pool.py).
+    # Демон перезапускается после zap_max_scans сканов или если RSS вырос больше чем на zap_max_rss_growth_mb
+    zap_pool_size: int = int(os.getenv("ZAP_POOL_SIZE", "1"))
+    zap_base_port: int = int(os.getenv("ZAP_BASE_PORT", "8090"))
+    zap_home_dir: str = os.getenv("ZAP_HOME_DIR", "/tmp/vtb_zap")
+    zap_start_timeout: float = float(os.getenv("ZAP_START_TIMEOUT", "180"))
+    zap_max_scans: int = int(os.getenv("ZAP_MAX_SCANS", "50"))
+    zap_max_rss_growth_mb: int = int(os.getenv("ZAP_MAX_RSS_GROWTH_MB", "1024"))
+
+    # Планировщик тяжёлых инструментов: одновременных запусков каждого на весь бэкенд,
+    # запусков на один целевой хост и минимум свободной памяти для новой работы
+    zap_slots: int = int(os.getenv("ZAP_SLOTS", str(max(1, int(os.getenv("ZAP_POOL_SIZE", "1"))))))
+    kiterunner_slots: int = int(os.getenv("KITERUNNER_SLOTS", "2"))
+    newman_slots: int = int(os.getenv("NEWMAN_SLOTS", "4"))
+    api_scanner_slots: int = int(os.getenv("API_SCANNER_SLOTS", "8"))
+    scans_per_host: int = int(os.getenv("SCANS_PER_HOST", "4"))
+    min_free_memory_mb: int = int(os.getenv("MIN_FREE_MEMORY_MB", "512"))
+
+    # Плагины: пул процессов и лимиты на каждый плагин (0 воркеров — выполнять в процессе API)
+    plugin_workers: int = int(os.getenv("PLUGIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+    plugin_cpu_limit: int = int(os.getenv("PLUGIN_CPU_LIMIT", "10"))
+    plugin_memory_limit_mb: int = int(os.getenv("PLUGIN_MEMORY_LIMIT_MB", "512"))
+    plugin_timeout: float = float(os.getenv("PLUGIN_TIMEOUT", "30"))
+
+    # История сканов с полным списком находок; старше scan_history_max_age секунд — удаляются (0 — хранить всё)
+    scans_db: str = os.getenv("SCANS_DB", "/tmp/vtb_scans.db")
+    scan_history_max_age: int = int(os.getenv("SCAN_HISTORY_MAX_AGE", str(30 * 24 * 3600)))
+
+    # Кэш результатов статического анализа
+    cache_dir: str = os.getenv("CACHE_DIR", "/tmp/vtb_cache")
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    cache_max_age: int = int(os.getenv("CACHE_MAX_AGE", str(7 * 24 * 3600)))
+    cache_memory_items: int = int(os.getenv("CACHE_MEMORY_ITEMS", "256"))
+
+    # Большие спеки в deep-режиме линтим по частям параллельно
+    shard_min_operations: int = int(os.getenv("SHARD_MIN_OPERATIONS", "200"))
+    lint_workers: int = int(os.getenv("LINT_WORKERS", str(os.cpu_count() or 2)))
+
+    # Приём спек: лимит размера и каталог временных файлов для инструментов (tmpfs, если есть)
+    max_spec_bytes: int = int(os.getenv("MAX_SPEC_BYTES", str(50 * 1024 * 1024)))
+    spec_tmp_dir: str = os.getenv("SPEC_TMP_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp")
+    # DNS для SSRF-проверок: getaddrinfo не отдаёт TTL записей — срок жизни кэша задаём сами
+    dns_cache_ttl: float = float(os.getenv("DNS_CACHE_TTL", "300"))
+    dns_negative_ttl: float = float(os.getenv("DNS_NEGATIVE_TTL", "30"))
+    dns_timeout: float = float(os.getenv("DNS_TIMEOUT", "5"))
+
+    # Спеки по URL: таймаут загрузки и сколько разобранных спек держать в памяти
+    spec_fetch_timeout: float = float(os.getenv("SPEC_FETCH_TIMEOUT", "10"))
+    spec_memory_items: int = int(os.getenv("SPEC_MEMORY_ITEMS", "32"))
+
+    # Пакетный анализ (POST /api/batch, cli.py): лимиты на архив после распаковки
+    max_batch_specs: int = int(os.getenv("MAX_BATCH_SPECS", "1000"))
+    max_batch_bytes: int = int(os.getenv("MAX_BATCH_BYTES", str(500 * 1024 * 1024)))
+    rate_limit_batches: int = int(os.getenv("RATE_LIMIT_BATCHES", "2"))
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,157 @@
+# backend/core/dns.py
+import time
+import socket
+import asyncio
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from core.config import settings
+from core.security import BLOCKED_HOSTS, INTERNAL_IPS
+
+# Сети разбираем один раз при импорте; плюс «этот» хост, CGNAT и link-local IPv6
+BLOCKED_NETWORKS = [
+    ipaddress.ip_network(cidr)
+    for cidr in INTERNAL_IPS + ["0.0.0.0/8", "100.64.0.0/10", "fe80::/10"]
+]
+
+
+def is_internal_ip(ip: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip.split("%", 1)[0])
+    except ValueError:
+        return True
+    if addr.version == 6 and addr.ipv4_mapped is not None:
+        addr = addr.ipv4_mapped
+    if addr.is_unspecified or addr.is_multicast:
+        return True
+    return any(addr in net for net in BLOCKED_NETWORKS if net.version == addr.version)
+
+
+def pinned_url(url: str, ip: str) -> Tuple[str, str]:
+    # URL на проверенный IP и значение Host исходного хоста: инструмент идёт на этот адрес,
+    # не спрашивая DNS заново (DNS rebinding между проверкой и запросом)
+    parts = urlsplit(url)
+    netloc = f"[{ip}]" if ":" in ip else ip
+    if parts.port:
+        netloc += f":{parts.port}"
+    return urlunsplit(parts._replace(netloc=netloc)), parts.netloc
+
+
+class Resolver:
+    # Кэш DNS для SSRF-проверок: все A/AAAA записи хоста, отрицательные ответы
+    # кэшируются отдельно. getaddrinfo не отдаёт TTL записей, поэтому срок жизни
+    # задаётся настройкой. Async-путь не блокирует event loop медленным резолвером.
+    def __init__(self, ttl: float, negative_ttl: float, timeout: float, max_items: int = 4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_items = max_items
+        self._cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, host: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._cache.move_to_end(host)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, host: str, addrs: List[str]) -> List[str]:
+        ttl = self.ttl if addrs else self.negative_ttl
+        with self._lock:
+            self._cache[host] = (time.monotonic() + ttl, addrs)
+            self._cache.move_to_end(host)
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+        return addrs
+
+    @staticmethod
+    def _literal(host: str) -> Optional[List[str]]:
+        try:
+            return [str(ipaddress.ip_address(host.strip("[]")))]
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _addrs(infos) -> List[str]:
+        return sorted({info[4][0] for info in infos})
+
+    async def resolve(self, host: str) -> List[str]:
+        # [] — хост не резолвится (или резолвер не ответил за timeout)
+        literal = self._literal(host)
+        if literal is not None:
+            return literal
+        cached = self._cached(host)
+        if cached is not None:
+            return cached
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), timeout=self.timeout
+            )
+        except (OSError, asyncio.TimeoutError, UnicodeError):
+            return self._store(host, [])
+        return self._store(host, self._addrs(infos))
+
+    def resolve_sync(self, host: str) -> List[str]:
+        # Для синхронного кода (стадии пайплайна в потоках)
+        literal = self._literal(host)
+        if literal is not None:
+            return literal
+        cached = self._cached(host)
+        if cached is not None:
+            return cached
+        try:
+            infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError):
+            return self._store(host, [])
+        return self._store(host, self._addrs(infos))
+
+    @staticmethod
+    def _blocked(addrs: List[str]) -> bool:
+        # Блокируем, если хоть одна запись ведёт во внутреннюю сеть
+        return not addrs or any(is_internal_ip(ip) for ip in addrs)
+
+    @staticmethod
+    def _normalize(host: Optional[str]) -> Optional[str]:
+        if not host:
+            return None
+        host = host.lower().rstrip(".")
+        return None if host in BLOCKED_HOSTS else host
+
+    async def is_blocked(self, host: Optional[str]) -> bool:
+        host = self._normalize(host)
+        return host is None or self._blocked(await self.resolve(host))
+
+    def is_blocked_sync(self, host: Optional[str]) -> bool:
+        host = self._normalize(host)
+        return host is None or self._blocked(self.resolve_sync(host))
+
+    def _pick(self, addrs: List[str]) -> Optional[str]:
+        if self._blocked(addrs):
+            return None
+        return next((ip for ip in addrs if ":" not in ip), addrs[0])
+
+    async def pin(self, host: Optional[str]) -> Optional[str]:
+        # Проверенный адрес, на который и идёт запрос: None — хост запрещён
+        host = self._normalize(host)
+        return None if host is None else self._pick(await self.resolve(host))
+
+    def pin_sync(self, host: Optional[str]) -> Optional[str]:
+        # Для динамических инструментов скана: запрос к этому адресу не зависит
+        # от того, что DNS ответит позже (DNS rebinding)
+        host = self._normalize(host)
+        return None if host is None else self._pick(self.resolve_sync(host))
+
+resolver = Resolver(
+    ttl=settings.dns_cache_ttl,
+    negative_ttl=settings.dns_negative_ttl,
+    timeout=settings.dns_timeout
+)
@@ -0,0 +1,171 @@
+# backend/core/fetch.py
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+import httpx
+from core.config import settings
+from core.cache import ResultCache, content_hash
+from core.ingest import Spec, SpecError, read_stream
+from core.dns import resolver, pinned_url
+
+logger = logging.getLogger(__name__)
+
+# Редиректы проходим вручную: каждый Location проверяется SSRF-защитой, как и исходный URL,
+# и запрос идёт на проверенный адрес (Host и SNI — исходного хоста), DNS повторно не спрашиваем
+MAX_REDIRECTS = 5
+
+
+class _Entry:
+    __slots__ = ("etag", "last_modified", "spec")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], spec: Spec):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.spec = spec
+
+
+class SpecFetcher:
+    # Загрузка спек по URL: условные запросы (ETag / Last-Modified), разобранные спеки
+    # в LRU памяти, исходные байты — в дисковом кэше (переживает рестарт).
+    # Одновременные запросы одного URL схлопываются в один (single-flight).
+    # Все загрузки идут в собственном event loop в отдельном потоке — так им
+    # пользуются и async-обработчики, и синхронные воркеры очереди.
+    def __init__(self, directory: str, memory_items: int, timeout: float):
+        self.memory_items = memory_items
+        self.timeout = timeout
+        # Байты в памяти ResultCache не держим: в памяти — только разобранные спеки
+        self._disk = ResultCache(directory, settings.cache_max_bytes, settings.cache_max_age, memory_items=0)
+        self._memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self.fetched = 0      # скачали спеку целиком
+        self.not_modified = 0  # сервер ответил 304
+        self.shared = 0       # присоединились к уже идущей загрузке
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="spec-fetcher", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, url: str) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._fetch_shared(url), self._ensure_loop())
+
+    async def fetch(self, url: str) -> Spec:
+        return await asyncio.wrap_future(self._submit(url))
+
+    def fetch_sync(self, url: str) -> Spec:
+        return self._submit(url).result()
+
+    def stop(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    async def _fetch_shared(self, url: str) -> Spec:
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            self.shared += 1
+        # shield: отмена одного ожидающего не должна обрывать загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str) -> Spec:
+        loop = asyncio.get_running_loop()
+        key = content_hash(url)
+        entry = self._memory.get(url)
+        stored = None
+        if entry is None:
+            stored = await loop.run_in_executor(None, self._disk.get, key)
+            if stored is not None:
+                entry = _Entry(stored.get("etag"), stored.get("last_modified"), None)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=False)
+        try:
+            location = url
+            for _ in range(MAX_REDIRECTS + 1):
+                if urlparse(location).scheme not in ("http", "https"):
+                    raise SpecError(400, "Invalid spec URL")
+                host = urlparse(location).hostname
+                ip = await resolver.pin(host)
+                if ip is None:
+                    raise SpecError(403, "Blocked domain")
+                request_url, host_header = pinned_url(location, ip)
+                async with self._client.stream(
+                    "GET", request_url, headers={**headers, "Host": host_header}, extensions={"sni_hostname": host}
+                ) as r:
+                    if r.has_redirect_location:
+                        location = urljoin(location, r.headers["location"])
+                        continue
+                    if r.status_code == 304 and entry is not None:
+                        self.not_modified += 1
+                        if entry.spec is None:
+                            # Разобранной копии нет (рестарт/вытеснение) — парсим байты с диска, без скачивания
+                            entry.spec = await loop.run_in_executor(
+                                None, Spec.parse, stored["body"].encode("utf-8"), urlparse(url).path
+                            )
+                        self._remember(url, entry)
+                        return entry.spec
+                    if r.status_code != 200:
+                        raise SpecError(400, "Invalid spec URL")
+                    raw = await read_stream(r)
+                    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                    break
+            else:
+                raise SpecError(400, "Too many redirects")
+        except httpx.HTTPError as e:
+            logger.error(f"Spec fetch failed for {url}: {e}")
+            raise SpecError(400, "Invalid spec URL")
+
+        self.fetched += 1
+        spec = await loop.run_in_executor(None, Spec.parse, raw, urlparse(url).path)
+        entry = _Entry(etag, last_modified, spec)
+        self._remember(url, entry)
+        if etag or last_modified:
+            await loop.run_in_executor(None, self._store, key, entry)
+        return spec
+
+    def _remember(self, url: str, entry: _Entry):
+        self._memory[url] = entry
+        self._memory.move_to_end(url)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _store(self, key: str, entry: _Entry):
+        try:
+            body = entry.spec.raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+        self._disk.put(key, {"etag": entry.etag, "last_modified": entry.last_modified, "body": body})
+
+
+spec_fetcher = SpecFetcher(
+    os.path.join(settings.cache_dir, "specs"),
+    memory_items=settings.spec_memory_items,
+    timeout=settings.spec_fetch_timeout
+)
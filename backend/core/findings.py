@@ -0,0 +1,129 @@
+# backend/core/findings.py
+# Нормализация находок разных инструментов и дедупликация по отпечатку
+# (класс правила, эндпоинт, метод, параметр) по мере поступления.
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+SEVERITY_RANK = {"info": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+
+# Одна и та же проблема у разных инструментов — один класс
+RULE_CLASSES = {
+    "VTB_NO_RATE_LIMIT": "rate-limit",
+    "VTB_NO_HSTS": "hsts",
+    "VTB_CORS_WILDCARD": "cors",
+    "VTB_DEBUG_EXPOSED": "debug-endpoint",
+    "VTB_OPEN_ADMIN": "admin-exposed",
+    "VTB_DEFAULT_CREDS": "default-credentials",
+    "VTB_GRAPHQL_INTROSPECTION": "graphql-introspection",
+    "KITE_FOUND": "endpoint-discovered",
+    "NEWMAN_FAIL": "contract-test-failed",
+}
+# ZAP: по pluginId, для старых отчётов — по названию алерта
+ZAP_CLASSES = {
+    "10035": "hsts",
+    "10098": "cors",
+    "Strict-Transport-Security Header Not Set": "hsts",
+    "Cross-Domain Misconfiguration": "cors",
+}
+# Проверки уровня хоста: эндпоинт и метод не важны
+SITE_WIDE = {"hsts", "cors", "rate-limit"}
+
+HTTP_METHODS = {"get", "put", "post", "delete", "options", "head", "patch", "trace"}
+
+Key = Tuple[str, str, str, str]
+
+
+def _location(path: Any) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    # JSON-путь статической находки -> (эндпоинт, метод, остаток пути)
+    if isinstance(path, str):
+        parts = path.split(".") if path else []
+        # "paths./users/{id}.get..." — сам путь может содержать точки, собираем его до метода
+        if len(parts) >= 2 and parts[0] == "paths":
+            rest = parts[1:]
+            for n in range(1, len(rest) + 1):
+                if n < len(rest) and rest[n] in HTTP_METHODS:
+                    return ".".join(rest[:n]), rest[n].upper(), ".".join(rest[n + 1:]) or None
+            return ".".join(rest), None, None
+    else:
+        parts = list(map(str, path or []))
+        if len(parts) >= 2 and parts[0] == "paths":
+            method = parts[2].upper() if len(parts) > 2 and parts[2] in HTTP_METHODS else None
+            rest = parts[3:] if method else parts[2:]
+            return parts[1], method, ".".join(rest) or None
+    if len(parts) >= 3 and parts[0] == "components":
+        return f"#/components/{parts[1]}/{parts[2]}", None, ".".join(parts[3:]) or None
+    return (".".join(parts) or None), None, None
+
+
+def fingerprint_key(issue: Dict, tool: str = "") -> Key:
+    # tool — кто прислал находку (как в FindingIndex.add): различает находки без места
+    code = str(issue.get("code", ""))
+    if code in RULE_CLASSES:
+        rule = RULE_CLASSES[code]
+    elif code.startswith("ZAP_") and (issue.get("plugin_id") or issue.get("message")):
+        ref = str(issue.get("plugin_id") or "")
+        rule = ZAP_CLASSES.get(ref) or ZAP_CLASSES.get(issue.get("message", "")) or f"zap:{ref or issue.get('message')}"
+    else:
+        rule = code
+
+    if "endpoint" in issue or "method" in issue:
+        endpoint, method, param = issue.get("endpoint"), issue.get("method"), issue.get("param")
+    elif issue.get("path"):
+        endpoint, method, param = _location(issue["path"])
+    else:
+        # Ни места, ни эндпоинта (ошибки инструментов, плагины) — различаем по источнику и тексту:
+        # одинаковая ошибка двух плагинов — две находки
+        origin = f"plugin:{issue['plugin']}" if issue.get("plugin") else tool
+        endpoint, method, param = origin, None, issue.get("message")
+
+    if rule in SITE_WIDE and not issue.get("path"):
+        endpoint, method, param = "/", "*", None
+    return rule, endpoint or "", (method or "").upper(), str(param or "")
+
+
+def fingerprint(key: Key) -> str:
+    return hashlib.sha1("\0".join(key).encode("utf-8")).hexdigest()[:16]
+
+
+class FindingIndex:
+    # Отпечатки находок одного скана: повторная находка (тем же или другим
+    # инструментом) не добавляется, а сливается с первой — растут count и tools,
+    # severity берётся максимальная. Потокобезопасно: стадии кладут находки из своих потоков.
+    def __init__(self):
+        self._by_fp: Dict[str, Dict] = {}
+        self._rank: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.merged = 0
+
+    def add(self, issues: Sequence[Dict], tool: str, source: str, rank: int = 0) -> List[Dict]:
+        # Возвращает только новые находки (для стриминга)
+        fresh = []
+        with self._lock:
+            for issue in issues:
+                if not isinstance(issue, dict):
+                    continue
+                fp = fingerprint(fingerprint_key(issue, tool))
+                known = self._by_fp.get(fp)
+                if known is None:
+                    finding = dict(issue)
+                    finding["fingerprint"] = fp
+                    finding["tool"] = tool
+                    finding["source"] = source
+                    self._by_fp[fp] = finding
+                    self._rank[fp] = rank
+                    fresh.append(finding)
+                    continue
+                self.merged += 1
+                known["count"] = known.get("count", 1) + 1
+                if tool != known["tool"] and tool not in known.get("tools", ()):
+                    known.setdefault("tools", [known["tool"]]).append(tool)
+                sev = str(issue.get("severity", "info")).lower()
+                if SEVERITY_RANK.get(sev, 0) > SEVERITY_RANK.get(str(known.get("severity", "info")).lower(), 0):
+                    known["severity"] = sev
+        return fresh
+
+    def findings(self) -> List[Dict]:
+        # Порядок стабильный: по rank стадии, внутри — по времени поступления
+        with self._lock:
+            return sorted(self._by_fp.values(), key=lambda f: self._rank[f["fingerprint"]])
@@ -0,0 +1,215 @@
+# backend/core/incremental.py
+# Инкрементальный скан: спека делится на единицы (путь, компонент, глобальная часть),
+# у каждой — хэш с учётом транзитивных $ref. Статика перезапускается только на
+# изменившихся единицах (как самодостаточный кусок спеки), находки остальных
+# берутся из прошлого скана того же API.
+import os
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from core.config import settings
+from core.cache import ResultCache, content_hash
+from core.plugins import plugin_registry
+from core.sharding import collect_refs, ref_key, sub_spec
+
+GLOBAL_UNIT = "g"
+
+incremental_cache = ResultCache(
+    os.path.join(settings.cache_dir, "incremental"),
+    max_bytes=settings.cache_max_bytes,
+    max_age=settings.cache_max_age,
+    memory_items=16
+)
+
+
+def _path_unit(path: str) -> str:
+    return f"p:{path}"
+
+
+def _component_unit(section: str, name: str) -> str:
+    return f"c:{section}/{name}"
+
+
+def unit_of(path: List[Any]) -> str:
+    # К какой единице относится issue по его JSON-пути в документе
+    path = list(map(str, path or []))
+    if len(path) >= 2 and path[0] == "paths":
+        return _path_unit(path[1])
+    if len(path) >= 3 and path[0] == "components" and path[1] != "securitySchemes":
+        return _component_unit(path[1], path[2])
+    return GLOBAL_UNIT
+
+
+def api_key(spec: Dict, target_url: Optional[str]) -> Optional[str]:
+    # «Тот же API»: по целевому URL, иначе по названию в info вместе с servers
+    # (одно название у разных API встречается часто — «Sample API»).
+    # Без названия спеки одного API не узнать — None, инкрементальный режим не включается
+    if target_url:
+        return target_url
+    info = spec.get("info") if isinstance(spec.get("info"), dict) else {}
+    title = info.get("title")
+    if not isinstance(title, str) or not title.strip():
+        return None
+    servers = spec.get("servers") if isinstance(spec.get("servers"), list) else []
+    urls = sorted(s["url"] for s in servers if isinstance(s, dict) and isinstance(s.get("url"), str))
+    return "spec:" + content_hash(title.strip(), urls)
+
+
+class SpecUnits:
+    # Хэши единиц спеки. Хэш пути включает хэши всех компонентов его $ref-замыкания
+    # и схем авторизации, поэтому правка схемы помечает изменёнными все пути, что её используют.
+    def __init__(self, spec: Dict):
+        components = spec.get("components") or {}
+        self.components: Dict[str, str] = {}
+        self._refs: Dict[str, Set[str]] = {}
+        for section, items in components.items():
+            if section == "securitySchemes" or not isinstance(items, dict):
+                continue
+            for name, node in items.items():
+                unit = _component_unit(section, name)
+                self.components[unit] = content_hash(node)
+                self._refs[unit] = self._ref_units(collect_refs(node))
+
+        auth = content_hash(spec.get("security"), components.get("securitySchemes"))
+        self.globals = content_hash(
+            {k: v for k, v in spec.items() if k not in ("paths", "components")},
+            components.get("securitySchemes")
+        )
+        self.paths: Dict[str, str] = {}
+        for path, item in (spec.get("paths") or {}).items():
+            closure = self.closure(self._ref_units(collect_refs(item)))
+            self.paths[path] = content_hash(item, auth, sorted((u, self.components[u]) for u in closure))
+
+    @staticmethod
+    def _ref_units(refs: Set[str]) -> Set[str]:
+        units = set()
+        for ref in refs:
+            key = ref_key(ref)
+            if key is not None and key[0] != "securitySchemes":
+                units.add(_component_unit(*key))
+        return units
+
+    def closure(self, roots: Set[str]) -> Set[str]:
+        seen: Set[str] = set()
+        pending = [u for u in roots if u in self.components]
+        while pending:
+            unit = pending.pop()
+            if unit in seen:
+                continue
+            seen.add(unit)
+            pending.extend(u for u in self._refs.get(unit, ()) if u in self.components and u not in seen)
+        return seen
+
+    def hashes(self) -> Dict[str, str]:
+        units = {_path_unit(p): h for p, h in self.paths.items()}
+        units.update(self.components)
+        units[GLOBAL_UNIT] = self.globals
+        return units
+
+
+def _issue_key(i: Dict) -> Tuple:
+    return i.get("code"), tuple(map(str, i.get("path", []))), i.get("message")
+
+
+def incremental_static(
+    spec: Dict,
+    key: str,
+    analyze: Callable[[Dict], List[Dict]],
+    analyzer: str,
+    is_error: Callable[[List[Dict]], bool] = lambda res: False
+) -> Tuple[List[Dict], Dict]:
+    # analyze(spec) -> «сырые» issues в формате Spectral (path — список).
+    # Возвращает (issues по всей спеке, статистика new/fixed/unchanged).
+    units = SpecUnits(spec)
+    current = units.hashes()
+    state_key = content_hash("static", key, analyzer)
+    prev = incremental_cache.get(state_key) or {}
+    prev_units: Dict[str, str] = prev.get("units", {})
+    prev_issues: Dict[str, List[Dict]] = prev.get("issues", {})
+
+    changed_paths = [p for p, h in units.paths.items() if prev_units.get(_path_unit(p)) != h]
+    changed_components = [u for u, h in units.components.items() if prev_units.get(u) != h]
+    if not prev:
+        fresh = analyze(spec)
+        recomputed = set(current)
+    else:
+        # Изменившиеся пути + изменившиеся компоненты (в т.ч. ни на что не завязанные);
+        # sub_spec сам дотянет их $ref-замыкание и глобальную часть спеки
+        fresh, recomputed = [], set()
+        if changed_paths or changed_components or prev_units.get(GLOBAL_UNIT) != units.globals:
+            roots = [{"$ref": "#/components/" + u[2:]} for u in changed_components]
+            part = sub_spec(spec, changed_paths, extra_components=roots)
+            fresh = analyze(part)
+            recomputed = {_path_unit(p) for p in changed_paths} | {GLOBAL_UNIT}
+            for section, items in (part.get("components") or {}).items():
+                if section != "securitySchemes":
+                    recomputed.update(_component_unit(section, name) for name in items)
+
+    by_unit: Dict[str, List[Dict]] = {}
+    for i in fresh:
+        if isinstance(i, dict):
+            by_unit.setdefault(unit_of(i.get("path")), []).append(i)
+    issues_by_unit = {
+        unit: by_unit.get(unit, []) if unit in recomputed else prev_issues.get(unit, [])
+        for unit in current
+    }
+    issues = [i for unit in current for i in issues_by_unit[unit]]
+
+    if not is_error(fresh):
+        incremental_cache.put(state_key, {
+            "units": current,
+            "issues": {u: found for u, found in issues_by_unit.items() if found}
+        })
+
+    before = {_issue_key(i) for found in prev_issues.values() for i in found}
+    after = {_issue_key(i) for i in issues}
+    fixed = [i for found in prev_issues.values() for i in found if _issue_key(i) not in after]
+    stats = {
+        "baseline": not prev,
+        "units": len(current),
+        "changed_paths": len(changed_paths),
+        "changed_components": len(changed_components),
+        "reused_units": len(current) - len(recomputed & set(current)),
+        "new": len(after - before),
+        "fixed": len({_issue_key(i) for i in fixed}),
+        "unchanged": len(after & before),
+        "fixed_issues": fixed[:50]
+    }
+    return issues, stats
+
+
+def reuse_plugins(key: str, spec_hash: str, names: List[str]) -> Tuple[Dict[str, List[Dict]], List[str]]:
+    # Плагины — чёрный ящик над всей спекой: находки не привязаны к единицам спеки,
+    # а плагин вправе смотреть на спеку целиком (например, «хоть один путь без авторизации»).
+    # Поэтому по кускам их не гоняем: результат переиспользуем, только если не изменились
+    # ни спека целиком, ни код плагина. (готовые результаты, кого нужно запустить)
+    state = incremental_cache.get(content_hash("plugins", key)) or {}
+    reused, todo = {}, []
+    for name in names:
+        try:
+            plugin = plugin_registry.get(name)
+        except Exception:
+            plugin = None
+        entry = state.get(name)
+        if (
+            plugin is not None and entry is not None
+            and entry["digest"] == plugin.digest and entry["spec_hash"] == spec_hash
+        ):
+            reused[name] = entry["issues"]
+        else:
+            todo.append(name)
+    return reused, todo
+
+
+def save_plugins(key: str, spec_hash: str, results: Dict[str, List[Dict]]):
+    state_key = content_hash("plugins", key)
+    state = incremental_cache.get(state_key) or {}
+    for name, issues in results.items():
+        try:
+            plugin = plugin_registry.get(name)
+        except Exception:
+            continue
+        if plugin is None or plugin.error is not None:
+            continue
+        if any(i.get("code") == "PLUGIN_BLOCKED" for i in issues):
+            continue  # таймауты и падения не кэшируем
+        state[name] = {"digest": plugin.digest, "spec_hash": spec_hash, "issues": issues}
+    incremental_cache.put(state_key, state)
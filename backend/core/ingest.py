@@ -0,0 +1,140 @@
+# backend/core/ingest.py
+import os
+import json
+import uuid
+import contextlib
+from typing import Dict, Iterator, Optional
+import yaml
+from core.config import settings
+from core.cache import content_hash
+
+# libyaml (C) в разы быстрее чистого Python-парсера; если PyYAML собран без него — fallback
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+READ_CHUNK = 1024 * 1024
+
+
+class SpecError(Exception):
+    # Ошибка получения спеки — app.py превращает её в HTTPException
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _too_large() -> SpecError:
+    return SpecError(413, f"Spec too large (limit {settings.max_spec_bytes} bytes)")
+
+
+def detect_format(raw: bytes, filename: Optional[str] = None) -> str:
+    if filename and filename.lower().endswith((".yaml", ".yml")):
+        return "yaml"
+    if filename and filename.lower().endswith(".json"):
+        return "json"
+    return "json" if raw.lstrip()[:1] in (b"{", b"[") else "yaml"
+
+
+def parse_spec(raw: bytes, filename: Optional[str] = None) -> Dict:
+    fmt = detect_format(raw, filename)
+    try:
+        if fmt == "json":
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                # JSON — подмножество YAML: спека с расширением .json, но в YAML
+                data = yaml.load(raw, Loader=YamlLoader)
+        else:
+            data = yaml.load(raw, Loader=YamlLoader)
+    except yaml.YAMLError as e:
+        raise SpecError(400, f"Invalid spec: {str(e)[:200]}")
+    if not isinstance(data, dict):
+        raise SpecError(400, "Invalid spec: expected an object")
+    return data
+
+
+class Spec:
+    # Спека скана: разобрана один раз (data), рядом — исходные байты (raw).
+    # Инструментам отдаются исходные байты, а не повторная сериализация data.
+    __slots__ = ("data", "raw", "format", "_hash")
+
+    def __init__(self, data: Dict, raw: Optional[bytes] = None, format: str = "json"):
+        self.data = data
+        self.raw = raw
+        self.format = format
+        self._hash = None
+
+    def hash(self) -> str:
+        # Хэш содержимого, не зависит от форматирования и JSON/YAML
+        if self._hash is None:
+            self._hash = content_hash(self.data)
+        return self._hash
+
+    @classmethod
+    def parse(cls, raw: bytes, filename: Optional[str] = None) -> "Spec":
+        if len(raw) > settings.max_spec_bytes:
+            raise _too_large()
+        return cls(parse_spec(raw, filename), raw, detect_format(raw, filename))
+
+    def bytes(self) -> bytes:
+        # Спека, собранная из dict без исходных байт, сериализуется один раз
+        if self.raw is None:
+            self.raw = json.dumps(self.data).encode("utf-8")
+            self.format = "json"
+        return self.raw
+
+    @contextlib.contextmanager
+    def file(self) -> Iterator[str]:
+        # Файл для CLI-инструментов (Spectral) — на tmpfs, если он есть
+        path = os.path.join(settings.spec_tmp_dir, f"spec_{uuid.uuid4().hex}.{self.format}")
+        try:
+            with open(path, "wb") as f:
+                if self.raw is not None:
+                    f.write(self.raw)
+                else:
+                    # Без исходных байт пишем потоково, не собирая строку в памяти
+                    json.dump(self.data, _TextWriter(f))
+            yield path
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+class _TextWriter:
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, s: str):
+        self._f.write(s.encode("utf-8"))
+
+
+async def read_upload(upload, limit: Optional[int] = None) -> bytes:
+    # Читаем загрузку кусками и обрываем, как только превышен лимит
+    limit = limit or settings.max_spec_bytes
+    size = getattr(upload, "size", None)
+    if size is not None and size > limit:
+        raise _too_large()
+    chunks, total = [], 0
+    while True:
+        chunk = await upload.read(READ_CHUNK)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > limit:
+            raise _too_large()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def read_stream(response, limit: Optional[int] = None) -> bytes:
+    # То же для потокового ответа httpx (загрузка спеки по URL)
+    limit = limit or settings.max_spec_bytes
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > limit:
+        raise _too_large()
+    chunks, total = [], 0
+    async for chunk in response.aiter_bytes(READ_CHUNK):
+        total += len(chunk)
+        if total > limit:
+            raise _too_large()
+        chunks.append(chunk)
+    return b"".join(chunks)
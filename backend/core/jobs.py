@@ -0,0 +1,288 @@
+# backend/core/jobs.py
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import Optional, List, Dict, Tuple
+from core.config import settings
+from core.ingest import Spec
+from core.pipeline import run_analysis, fetch_spec
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    target_url TEXT,
+    spec BLOB,
+    options TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    batch_id TEXT,
+    name TEXT,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id, created_at);
+
+CREATE TABLE IF NOT EXISTS job_stages (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class JobQueue:
+    # Персистентная очередь задач сканирования + ограниченный пул воркеров.
+    # Задачи лежат в SQLite, поэтому после рестарта бэкенда подхватываются снова.
+    # Взятая задача арендуется процессом (owner, lease_until), аренда продлевается heartbeat-ом:
+    # другой процесс заберёт задачу, только если аренда истекла, т.е. владелец умер.
+    # Результат каждой завершённой стадии (и каждого плагина) сохраняется в job_stages:
+    # прерванная задача продолжается с того места, где остановилась.
+    def __init__(self, db_path: str, workers: int, lease: float = 60.0):
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def start(self):
+        if self._threads:
+            return
+        # Задачи упавших процессов не сбрасываются здесь: _claim заберёт их, когда истечёт аренда
+        self._stop.clear()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"scan-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="scan-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout=1)
+        self._threads = []
+
+    def submit(
+        self,
+        spec: Optional[Spec],
+        target_url: Optional[str],
+        options: Dict
+    ) -> str:
+        # options — именованные аргументы run_analysis (dynamic_scan, selected_plugins, deep)
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, created_at, target_url, spec, options) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (
+                    job_id, time.time(), target_url,
+                    # Храним исходные байты — без повторной сериализации (BLOB в колонке spec)
+                    spec.bytes() if spec is not None else None,
+                    json.dumps(options)
+                )
+            )
+        self._wakeup.set()
+        return job_id
+
+    def submit_batch(self, items: List[Tuple[str, bytes]], options: Dict) -> str:
+        # Пакет спек — задачи в общей очереди с одним batch_id, одной транзакцией.
+        # Спеки не разбираются заранее: битая спека станет упавшей задачей своего пакета.
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        rows = [
+            (
+                uuid.uuid4().hex, now + n * 1e-6, raw, json.dumps(options), batch_id, name
+            )
+            for n, (name, raw) in enumerate(items)
+        ]
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO jobs (id, status, created_at, spec, options, batch_id, name) "
+                    "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                    rows
+                )
+                db.execute("COMMIT")
+            except:
+                db.execute("ROLLBACK")
+                raise
+        self._wakeup.set()
+        return batch_id
+
+    def batch(self, batch_id: str) -> List[Dict]:
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT id, name, status, result, error FROM jobs WHERE batch_id = ? ORDER BY created_at",
+                (batch_id,)
+            ).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            jobs.append(job)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT id, status, created_at, started_at, finished_at, target_url, result, error "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job["status"] in ("queued", "running"):
+                job["stages_done"] = [
+                    r["stage"] for r in db.execute(
+                        "SELECT stage FROM job_stages WHERE job_id = ? ORDER BY finished_at", (job_id,)
+                    )
+                ]
+            if job["status"] == "queued":
+                job["position"] = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                    (job["created_at"],)
+                ).fetchone()[0]
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        # Глубина очереди для /metrics
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE status IN ('queued', 'running') GROUP BY status"
+            ).fetchall()
+        return {"queued": 0, "running": 0, **{r["status"]: r["n"] for r in rows}}
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        # BEGIN IMMEDIATE — чтобы два воркера (или два процесса uvicorn) не взяли одну задачу.
+        # running с истёкшей арендой — задача умершего процесса
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    if row["status"] == "running":
+                        logger.warning(f"Job {row['id']} lease of {row['owner']} expired, taking over")
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_until = ? WHERE id = ?",
+                        (now, self.owner, now + self.lease, row["id"])
+                    )
+                db.execute("COMMIT")
+                return row
+            except:
+                db.execute("ROLLBACK")
+                raise
+
+    def _heartbeat(self):
+        # Продлеваем аренду всех задач процесса, пока он жив
+        while not self._stop.wait(self.lease / 3):
+            try:
+                with closing(self._connect()) as db:
+                    db.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                        (time.time() + self.lease, self.owner)
+                    )
+            except Exception as e:
+                logger.error(f"Job lease heartbeat failed: {e}")
+
+    def _checkpoints(self, job_id: str) -> Dict:
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT stage, result FROM job_stages WHERE job_id = ?", (job_id,)).fetchall()
+        return {r["stage"]: json.loads(r["result"]) for r in rows}
+
+    def _checkpoint(self, job_id: str, stage: str, result):
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO job_stages (job_id, stage, finished_at, result) VALUES (?, ?, ?, ?)",
+                (job_id, stage, time.time(), json.dumps(result))
+            )
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Аренду могли перехватить (процесс завис дольше lease): результат пишет новый владелец
+                updated = db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, spec = NULL, lease_until = NULL "
+                    "WHERE id = ? AND owner = ?",
+                    (status, time.time(), json.dumps(result) if result is not None else None, error, job_id, self.owner)
+                ).rowcount
+                if updated:
+                    db.execute("DELETE FROM job_stages WHERE job_id = ?", (job_id,))
+                else:
+                    logger.warning(f"Job {job_id} was taken over by another process, result dropped")
+                db.execute("COMMIT")
+            except:
+                db.execute("ROLLBACK")
+                raise
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.error(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+
+            try:
+                spec = job["spec"]
+                if spec is None:
+                    spec = fetch_spec(job["target_url"])
+                else:
+                    spec = Spec.parse(spec, job["name"])
+                options = json.loads(job["options"])
+                restored = self._checkpoints(job["id"])
+                if restored:
+                    logger.info(f"Job {job['id']} resumed, restored: {', '.join(sorted(restored))}")
+                result = run_analysis(
+                    spec, target_url=job["target_url"], scan_id=job["id"], restored=restored,
+                    on_checkpoint=lambda stage, res: self._checkpoint(job["id"], stage, res),
+                    **options
+                )
+                result["id"] = job["id"]
+                self._finish(job["id"], "done", result=result)
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {e}")
+                self._finish(job["id"], "failed", error=str(e)[:500])
+
+
+job_queue = JobQueue(settings.jobs_db, settings.scan_workers, settings.job_lease)
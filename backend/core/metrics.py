@@ -0,0 +1,225 @@
+# backend/core/metrics.py
+# Метрики в текстовом формате Prometheus (GET /metrics) без внешних зависимостей:
+# время стадий и плагинов, CPU/RSS дочерних процессов (rusage), кэши, очереди, лаг event loop.
+import asyncio
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+RSS_BUCKETS = tuple(mb * 1024 * 1024 for mb in (16, 32, 64, 128, 256, 512, 1024, 2048, 4096))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Labels, List[float]] = {}  # counts по бакетам + [sum, count]
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for key, row in items:
+            acc = 0
+            for bound, n in zip(self.buckets, row):
+                acc += n
+                le = 'le="%s"' % _num(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {acc}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_num(row[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {row[-1]}")
+        return lines
+
+
+class Callback(_Metric):
+    # Значения берутся в момент скрейпа: fn() -> {labels: value}
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], fn: Callable[[], Dict[Labels, float]], type: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.fn = fn
+        self.type = type
+
+    def render(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.error(f"Metric {self.name} failed: {e}")
+            return []
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, k)} {_num(v)}" for k, v in sorted(values.items()) if v is not None
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.add(Histogram("vtb_stage_duration_seconds", "Wall time of pipeline stages", ("stage", "status")))
+plugin_seconds = registry.add(Histogram("vtb_plugin_duration_seconds", "Wall time of a single plugin run", ("plugin",)))
+scan_seconds = registry.add(Histogram("vtb_scan_duration_seconds", "Wall time of a whole scan", ("mode",)))
+process_seconds = registry.add(Histogram("vtb_process_duration_seconds", "Wall time of external tool processes", ("tool",)))
+process_cpu = registry.add(Counter("vtb_process_cpu_seconds_total", "User+system CPU of external tool processes (rusage)", ("tool",)))
+process_rss = registry.add(Histogram("vtb_process_max_rss_bytes", "Peak RSS of external tool processes (rusage)", ("tool",), RSS_BUCKETS))
+process_runs = registry.add(Counter("vtb_process_runs_total", "External tool processes by outcome", ("tool", "outcome")))
+loop_lag = registry.add(Histogram("vtb_event_loop_lag_seconds", "Event loop scheduling delay", (), LAG_BUCKETS))
+
+
+# Учёт по скану: стадия собирает rusage своих процессов, скан — время своих плагинов.
+# ContextVar, а не thread-local: пулы потоков внутри стадий запускают задачи через submit() ниже.
+_stage_usage: "contextvars.ContextVar[Optional[Dict]]" = contextvars.ContextVar("stage_usage", default=None)
+_plugin_times: "contextvars.ContextVar[Optional[Dict]]" = contextvars.ContextVar("plugin_times", default=None)
+_usage_lock = threading.Lock()
+
+
+def submit(pool, fn, *args, **kwargs):
+    # pool.submit с контекстом вызывающего потока
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+@contextlib.contextmanager
+def stage_usage(usage: Optional[Dict] = None) -> Iterator[Dict]:
+    # Процессы, запущенные внутри блока (и в пулах через submit), добавляют сюда свой rusage
+    if usage is None:
+        usage = {"processes": 0, "cpu": 0.0, "max_rss": 0}
+    token = _stage_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _stage_usage.reset(token)
+
+
+@contextlib.contextmanager
+def plugin_times() -> Iterator[Dict[str, float]]:
+    times: Dict[str, float] = {}
+    token = _plugin_times.set(times)
+    try:
+        yield times
+    finally:
+        _plugin_times.reset(token)
+
+
+def record_process(tool: str, elapsed: float, rusage, outcome: str):
+    process_seconds.observe(elapsed, tool)
+    process_runs.inc(tool, outcome)
+    if rusage is None:
+        return
+    cpu = rusage.ru_utime + rusage.ru_stime
+    rss = rusage.ru_maxrss * 1024  # Linux: килобайты
+    process_cpu.inc(tool, value=cpu)
+    process_rss.observe(rss, tool)
+    usage = _stage_usage.get()
+    if usage is None:
+        return
+    with _usage_lock:
+        usage["processes"] += 1
+        usage["cpu"] += cpu
+        usage["max_rss"] = max(usage["max_rss"], rss)
+
+
+def record_plugin(name: str, elapsed: float):
+    plugin_seconds.observe(elapsed, name)
+    times = _plugin_times.get()
+    if times is not None:
+        times[name] = round(elapsed, 4)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = (), type: str = "gauge"):
+    # Декоратор: функция возвращает {labels: value} или одно число
+    def register(fn):
+        def values():
+            v = fn()
+            return v if isinstance(v, dict) else {(): v}
+        registry.add(Callback(name, help, labels, values, type))
+        return fn
+    return register
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    # Насколько позже запланированного просыпается event loop — блокирующий код в async-обработчиках
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(0.0, loop.time() - start - interval))
@@ -0,0 +1,354 @@
+# backend/core/pipeline.py
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import Any, Callable, Optional, List, Dict
+from urllib.parse import urlparse
+from core.config import settings
+from core import metrics
+from core.ingest import Spec
+from core.fetch import spec_fetcher
+from core.dns import resolver
+from core.store import scan_store
+from core.plugin_pool import plugin_pool
+from core.utils import format_spectral_issues, is_spectral_error
+from core.sharding import lint_spec
+from core.rules import run_native_rules
+from core.findings import FindingIndex
+from core.incremental import api_key, incremental_static, reuse_plugins, save_plugins
+from core.stages import Retry, Stage, StageFailed, run_stage_graph
+from core.scheduler import scheduler
+from tools.api_scanner import run_api_scanner
+from tools.kiterunner import run_kiterunner
+from tools.zap import run_zap_scan
+from tools.newman import run_newman_stream
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_spec(target_url: str) -> Spec:
+    # Синхронная обёртка для воркеров очереди; кэш и single-flight — в core/fetch.py
+    return spec_fetcher.fetch_sync(target_url)
+
+
+STATIC_STAGES = ("static", "plugins")
+DYNAMIC_STAGES = ("api_scanner", "kiterunner", "zap", "newman")
+
+
+def _stage_error(code: str) -> Callable[[str], List[Dict]]:
+    return lambda msg: [{"code": code, "message": msg[:200], "severity": "high"}]
+
+
+# Повтор стадии при сбое инструмента: попыток всего и начальная пауза (растёт экспоненциально).
+# Плагины не повторяются (их ошибки детерминированы), Newman повторяет упавшие пачки сам.
+STAGE_RETRIES = {
+    "static": Retry(2, wait=2),
+    "api_scanner": Retry(2, wait=2),
+    "kiterunner": Retry(2, wait=5),
+    "zap": Retry(2, wait=10),
+}
+TOOL_ERRORS = {
+    "static": ("SPECTRAL_ERROR", "SPECTRAL_ERR"),
+    "api_scanner": ("SCANNER_ERROR",),
+    "kiterunner": ("KITE_EX", "KITE_ERROR"),
+    "zap": ("ZAP_EX", "ZAP_NO_REPORT"),
+}
+
+
+def _checked(stage: str, issues: List[Dict]) -> List[Dict]:
+    # Инструменты не бросают исключений, а возвращают ошибку находкой.
+    # Одни ошибки и ни одной находки — стадия не удалась, её стоит повторить.
+    errors = TOOL_ERRORS.get(stage, ())
+    if issues and all(i.get("code") in errors for i in issues):
+        raise StageFailed(str(issues[0].get("message", "tool error")), issues)
+    return issues
+
+
+# emit(event, data) — колбэк прогресса для стриминга (SSE в app.py):
+#   "stage"  — {"stage", "status": started|done|failed|timeout|cancelled, "elapsed", "done", "total"[, "usage", "restored"]}
+#              usage — {"processes", "cpu", "max_rss"} внешних процессов стадии (rusage)
+#   "issues" — {"stage", "issues"[, "plugin"]} сразу по готовности стадии/плагина,
+#              только новые находки (повторы сливаются в FindingIndex)
+Emit = Callable[[str, Dict[str, Any]], None]
+STAGE_ORDER = STATIC_STAGES + DYNAMIC_STAGES
+
+
+def build_stages(
+    spec: Spec,
+    target_url: Optional[str],
+    dynamic_scan: bool,
+    selected_plugins: List[str],
+    deep: bool,
+    meta: Dict,
+    on_plugin: Optional[Callable[[str, List[Dict]], None]] = None,
+    incremental: bool = False,
+    restored: Optional[Dict[str, Any]] = None,
+    client: Optional[str] = None
+) -> List[Stage]:
+    # on_plugin(name, issues) — находки каждого плагина по мере готовности;
+    # результат стадии plugins — все они в порядке selected_plugins
+    # Статика, плагины и динамические сканеры независимы друг от друга;
+    # Newman проверяет пути, найденные Kiterunner, по мере их появления.
+    # restored — чекпойнт прошлого запуска: "plugin:<name>" — находки отдельных плагинов.
+    restored = restored or {}
+    spec_data = spec.data
+    key = api_key(spec_data, target_url)
+    if incremental and key is None:
+        incremental = False
+        meta["incremental"] = {"skipped": "no target_url and no info.title to match the previous scan"}
+
+    def static(deps, cancel):
+        # По умолчанию — встроенные правила без запуска процессов; deep — полный Spectral
+        if incremental:
+            if deep:
+                analyze = lambda part: lint_spec(part, cancel=cancel)[0]
+            else:
+                analyze = run_native_rules
+            raw, stats = incremental_static(
+                spec_data, key, analyze, "spectral" if deep else "native", is_error=is_spectral_error
+            )
+            meta.setdefault("incremental", {}).update(stats)
+            return _checked("static", format_spectral_issues(raw))
+        if not deep:
+            return format_spectral_issues(run_native_rules(spec_data))
+        spectral_res, hit, shards = lint_spec(spec_data, cancel=cancel, source=spec)
+        meta.setdefault("cache", {})["spectral"] = "hit" if hit else "miss"
+        if shards > 1:
+            meta["spectral_shards"] = shards
+        return _checked("static", format_spectral_issues(spectral_res))
+
+    def plugins(deps, cancel):
+        names = [n for n in selected_plugins if f"plugin:{n}" not in restored]
+        reused = {n: restored[f"plugin:{n}"] for n in selected_plugins if f"plugin:{n}" in restored}
+        fresh = {}
+        if incremental and names:
+            cached, names = reuse_plugins(key, spec.hash(), names)
+            reused.update(cached)
+            # Плагины переиспользуются только при неизменной спеке целиком (core/incremental.py)
+            meta.setdefault("incremental", {}).update(reused_plugins=len(reused), rerun_plugins=len(names))
+
+        def on_result(name, issues):
+            fresh[name] = issues
+            if on_plugin is not None:
+                on_plugin(name, issues)
+
+        if on_plugin is not None:
+            for name, issues in reused.items():
+                on_plugin(name, issues)
+        plugin_pool.run(names, spec_data, on_result=on_result, spec_bytes=spec.bytes() if names else None)
+        if incremental and fresh:
+            save_plugins(key, spec.hash(), fresh)
+        by_name = {**reused, **fresh}
+        return [i for name in selected_plugins for i in by_name.get(name, [])]
+
+    stages = [
+        Stage(
+            "static", static, on_error=_stage_error("SPECTRAL_ERR" if deep else "RULES_ERR"),
+            retry=STAGE_RETRIES["static"] if deep else None
+        ),
+        Stage("plugins", plugins, on_error=_stage_error("PLUGIN_BLOCKED")),
+    ]
+    if not (dynamic_scan and target_url):
+        return stages
+
+    # Цель динамического скана проверяем и фиксируем один раз: api_scanner, kiterunner
+    # и Newman ходят на этот IP (Host — исходного хоста). ZAP так не закрепить: общий демон
+    # сам резолвит хосты всего, что нашёл паук, и подмены адреса на один скан в его API нет —
+    # поэтому перед запуском каждого инструмента хост перепроверяется по кэшу DNS
+    host = urlparse(target_url).hostname
+    pinned_ip = resolver.pin_sync(host)
+
+    def guarded(fn):
+        def run(deps, cancel):
+            if pinned_ip is None or resolver.pin_sync(host) is None:
+                raise ValueError(f"Target host {host} is blocked")
+            return fn(deps, cancel)
+        return run
+
+    # Тяжёлые инструменты запускаются через планировщик: слоты на инструмент и на хост,
+    # очередь по кругу между клиентами (core/scheduler.py)
+    def slot(tool, cancel):
+        return scheduler.slot(tool, host, client, cancel)
+
+    @guarded
+    def api_scanner(deps, cancel):
+        with slot("api_scanner", cancel):
+            issues = run_api_scanner(
+                target_url, cancel=cancel, concurrency=settings.probe_concurrency, pin_ip=pinned_ip
+            ).get("issues", [])
+        return _checked("api_scanner", issues)
+
+    # Kiterunner и Newman идут одновременно: найденные пути сразу уходят в очередь,
+    # Newman проверяет их пачками, не дожидаясь конца перебора (None — перебор закончен,
+    # кладётся в on_finish стадии: после всех повторов, отмены или восстановления из чекпойнта)
+    found: "queue.Queue[Optional[str]]" = queue.Queue()
+    base = f"{urlparse(target_url).scheme}://{urlparse(target_url).netloc}"
+
+    def on_endpoint(ep):
+        path = ep["path"]
+        if path.startswith("/") and ".." not in path and not path.startswith("/etc") and not path.startswith("/proc"):
+            found.put(base + path)
+
+    # Kiterunner уже отработал в прошлом запуске, а Newman — нет: пути берём из чекпойнта
+    if "kiterunner" in restored and "newman" not in restored:
+        for i in restored["kiterunner"] or []:
+            if i.get("code") == "KITE_FOUND" and i.get("endpoint"):
+                on_endpoint({"path": i["endpoint"]})
+
+    @guarded
+    def kiterunner(deps, cancel):
+        with slot("kiterunner", cancel):
+            issues = run_kiterunner(target_url, cancel=cancel, on_endpoint=on_endpoint, pin_ip=pinned_ip)
+        return _checked("kiterunner", issues)
+
+    @guarded
+    def zap(deps, cancel):
+        with slot("zap", cancel):
+            issues = run_zap_scan(target_url, cancel=cancel)
+        return _checked("zap", issues)
+
+    @guarded
+    def newman(deps, cancel):
+        failures = run_newman_stream(
+            found, cancel=cancel, batch_size=settings.newman_batch_size,
+            workers=settings.newman_workers, batch_wait=settings.newman_batch_wait,
+            slot=lambda: slot("newman", cancel), pin_ip=pinned_ip
+        )
+        return [{
+            "code": "NEWMAN_FAIL",
+            "message": fail.get("error", {}).get("message", "Test failed")[:200],
+            "severity": "high",
+            "endpoint": (fail.get("source") or {}).get("name"),
+            "method": "GET"
+        } for fail in failures]
+
+    return stages + [
+        Stage("api_scanner", api_scanner, on_error=_stage_error("SCANNER_ERROR"), retry=STAGE_RETRIES["api_scanner"]),
+        Stage(
+            "kiterunner", kiterunner, on_error=_stage_error("KITE_EX"),
+            retry=STAGE_RETRIES["kiterunner"], on_finish=lambda: found.put(None)
+        ),
+        Stage("zap", zap, on_error=_stage_error("ZAP_EX"), retry=STAGE_RETRIES["zap"]),
+        Stage("newman", newman, on_error=_stage_error("NEWMAN_FAIL")),
+    ]
+
+
+def run_analysis(
+    spec: Spec,
+    target_url: Optional[str] = None,
+    dynamic_scan: bool = False,
+    selected_plugins: List[str] = (),
+    deep: bool = False,
+    emit: Optional[Emit] = None,
+    cancel: Optional[threading.Event] = None,
+    scan_id: Optional[str] = None,
+    incremental: bool = False,
+    restored: Optional[Dict[str, Any]] = None,
+    on_checkpoint: Optional[Callable[[str, Any], None]] = None,
+    client: Optional[str] = None,
+    timings: bool = False
+) -> Dict:
+    # Синхронный пайплайн: вызывается из пула потоков или воркера очереди.
+    # Полный список находок сохраняется в историю (core/store.py), в ответе — первые 50.
+    # on_checkpoint(key, issues) — результат каждой успешной стадии и каждого плагина
+    # ("plugin:<name>"); переданные обратно в restored, они не выполняются повторно.
+    # client — кто запустил скан: планировщик делит между клиентами слоты тяжёлых инструментов.
+    # timings — добавить в ответ блок timings: время и rusage стадий, время плагинов.
+    started = time.monotonic()
+    restored = restored or {}
+    selected_plugins = list(selected_plugins)
+    meta = {}
+    # Находки всех стадий сливаются по отпечатку сразу по мере поступления
+    index = FindingIndex()
+
+    def publish(stage: str, tool: str, issues: List[Dict], rank: int, extra: Optional[Dict] = None):
+        fresh = index.add(issues, tool, "dynamic" if stage in DYNAMIC_STAGES else "static", rank)
+        if emit is not None:
+            emit("issues", {"stage": stage, **(extra or {}), "issues": fresh})
+
+    def on_plugin(name, issues):
+        rank = STAGE_ORDER.index("plugins") * 10000 + selected_plugins.index(name)
+        publish("plugins", f"plugin:{name}", issues, rank, {"plugin": name})
+        # Заблокированный плагин мог упасть по таймауту — такой результат не фиксируем
+        if not any(i.get("code") == "PLUGIN_BLOCKED" for i in issues if isinstance(i, dict)):
+            checkpoint(f"plugin:{name}", issues)
+
+    def checkpoint(key, issues):
+        if on_checkpoint is None or key in restored:
+            return
+        try:
+            on_checkpoint(key, issues)
+        except Exception as e:
+            logger.error(f"Checkpoint {key} not saved: {e}")
+
+    stage_timings = {}
+
+    def on_event(event, data):
+        data = dict(data)
+        stage_issues = data.pop("result", None)
+        if data["status"] != "started":
+            stage_timings[data["stage"]] = {
+                "status": data["status"], "elapsed": data["elapsed"], **data.get("usage", {}),
+                **({"restored": True} if data.get("restored") else {})
+            }
+        if emit is not None:
+            emit(event, data)
+        # Плагины отдают находки сами, по одному; если стадия плагинов упала целиком — берём её ошибку
+        if data["status"] != "started" and (data["stage"] != "plugins" or data["status"] != "done"):
+            tool = ("spectral" if deep else "rules") if data["stage"] == "static" else data["stage"]
+            publish(data["stage"], tool, stage_issues or [], STAGE_ORDER.index(data["stage"]) * 10000)
+        if data["status"] == "done" and data["stage"] != "plugins":
+            checkpoint(data["stage"], stage_issues)
+
+    with metrics.plugin_times() as plugin_timings:
+        run_stage_graph(
+            build_stages(spec, target_url, dynamic_scan, selected_plugins, deep, meta, on_plugin, incremental, restored, client),
+            deadline=settings.scan_deadline,
+            cancel=cancel,
+            on_event=on_event,
+            restored={k: v for k, v in restored.items() if k in STAGE_ORDER and k != "plugins"}
+        )
+
+    all_issues = index.findings()
+
+    counts = {"critical": 0, "high": 0, "medium": 0, "low": 0, "info": 0}
+    for i in all_issues:
+        sev = i.get("severity", "info").lower()
+        if sev in counts:
+            counts[sev] += 1
+
+    result = {
+        "id": scan_id or uuid.uuid4().hex,
+        "total": len(all_issues),
+        "truncated": len(all_issues) > 50,
+        "issues": all_issues[:50],
+        # Динамические находки — внутри issues (source: "dynamic"), здесь только их число
+        "dynamic_total": sum(1 for i in all_issues if i["source"] == "dynamic"),
+        "duplicates_merged": index.merged,
+        "ai_insights": [{"code": "AI_DISABLED", "message": "Grok AI отключён в коде", "severity": "info"}],
+        "summary": counts,
+        "plugins_used": selected_plugins + ["Spectral" if deep else "OWASP rules", "Kiterunner", "api_scanner", "ZAP", "Newman"],
+        "cache": meta.get("cache", {})
+    }
+    if "spectral_shards" in meta:
+        result["spectral_shards"] = meta["spectral_shards"]
+    if "incremental" in meta:
+        result["incremental"] = meta["incremental"]
+    elapsed = time.monotonic() - started
+    metrics.scan_seconds.observe(elapsed, "dynamic" if dynamic_scan and target_url else "deep" if deep else "static")
+    if timings:
+        # Плагины, взятые из чекпойнта или инкрементального кэша, в plugins не попадают
+        result["timings"] = {
+            "total": round(elapsed, 3),
+            "stages": {name: stage_timings[name] for name in STAGE_ORDER if name in stage_timings},
+            "plugins": dict(plugin_timings)
+        }
+
+    try:
+        scan_store.save(result, all_issues, spec.hash(), target_url)
+    except Exception as e:
+        # История — не повод терять результат скана
+        logger.error(f"Scan store error: {e}")
+    return result
@@ -0,0 +1,228 @@
+# backend/core/plugin_pool.py
+import json
+import time
+import uuid
+import queue
+import signal
+import logging
+import resource
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+from core.config import settings
+from core import metrics
+from core.plugins import plugin_registry
+from core.security import blocked_plugin_issue
+
+logger = logging.getLogger(__name__)
+
+
+class PluginTimeout(Exception):
+    pass
+
+
+def _on_sigxcpu(signum, frame):
+    raise PluginTimeout("CPU time limit exceeded")
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _worker_main(conn, memory_limit: int):
+    # Процесс-воркер: держит скомпилированные плагины (по sha256) и спеку текущего скана.
+    # Сообщение: (name, digest, source|None, spec_key, spec_bytes|None, cpu_limit)
+    # Ответ: (issues, digest скомпилирован, spec_key загруженной спеки|None) —
+    # родитель по нему знает, что досылать, даже если компиляция или разбор упали
+    from core.security import compile_plugin, exec_plugin, blocked_plugin_issue
+    from core.plugins import SpecView, plugin_json
+    from core.ingest import parse_spec
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    if memory_limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+
+    codes = {}
+    view = None
+    loaded = None
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        name, digest, source, spec_key, spec_bytes, cpu_limit = msg
+        try:
+            if source is not None:
+                codes[digest] = compile_plugin(source, f"{name}.py")
+            if spec_bytes is not None:
+                view, loaded = None, None  # отпускаем прошлую спеку до разбора новой — держим в памяти одну
+                view = SpecView(parse_spec(spec_bytes))
+                loaded = spec_key
+            if loaded != spec_key:
+                raise ValueError("spec is not loaded in the worker")
+            # RLIMIT_CPU считает время процесса целиком — сдвигаем мягкий лимит на каждый плагин
+            soft = int(_cpu_used() + cpu_limit) + 1
+            if cpu_hard != resource.RLIM_INFINITY:
+                soft = min(soft, cpu_hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard))
+            try:
+                issues = exec_plugin(codes[digest], view, name, json_module=plugin_json)
+            finally:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+        except Exception as e:
+            issues = [blocked_plugin_issue(name, e)]
+        try:
+            conn.send((issues, digest in codes, loaded))
+        except Exception as e:
+            conn.send(([blocked_plugin_issue(name, ValueError(f"bad result: {e}"))], digest in codes, loaded))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit: int):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, memory_limit), daemon=True)
+        self.proc.start()
+        child.close()
+        self.digests = set()  # какие плагины воркер уже скомпилировал
+        self.spec_key = None  # спека какого скана у него загружена
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.join(timeout=1)
+        finally:
+            self.conn.close()
+
+
+class PluginPool:
+    # Заранее запущенные процессы для плагинов: плагины скана идут параллельно,
+    # у каждого лимит CPU (RLIMIT_CPU), памяти (RLIMIT_AS) и wall-clock дедлайн.
+    # Зависший воркер убивается и заменяется новым.
+    def __init__(self, size: int, cpu_limit: int, memory_limit_mb: int, timeout: float):
+        self.size = size
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._workers or self.size <= 0:
+                return
+            for _ in range(self.size):
+                w = _Worker(self._ctx, self.memory_limit)
+                self._workers.append(w)
+                self._idle.put(w)
+
+    def stop(self):
+        with self._lock:
+            for w in self._workers:
+                try:
+                    w.conn.send(None)
+                except Exception:
+                    pass
+                w.kill()
+            self._workers = []
+            self._idle = queue.Queue()
+
+    def snapshot(self) -> Dict:
+        return {"workers": len(self._workers), "idle": self._idle.qsize()}
+
+    def _replace(self, w: _Worker) -> _Worker:
+        w.kill()
+        fresh = _Worker(self._ctx, self.memory_limit)
+        with self._lock:
+            self._workers = [fresh if x is w else x for x in self._workers]
+        return fresh
+
+    def _run_one(self, plugin, spec_key: str, spec_bytes: bytes) -> List[Dict]:
+        w = self._idle.get()
+        try:
+            w.conn.send((
+                plugin.name, plugin.digest,
+                plugin.source if plugin.digest not in w.digests else None,
+                spec_key, spec_bytes if w.spec_key != spec_key else None,
+                self.cpu_limit
+            ))
+            started = time.monotonic()
+            if not w.conn.poll(self.timeout):
+                raise PluginTimeout(f"wall-clock limit {self.timeout}s exceeded")
+            issues, compiled, w.spec_key = w.conn.recv()
+            if compiled:
+                w.digests.add(plugin.digest)
+            metrics.record_plugin(plugin.name, time.monotonic() - started)
+            return issues
+        except (PluginTimeout, EOFError, OSError) as e:
+            reason = e if isinstance(e, PluginTimeout) else f"worker died ({e or 'memory limit?'})"
+            w = self._replace(w)
+            return [blocked_plugin_issue(plugin.name, reason)]
+        finally:
+            self._idle.put(w)
+
+    def run(
+        self,
+        names: List[str],
+        spec_data: Dict,
+        on_result: Optional[Callable[[str, List[Dict]], None]] = None,
+        spec_bytes: Optional[bytes] = None
+    ) -> List[Dict]:
+        # on_result(name, issues) вызывается по мере готовности каждого плагина;
+        # spec_bytes — исходные байты спеки (JSON или YAML), если они есть
+        if self.size <= 0:
+            return plugin_registry.run(names, spec_data, on_result=on_result)
+        self.start()
+
+        # Проверка и компиляция — в реестре основного процесса (кэш по sha256),
+        # в воркеры уходят только прошедшие SafeVisitor плагины
+        slots: List[Optional[List[Dict]]] = []
+        tasks = []
+        for name in names:
+            try:
+                plugin = plugin_registry.get(name)
+            except Exception as e:
+                slots.append([blocked_plugin_issue(name, e)])
+            else:
+                if plugin is None:
+                    slots.append([])
+                elif plugin.error is not None:
+                    slots.append([blocked_plugin_issue(name, plugin.error)])
+                else:
+                    tasks.append((len(slots), plugin))
+                    slots.append(None)
+                    continue
+            if on_result is not None:
+                on_result(name, slots[-1])
+        if not tasks:
+            return [i for s in slots for i in s]
+
+        # Воркерам уходят исходные байты (без повторной сериализации), каждому не больше одного раза
+        spec_key = uuid.uuid4().hex
+        if spec_bytes is None:
+            spec_bytes = json.dumps(spec_data).encode("utf-8")
+        with ThreadPoolExecutor(max_workers=min(len(tasks), self.size), thread_name_prefix="plugin") as ex:
+            futures = {
+                metrics.submit(ex, self._run_one, plugin, spec_key, spec_bytes): (idx, plugin) for idx, plugin in tasks
+            }
+            for fut in as_completed(futures):
+                idx, plugin = futures[fut]
+                slots[idx] = fut.result()
+                if on_result is not None:
+                    on_result(plugin.name, slots[idx])
+        return [i for s in slots for i in s]
+
+
+plugin_pool = PluginPool(
+    settings.plugin_workers,
+    cpu_limit=settings.plugin_cpu_limit,
+    memory_limit_mb=settings.plugin_memory_limit_mb,
+    timeout=settings.plugin_timeout
+)
@@ -0,0 +1,170 @@
+# backend/core/plugins.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections.abc import Mapping, Sequence
+from types import CodeType, SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from core.config import settings
+from core import metrics
+from core.security import compile_plugin, exec_plugin, blocked_plugin_issue
+
+logger = logging.getLogger(__name__)
+
+
+# --- Read-only представление спеки для плагинов ---
+# Спека парсится один раз на скан; плагины получают обёртку над тем же dict,
+# вложенные dict/list оборачиваются лениво при обращении.
+
+def _wrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SpecView(value)
+    if isinstance(value, list):
+        return SpecList(value)
+    return value
+
+
+class SpecView(Mapping):
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Dict):
+        self._data = data
+
+    def __getitem__(self, key):
+        return _wrap(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return f"SpecView({self._data!r})"
+
+
+class SpecList(Sequence):
+    __slots__ = ("_data",)
+
+    def __init__(self, data: List):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SpecList(self._data[index])
+        return _wrap(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"SpecList({self._data!r})"
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, (SpecView, SpecList)):
+        return value._data
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Старые плагины делают json.loads(spec) — отдаём им уже разобранное представление
+plugin_json = SimpleNamespace(
+    loads=lambda s, **kw: s if isinstance(s, (SpecView, SpecList)) else json.loads(s, **kw),
+    dumps=lambda obj, **kw: json.dumps(obj, default=_unwrap, **kw),
+    JSONDecodeError=json.JSONDecodeError,
+)
+
+
+# --- Реестр скомпилированных плагинов ---
+
+class CompiledPlugin:
+    __slots__ = ("name", "digest", "source", "code", "error", "stat")
+
+    def __init__(self, name: str, digest: str, source: str, code: Optional[CodeType], error: Optional[Exception], stat: tuple):
+        self.name = name
+        self.digest = digest
+        self.source = source  # нужен воркерам пула (core/plugin_pool.py): code object не пиклится
+        self.code = code
+        self.error = error  # плагин не прошёл SafeVisitor — помним и не перепроверяем
+        self.stat = stat
+
+
+class PluginRegistry:
+    # Кэш проверенных и скомпилированных плагинов. Файл перечитывается, только если
+    # поменялись mtime/размер; перекомпилируется — только если поменялось содержимое.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._plugins: Dict[str, CompiledPlugin] = {}
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.py")
+
+    def get(self, name: str) -> Optional[CompiledPlugin]:
+        path = self.path(name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(name)
+            return None
+        stat = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._plugins.get(name)
+        if cached is not None and cached.stat == stat:
+            return cached
+
+        with open(path, "rb") as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        if cached is not None and cached.digest == digest:
+            cached.stat = stat
+            return cached
+
+        text = source.decode("utf-8", errors="replace")
+        try:
+            code, error = compile_plugin(text, path), None
+        except Exception as e:
+            code, error = None, e
+        plugin = CompiledPlugin(name, digest, text, code, error, stat)
+        with self._lock:
+            self._plugins[name] = plugin
+        return plugin
+
+    def invalidate(self, name: Optional[str] = None):
+        with self._lock:
+            if name is None:
+                self._plugins.clear()
+            else:
+                self._plugins.pop(name, None)
+
+    def run(self, names: List[str], spec_data: Dict, on_result: Optional[Callable[[str, List[Dict]], None]] = None) -> List[Dict]:
+        view = SpecView(spec_data)
+        issues = []
+        for name in names:
+            try:
+                plugin = self.get(name)
+            except Exception as e:
+                found = [blocked_plugin_issue(name, e)]
+            else:
+                if plugin is None:
+                    found = []
+                elif plugin.error is not None:
+                    found = [blocked_plugin_issue(name, plugin.error)]
+                else:
+                    started = time.monotonic()
+                    found = exec_plugin(plugin.code, view, name, json_module=plugin_json)
+                    metrics.record_plugin(name, time.monotonic() - started)
+            if on_result is not None:
+                on_result(name, found)
+            issues.extend(found)
+        return issues
+
+
+plugin_registry = PluginRegistry(settings.plugins_dir)
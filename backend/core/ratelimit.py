@@ -0,0 +1,154 @@
+# backend/core/ratelimit.py
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_buckets_updated ON buckets(updated);
+"""
+
+
+class Rule:
+    # Token bucket: capacity запросов «залпом», пополнение capacity / per секунд.
+    # Правила с одинаковым bucket делят один лимит (например, все запуски сканов).
+    def __init__(self, bucket: str, prefix: str, capacity: int, per: float, methods: Optional[Tuple[str, ...]] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.capacity = float(capacity)
+        self.rate = capacity / per
+        self.methods = methods
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.prefix) and (self.methods is None or method in self.methods)
+
+
+class RateLimiter:
+    # Состояние в SQLite (WAL): общее для всех процессов uvicorn, в памяти процесса
+    # не растёт. Одна запись на (клиент, bucket), O(1) на запрос; простаивающие
+    # клиенты периодически удаляются. busy_timeout — сколько ждать блокировку базы, занятую
+    # другим процессом: не дождались — запрос считается по bucket-у в памяти процесса
+    # (лимит на процесс, а не общий, но без обхода лимита через занятую базу).
+    def __init__(
+        self,
+        db_path: str,
+        rules: List[Rule],
+        default: Optional[Rule],
+        idle_ttl: float,
+        exempt: Tuple[str, ...] = (),
+        busy_timeout: float = 0.05
+    ):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.rules = rules
+        self.exempt = exempt
+        self.default = default
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._fallback: Dict[str, Tuple[float, float]] = {}
+        self._fallback_lock = threading.Lock()
+        self._last_sweep = 0.0
+        # Схема создаётся один раз при старте — здесь можно и подождать блокировку
+        # (WAL хранится в самом файле базы — соединениям потоков не нужно переключать его под блокировкой)
+        db = sqlite3.connect(db_path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+        db.close()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def rule_for(self, method: str, path: str) -> Optional[Rule]:
+        if path in self.exempt:
+            return None
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return self.default
+
+    @staticmethod
+    def _take(rule: Rule, row: Optional[Tuple[float, float]], now: float) -> Tuple[bool, float]:
+        tokens = rule.capacity if row is None else min(rule.capacity, row[0] + (now - row[1]) * rule.rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        return allowed, tokens
+
+    def check(self, client: str, method: str, path: str) -> Tuple[bool, float]:
+        # (разрешено, через сколько секунд повторить)
+        rule = self.rule_for(method, path)
+        if rule is None:
+            return True, 0.0
+        key = f"{rule.bucket}:{client}"
+        now = time.time()
+        db = self._db()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            allowed, tokens = self._take(rule, row, now)
+            db.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Лимитер не должен ронять и тормозить API: база занята или сломана — считаем в памяти
+            logger.warning(f"Rate limiter error, using in-process bucket: {e}")
+            try:
+                db.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            with self._fallback_lock:
+                allowed, tokens = self._take(rule, self._fallback.get(key), now)
+                self._fallback[key] = (tokens, now)
+
+        if now - self._last_sweep > 60:
+            self._last_sweep = now
+            self._sweep(now)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rule.rate
+
+    def _sweep(self, now: float):
+        with self._fallback_lock:
+            for key in [k for k, (_, updated) in self._fallback.items() if updated < now - self.idle_ttl]:
+                del self._fallback[key]
+        try:
+            self._db().execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_ttl,))
+        except sqlite3.Error as e:
+            logger.error(f"Rate limiter sweep error: {e}")
+
+
+rate_limiter = RateLimiter(
+    settings.ratelimit_db,
+    rules=[
+        # Запуск скана дорогой — общий строгий лимит на синхронный и очередной режимы
+        Rule("scan", "/api/analyze-api", settings.rate_limit_scans, 60, methods=("POST",)),
+        Rule("scan", "/api/jobs", settings.rate_limit_scans, 60, methods=("POST",)),
+        # Пакет — сотни спек одним запросом, отдельный лимит
+        Rule("batch", "/api/batch", settings.rate_limit_batches, 60, methods=("POST",)),
+        Rule("jobs", "/api/batch", 300, 60, methods=("GET",)),
+        # Опрос статуса задач — частый и дешёвый
+        Rule("jobs", "/api/jobs", 300, 60, methods=("GET",)),
+        # Постраничное чтение истории — тоже частое и дешёвое
+        Rule("scans", "/api/scans", 300, 60, methods=("GET",)),
+        Rule("plugins", "/api/plugins", 120, 60),
+    ],
+    default=Rule("default", "/", settings.rate_limit_default, 60),
+    idle_ttl=settings.ratelimit_idle_ttl,
+    exempt=("/health", "/metrics"),
+    busy_timeout=settings.ratelimit_busy_timeout
+)
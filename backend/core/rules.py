@@ -0,0 +1,307 @@
+# backend/core/rules.py
+# Встроенный движок правил OWASP API Top 10 (2023) — быстрый путь без запуска Spectral.
+# Коды и severity совпадают с @stoplight/spectral-rulesets/owasp-api-security,
+# результат в том же «сыром» формате, что и `spectral lint --format json`.
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Severity как у Spectral: 0 error, 1 warn, 2 info, 3 hint
+ERROR, WARN, INFO, HINT = 0, 1, 2, 3
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+WRITE_METHODS = {"post", "put", "patch", "delete"}
+
+NUMERIC_ID_RE = re.compile(r"(^id$|_id$|Id$|-id$)")
+CREDENTIAL_RE = re.compile(
+    r"^.*(client_?secret|token|access_?token|refresh_?token|id_?token|password|secret|api-?key).*$",
+    re.IGNORECASE
+)
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit", "x-rate-limit-limit", "ratelimit-limit", "ratelimit", "ratelimit-policy"
+}
+ENVIRONMENT_RE = re.compile(r"(local|development|dev|test|testing|staging|stage|sandbox|production|prod)", re.IGNORECASE)
+
+Path = Tuple[Any, ...]
+
+
+def _dict(node: Any) -> Dict:
+    # Кривые спеки (paths: [], properties: "x") не должны ронять стадию — такой узел просто пуст
+    return node if isinstance(node, dict) else {}
+
+
+def _list(node: Any) -> List:
+    return node if isinstance(node, list) else []
+
+
+class SpecIndex:
+    # Один проход по документу: операции, параметры, схемы безопасности, разрешённые $ref
+    def __init__(self, spec: Dict):
+        self.spec = spec if isinstance(spec, dict) else {}
+        self._refs: Dict[str, Tuple[Any, Path]] = {}
+        components = _dict(self.spec.get("components"))
+        self.security_schemes: Dict[str, Dict] = {}
+        for name, scheme in _dict(components.get("securitySchemes")).items():
+            resolved, _ = self.resolve(scheme, ("components", "securitySchemes", name))
+            if isinstance(resolved, dict):
+                self.security_schemes[name] = resolved
+        self.global_security = self.spec.get("security")
+        self.servers = _list(self.spec.get("servers"))
+
+        # (path, method, operation, params) — params уже с учётом path-level и $ref
+        self.operations: List[Tuple[str, str, Dict, List[Tuple[Dict, Path]]]] = []
+        for path, item in _dict(self.spec.get("paths")).items():
+            item, _ = self.resolve(item, ("paths", path))
+            if not isinstance(item, dict):
+                continue
+            shared = self._params(item.get("parameters"), ("paths", path, "parameters"))
+            for method in HTTP_METHODS:
+                op = item.get(method)
+                if not isinstance(op, dict):
+                    continue
+                own = self._params(op.get("parameters"), ("paths", path, method, "parameters"))
+                names = {(p.get("name"), p.get("in")) for p, _ in own}
+                params = own + [(p, loc) for p, loc in shared if (p.get("name"), p.get("in")) not in names]
+                self.operations.append((path, method, op, params))
+
+    def resolve(self, node: Any, loc: Path) -> Tuple[Any, Path]:
+        # Только локальные ссылки "#/..."; циклы ref -> ref обрываем
+        seen = set()
+        while isinstance(node, dict) and isinstance(node.get("$ref"), str):
+            ref = node["$ref"]
+            if not ref.startswith("#/") or ref in seen:
+                return node, loc
+            seen.add(ref)
+            if ref not in self._refs:
+                target: Any = self.spec
+                parts = tuple(p.replace("~1", "/").replace("~0", "~") for p in ref[2:].split("/"))
+                for part in parts:
+                    if isinstance(target, dict) and part in target:
+                        target = target[part]
+                    elif isinstance(target, list) and part.isdigit() and int(part) < len(target):
+                        target = target[int(part)]
+                    else:
+                        target = None
+                        break
+                self._refs[ref] = (target, parts)
+            node, loc = self._refs[ref]
+            if node is None:
+                return None, loc
+        return node, loc
+
+    def _params(self, params: Any, loc: Path) -> List[Tuple[Dict, Path]]:
+        out = []
+        for n, p in enumerate(_list(params)):
+            p, ploc = self.resolve(p, loc + (n,))
+            if isinstance(p, dict):
+                out.append((p, ploc))
+        return out
+
+    def is_secured(self, op: Dict) -> bool:
+        security = op.get("security", self.global_security)
+        # security: [] или [{}] — явное отключение авторизации
+        return any(req for req in _list(security) if isinstance(req, dict))
+
+
+def _issue(code: str, message: str, severity: int, path: Path) -> Dict:
+    return {"code": code, "message": message, "severity": severity, "path": list(path)}
+
+
+class RuleEngine:
+    def __init__(self, spec: Dict):
+        self.index = SpecIndex(spec)
+        self.issues: List[Dict] = []
+        self._seen_schemas = set()
+        self._seen_params = set()  # path-level параметры общие для всех операций пути
+
+    def report(self, code: str, message: str, severity: int, path: Path):
+        self.issues.append(_issue(code, message, severity, path))
+
+    def run(self) -> List[Dict]:
+        self._check_servers()
+        self._check_security_schemes()
+        for path, method, op, params in self.index.operations:
+            self._check_operation(path, method, op, params)
+        return self.issues
+
+    # --- API9: инвентаризация серверов, API8: транспорт ---
+    def _check_servers(self):
+        for n, server in enumerate(self.index.servers):
+            if not isinstance(server, dict):
+                continue
+            url = str(server.get("url", ""))
+            if url.startswith("http://"):
+                self.report("owasp:api8:2023-no-server-http",
+                            "Server URLs must not use http://. Use https:// or wss:// instead.",
+                            ERROR, ("servers", n, "url"))
+            if "x-internal" not in server:
+                self.report("owasp:api9:2023-inventory-access",
+                            "Declare intended audience of every server by defining servers[0].x-internal as true/false.",
+                            ERROR, ("servers", n))
+            if not ENVIRONMENT_RE.search(str(server.get("description", ""))):
+                self.report("owasp:api9:2023-inventory-environment",
+                            "Declare intended environment in server descriptions using terms like local, staging, production.",
+                            ERROR, ("servers", n))
+
+    # --- API2: схемы аутентификации ---
+    def _check_security_schemes(self):
+        for name, scheme in self.index.security_schemes.items():
+            loc = ("components", "securitySchemes", name)
+            kind = scheme.get("type")
+            if kind == "http" and str(scheme.get("scheme", "")).lower() in ("basic", "negotiate"):
+                self.report("owasp:api2:2023-no-http-basic",
+                            "Security scheme uses HTTP Basic. Use a more secure authentication method, like OAuth 2.0.",
+                            ERROR, loc + ("scheme",))
+            if kind == "apiKey" and scheme.get("in") in ("query", "path"):
+                self.report("owasp:api2:2023-no-api-keys-in-url",
+                            "API Key passed in URL: API Keys should be passed in headers.",
+                            ERROR, loc + ("in",))
+            if kind == "http" and str(scheme.get("bearerFormat", "")).upper() == "JWT" \
+                    and "RFC8725" not in str(scheme.get("description", "")):
+                self.report("owasp:api2:2023-jwt-best-practices",
+                            "Security schemes using JWTs must explicitly declare support for RFC8725 in the description.",
+                            ERROR, loc)
+
+    # --- Операции: API1, API2, API4, API8 + обход схем ---
+    def _check_operation(self, path: str, method: str, op: Dict, params: List[Tuple[Dict, Path]]):
+        op_loc = ("paths", path, method)
+        secured = self.index.is_secured(op)
+
+        if not secured:
+            if method in WRITE_METHODS:
+                self.report("owasp:api2:2023-write-restricted",
+                            "This write operation is not protected by any security scheme.",
+                            ERROR, op_loc)
+            elif method == "get":
+                self.report("owasp:api2:2023-read-restricted",
+                            "This operation is not protected by any security scheme.",
+                            WARN, op_loc)
+
+        for p, ploc in params:
+            if ploc in self._seen_params:
+                continue
+            self._seen_params.add(ploc)
+            name = str(p.get("name", ""))
+            where = p.get("in")
+            schema, sloc = self.index.resolve(p.get("schema"), ploc + ("schema",))
+            if where == "path" and NUMERIC_ID_RE.search(name) and isinstance(schema, dict) \
+                    and schema.get("type") in ("integer", "number"):
+                self.report("owasp:api1:2023-no-numeric-ids",
+                            "Use random IDs that cannot be guessed. UUIDs are preferred.",
+                            ERROR, sloc + ("type",))
+            if where in ("path", "query") and CREDENTIAL_RE.match(name):
+                self.report("owasp:api2:2023-no-credentials-in-url",
+                            f"Security credentials detected in {where} parameter: {name}.",
+                            ERROR, ploc + ("name",))
+            self._walk_schema(schema, sloc)
+
+        responses, rloc = self.index.resolve(op.get("responses"), op_loc + ("responses",))
+        responses = responses if isinstance(responses, dict) else {}
+        codes = {str(c).upper() for c in responses}
+
+        if "429" not in codes:
+            self.report("owasp:api4:2023-rate-limit-responses-429",
+                        "Operation is missing rate limiting response in responses.",
+                        WARN, rloc)
+        if not codes & {"400", "422", "4XX"}:
+            self.report("owasp:api8:2023-define-error-validation",
+                        "Missing error response of either 400, 422 or 4XX.",
+                        WARN, rloc)
+        if secured and "401" not in codes:
+            self.report("owasp:api8:2023-define-error-responses-401",
+                        "Operation is missing 401 response.",
+                        WARN, rloc)
+        if "500" not in codes:
+            self.report("owasp:api8:2023-define-error-responses-500",
+                        "Operation is missing 500 response.",
+                        WARN, rloc)
+
+        for code, resp in responses.items():
+            resp, loc = self.index.resolve(resp, rloc + (code,))
+            if not isinstance(resp, dict):
+                continue
+            c = str(code)
+            if c[:1] in ("2", "4"):
+                headers = {str(h).lower() for h in _dict(resp.get("headers"))}
+                if not headers & RATE_LIMIT_HEADERS:
+                    self.report("owasp:api4:2023-rate-limit",
+                                "All 2XX and 4XX responses should define rate limiting headers.",
+                                ERROR, loc)
+            self._walk_content(resp.get("content"), loc + ("content",))
+
+        body, bloc = self.index.resolve(op.get("requestBody"), op_loc + ("requestBody",))
+        if isinstance(body, dict):
+            self._walk_content(body.get("content"), bloc + ("content",))
+
+    def _walk_content(self, content: Any, loc: Path):
+        if not isinstance(content, dict):
+            return
+        for media, mt in content.items():
+            if isinstance(mt, dict):
+                schema, sloc = self.index.resolve(mt.get("schema"), loc + (media, "schema"))
+                self._walk_schema(schema, sloc)
+
+    # --- API3/API4: схемы. Каждая схема проверяется один раз, даже если на неё много $ref ---
+    def _walk_schema(self, schema: Any, loc: Path):
+        stack = [(schema, loc)]
+        while stack:
+            node, nloc = stack.pop()
+            node, nloc = self.index.resolve(node, nloc)
+            if not isinstance(node, dict) or id(node) in self._seen_schemas:
+                continue
+            self._seen_schemas.add(id(node))
+            self._check_schema(node, nloc)
+
+            for key in ("items", "not"):
+                if key in node:
+                    stack.append((node[key], nloc + (key,)))
+            extra = node.get("additionalProperties")
+            if isinstance(extra, dict):
+                stack.append((extra, nloc + ("additionalProperties",)))
+            for name, prop in _dict(node.get("properties")).items():
+                stack.append((prop, nloc + ("properties", name)))
+            for key in ("allOf", "anyOf", "oneOf"):
+                for n, sub in enumerate(_list(node.get(key))):
+                    stack.append((sub, nloc + (key, n)))
+
+    def _check_schema(self, schema: Dict, loc: Path):
+        kind = schema.get("type")
+        kinds = {k for k in (kind if isinstance(kind, list) else [kind]) if isinstance(k, str)}
+        bounded = "enum" in schema or "const" in schema
+
+        if "array" in kinds and "maxItems" not in schema:
+            self.report("owasp:api4:2023-array-limit",
+                        "Schema of type array must specify maxItems.",
+                        ERROR, loc + ("type",))
+        if "string" in kinds and not bounded:
+            if "maxLength" not in schema:
+                self.report("owasp:api4:2023-string-limit",
+                            "Schema of type string must specify maxLength, enum, or const.",
+                            ERROR, loc + ("type",))
+            if "format" not in schema and "pattern" not in schema:
+                self.report("owasp:api4:2023-string-restricted",
+                            "Schema of type string must specify a format, pattern, enum, or const.",
+                            WARN, loc + ("type",))
+        if "integer" in kinds:
+            if not bounded and not (("minimum" in schema or "exclusiveMinimum" in schema)
+                                    and ("maximum" in schema or "exclusiveMaximum" in schema)):
+                self.report("owasp:api4:2023-integer-limit",
+                            "Schema of type integer must specify minimum and maximum.",
+                            ERROR, loc + ("type",))
+            if "format" not in schema:
+                self.report("owasp:api4:2023-integer-format",
+                            "Schema of type integer must specify format (int32 or int64).",
+                            ERROR, loc + ("type",))
+        if "object" in kinds:
+            extra = schema.get("additionalProperties")
+            if extra is True:
+                self.report("owasp:api3:2023-no-additionalProperties",
+                            "If the additionalProperties keyword is used it must be set to false.",
+                            WARN, loc + ("additionalProperties",))
+            elif isinstance(extra, dict) and "maxProperties" not in schema:
+                self.report("owasp:api3:2023-constrained-additionalProperties",
+                            "Objects should not allow unconstrained additionalProperties.",
+                            WARN, loc + ("additionalProperties",))
+
+
+def run_native_rules(spec: Optional[Dict]) -> List[Dict]:
+    return RuleEngine(spec or {}).run()
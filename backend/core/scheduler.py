@@ -0,0 +1,182 @@
+# backend/core/scheduler.py
+import time
+import logging
+import threading
+import contextlib
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterator, Optional
+from core.config import settings
+from core.utils import Cancelled
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    # Памяти мало — новые сканы не принимаем (app.py отвечает 503)
+    pass
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_memory() -> Optional[int]:
+    # Свободная память в байтах: MemAvailable хоста, но не больше остатка лимита cgroup контейнера
+    available = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError):
+        pass
+    for limit_path, usage_path in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),
+    ):
+        limit, usage = _read_int(limit_path), _read_int(usage_path)
+        # cgroup v1 без лимита отдаёт огромное число — такой лимит не учитываем
+        if limit is not None and usage is not None and limit < 1 << 60:
+            left = max(0, limit - usage)
+            available = left if available is None else min(available, left)
+            break
+    return available
+
+
+class _Waiter:
+    __slots__ = ("host", "granted")
+
+    def __init__(self, host: str):
+        self.host = host
+        self.granted = False
+
+
+class Scheduler:
+    # Допуск тяжёлых инструментов (ZAP, Kiterunner, Newman, api_scanner):
+    #   - у каждого инструмента свой лимит одновременных запусков;
+    #   - на один целевой хост — не больше per_host запусков всех инструментов сразу;
+    #   - очередь каждого инструмента обходит клиентов по кругу, чтобы один клиент
+    #     с сотней сканов не занял все слоты;
+    #   - пока свободной памяти меньше min_free, новые запуски ждут, а новые сканы отклоняются.
+    def __init__(self, slots: Dict[str, int], per_host: int, min_free_mb: int):
+        self.slots = slots
+        self.per_host = per_host
+        self.min_free = min_free_mb * 1024 * 1024
+        self._cond = threading.Condition()
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {tool: OrderedDict() for tool in slots}
+        self._running: Dict[str, int] = {tool: 0 for tool in slots}
+        self._hosts: Dict[str, int] = {}
+        self._memory = (0.0, None)
+        self.rejected = 0
+
+    def _available(self) -> Optional[int]:
+        # /proc читаем не чаще раза в секунду
+        checked, value = self._memory
+        now = time.monotonic()
+        if now - checked >= 1.0:
+            value = available_memory()
+            self._memory = (now, value)
+        return value
+
+    def under_pressure(self) -> bool:
+        available = self._available()
+        return self.min_free > 0 and available is not None and available < self.min_free
+
+    def admit(self):
+        # Вызывается до приёма нового скана
+        if self.under_pressure():
+            self.rejected += 1
+            raise Overloaded("Not enough memory for a new scan, try again later")
+
+    def _dispatch(self, tool: str):
+        # Под self._cond. Выдаём свободные слоты клиентам по кругу; клиент, получивший слот,
+        # уходит в конец круга. Заявки на перегруженный хост пропускаются, не блокируя остальных.
+        queues = self._queues[tool]
+        if queues and self.under_pressure():
+            return
+        while self._running[tool] < self.slots[tool]:
+            chosen = None
+            for client, waiters in queues.items():
+                chosen = next(
+                    (w for w in waiters if self.per_host <= 0 or self._hosts.get(w.host, 0) < self.per_host), None
+                )
+                if chosen is not None:
+                    break
+            if chosen is None:
+                return
+            waiters.remove(chosen)
+            if waiters:
+                queues.move_to_end(client)
+            else:
+                del queues[client]
+            chosen.granted = True
+            self._running[tool] += 1
+            self._hosts[chosen.host] = self._hosts.get(chosen.host, 0) + 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(
+        self,
+        tool: str,
+        host: Optional[str],
+        client: Optional[str] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Iterator[None]:
+        if tool not in self.slots:
+            yield
+            return
+        waiter = _Waiter(host or "")
+        client = client or "anonymous"
+        with self._cond:
+            self._queues[tool].setdefault(client, deque()).append(waiter)
+            self._dispatch(tool)
+            while not waiter.granted:
+                if cancel is not None and cancel.is_set():
+                    waiters = self._queues[tool].get(client)
+                    if waiters is not None:
+                        waiters.remove(waiter)
+                        if not waiters:
+                            del self._queues[tool][client]
+                    raise Cancelled(f"{tool} cancelled while queued")
+                # Периодически перепроверяем: память могла освободиться без release
+                self._cond.wait(0.5)
+                self._dispatch(tool)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[tool] -= 1
+                self._hosts[waiter.host] -= 1
+                if not self._hosts[waiter.host]:
+                    del self._hosts[waiter.host]
+                # Освободился и слот хоста — он мог держать заявки других инструментов
+                for name in self._queues:
+                    self._dispatch(name)
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {
+                "running": dict(self._running),
+                "queued": {tool: sum(len(w) for w in q.values()) for tool, q in self._queues.items()},
+                "hosts": len(self._hosts),
+                "available_memory": self._available(),
+                "rejected": self.rejected
+            }
+
+
+scheduler = Scheduler(
+    {
+        "zap": settings.zap_slots,
+        "kiterunner": settings.kiterunner_slots,
+        "newman": settings.newman_slots,
+        "api_scanner": settings.api_scanner_slots,
+    },
+    per_host=settings.scans_per_host,
+    min_free_mb=settings.min_free_memory_mb
+)
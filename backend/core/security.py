@@ -21,26 +21,9 @@ INTERNAL_IPS = [
 ]
 
 def is_blocked_domain(host: str) -> bool:
-    if not host:
-        return True
-    host = host.lower()
-    if host in BLOCKED_HOSTS:
-        return True
-    try:
-        import socket
-        ip = socket.gethostbyname(host)
-        octets = list(map(int, ip.split(".")))
-        for cidr in INTERNAL_IPS:
-            if "/" in cidr:
-                net, mask = cidr.split("/")
-                net_octets = list(map(int, net.split(".")))[:4]
-                if len(octets) >= len(net_octets):
-                    if all(o == n for o, n in zip(octets[:len(net_octets)], net_octets)):
-                        return True
-        return ip.startswith("169.254.") or ip.startswith("127.") or ip.startswith("0.")
-    except:
-        return True
-    return False
+    # Синхронная проверка через общий DNS-кэш; в async-коде — await resolver.is_blocked(host)
+    from core.dns import resolver
+    return resolver.is_blocked_sync(host)
 
 # Запрещённые вызовы
 FORBIDDEN_NAMES = {
@@ -67,7 +50,8 @@ class SafeVisitor(ast.NodeVisitor):
         self.generic_visit(node)
 
     def visit_Attribute(self, node):
-        if node.attr in FORBIDDEN_ATTRS:
+        # Приватные атрибуты (в т.ч. SpecView._data) закрыты: иначе плагин меняет спеку остальным плагинам
+        if node.attr in FORBIDDEN_ATTRS or node.attr.startswith("_"):
             raise ValueError(f"Forbidden attribute access: {node.attr}")
         if isinstance(node.value, ast.Name) and node.value.id == "__builtins__":
             raise ValueError("__builtins__ access blocked")
@@ -78,23 +62,27 @@ class SafeVisitor(ast.NodeVisitor):
             raise ValueError("__builtins__ subscript blocked")
         self.generic_visit(node)
 
-def safe_exec_plugin(plugin_path: str, spec_data: str, plugin_name: str) -> List[Dict]:
-    try:
-        with open(plugin_path, "r", encoding="utf-8") as f:
-            code = f.read()
+def compile_plugin(code: str, plugin_path: str):
+    # AST-проверка + компиляция; результат можно кэшировать и выполнять много раз
+    tree = ast.parse(code)
+    SafeVisitor().visit(tree)
+    return compile(tree, plugin_path, "exec")
 
-        tree = ast.parse(code)
-        SafeVisitor().visit(tree)
+def blocked_plugin_issue(plugin_name: str, e: Exception) -> Dict:
+    logger.error(f"Plugin {plugin_name} blocked: {e}")
+    return {"code": "PLUGIN_BLOCKED", "message": f"Plugin execution blocked: {str(e) or type(e).__name__}", "severity": "high", "plugin": plugin_name}
 
+def exec_plugin(compiled, spec_data, plugin_name: str, json_module=json) -> List[Dict]:
+    try:
         # Только разрешённые функции
         allowed_globals = {
             "__builtins__": {},
-            "json": json,
+            "json": json_module,
             "spec": spec_data,
         }
 
         local_vars = {}
-        exec(code, allowed_globals, local_vars)
+        exec(compiled, allowed_globals, local_vars)
 
         analyze = local_vars.get("analyze")
         if not callable(analyze):
@@ -111,8 +99,16 @@ def safe_exec_plugin(plugin_path: str, spec_data: str, plugin_name: str) -> List
         return result
 
     except Exception as e:
-        logger.error(f"Plugin {plugin_name} blocked: {e}")
-        return [{"code": "PLUGIN_BLOCKED", "message": f"Plugin execution blocked: {str(e)}", "severity": "high", "plugin": plugin_name}]
+        return [blocked_plugin_issue(plugin_name, e)]
+
+def safe_exec_plugin(plugin_path: str, spec_data: str, plugin_name: str) -> List[Dict]:
+    try:
+        with open(plugin_path, "r", encoding="utf-8") as f:
+            code = f.read()
+        compiled = compile_plugin(code, plugin_path)
+    except Exception as e:
+        return [blocked_plugin_issue(plugin_name, e)]
+    return exec_plugin(compiled, spec_data, plugin_name)
 
 def run_bandit(code: str) -> Dict:
     return {"results": []}
\ No newline at end of file
@@ -0,0 +1,176 @@
+# backend/core/sharding.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from core.config import settings
+from core import metrics
+from core.cache import content_hash
+from core.ingest import Spec
+from core.utils import SPECTRAL_RULESET, spectral_cache, spectral_version, run_spectral_cached, is_spectral_error
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+# Сколько раз запускать упавший кусок, прежде чем признать линт неудачным
+SHARD_ATTEMPTS = 2
+
+
+def collect_refs(node: Any, out: Optional[Set[str]] = None) -> Set[str]:
+    out = set() if out is None else out
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, dict):
+            ref = n.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/"):
+                out.add(ref)
+            stack.extend(n.values())
+        elif isinstance(n, list):
+            stack.extend(n)
+    return out
+
+
+def ref_key(ref: str) -> Optional[Tuple[str, str]]:
+    # "#/components/schemas/User" -> ("schemas", "User")
+    parts = [p.replace("~1", "/").replace("~0", "~") for p in ref[2:].split("/")]
+    if len(parts) >= 3 and parts[0] == "components":
+        return parts[1], parts[2]
+    return None
+
+
+def component_closure(spec: Dict, roots: Any) -> Dict[str, Dict]:
+    # Все компоненты, на которые транзитивно ссылаются roots
+    components = spec.get("components") or {}
+    picked: Dict[str, Dict] = {}
+    pending = list(collect_refs(roots))
+    seen = set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen:
+            continue
+        seen.add(ref)
+        key = ref_key(ref)
+        if key is None:
+            continue
+        section, name = key
+        target = (components.get(section) or {}).get(name)
+        if target is None:
+            continue
+        picked.setdefault(section, {})[name] = target
+        pending.extend(collect_refs(target) - seen)
+    return picked
+
+
+def sub_spec(spec: Dict, path_keys: List[str], extra_components: Any = None) -> Dict:
+    # Самодостаточный кусок спеки: выбранные пути + всё, на что они ссылаются.
+    # Ключи не переименовываются, поэтому JSON-пути в issues совпадают с исходным документом.
+    paths = spec.get("paths") or {}
+    chunk = {k: v for k, v in spec.items() if k not in ("paths", "components")}
+    chunk["paths"] = {k: paths[k] for k in path_keys if k in paths}
+    components = component_closure(spec, [chunk["paths"], extra_components])
+    # securitySchemes нужны правилам авторизации в каждом куске
+    schemes = (spec.get("components") or {}).get("securitySchemes")
+    if schemes:
+        components["securitySchemes"] = schemes
+    if components:
+        chunk["components"] = components
+    return chunk
+
+
+def count_operations(spec: Dict) -> int:
+    return sum(
+        sum(1 for m in HTTP_METHODS if isinstance(item, dict) and m in item)
+        for item in (spec.get("paths") or {}).values()
+    )
+
+
+def split_spec(spec: Dict, shards: int) -> List[Dict]:
+    # Группируем пути по первому сегменту (/users/..., /accounts/...) и раскладываем
+    # группы по корзинам жадно, от самых тяжёлых — чтобы куски были примерно равны
+    groups: Dict[str, List[str]] = {}
+    weights: Dict[str, int] = {}
+    for path, item in (spec.get("paths") or {}).items():
+        group = path.strip("/").split("/", 1)[0]
+        groups.setdefault(group, []).append(path)
+        weights[group] = weights.get(group, 0) + max(1, sum(1 for m in HTTP_METHODS if isinstance(item, dict) and m in item))
+
+    bins = [[0, []] for _ in range(max(1, min(shards, len(groups))))]
+    for group in sorted(groups, key=lambda g: weights[g], reverse=True):
+        target = min(bins, key=lambda b: b[0])
+        target[0] += weights[group]
+        target[1].extend(groups[group])
+
+    # Компоненты, на которые не ссылается ни один путь, тоже должны быть проверены
+    referenced = component_closure(spec, spec.get("paths") or {})
+    orphans = {
+        section: {n: v for n, v in items.items() if n not in referenced.get(section, {})}
+        for section, items in (spec.get("components") or {}).items()
+        if isinstance(items, dict) and section != "securitySchemes"
+    }
+    chunks = [sub_spec(spec, keys) for _, keys in bins if keys]
+    if chunks and any(orphans.values()):
+        for section, items in orphans.items():
+            if items:
+                chunks[0].setdefault("components", {}).setdefault(section, {}).update(items)
+    return chunks
+
+
+def merge_issues(results: List[List[Dict]]) -> List[Dict]:
+    # Общие части (servers, securitySchemes, разделяемые схемы) попадают в несколько
+    # кусков — оставляем по одному issue на (code, path). Строки/колонки (range)
+    # относятся к файлу куска, а не к исходной спеке, поэтому их убираем.
+    merged = []
+    seen = set()
+    for res in results:
+        for i in res:
+            if not isinstance(i, dict):
+                continue
+            key = (i.get("code"), tuple(map(str, i.get("path", []))), i.get("message"))
+            if key in seen:
+                continue
+            seen.add(key)
+            i = dict(i)
+            i.pop("range", None)
+            i.pop("source", None)
+            merged.append(i)
+    return merged
+
+
+def lint_spec(
+    spec: Dict,
+    cancel: Optional[threading.Event] = None,
+    source: Optional[Spec] = None
+) -> Tuple[List[Dict], bool, int]:
+    # Spectral для deep-режима: (issues, попадание в кэш, число кусков).
+    # Целая спека уходит в Spectral исходными байтами (source), куски — сериализуются.
+    if count_operations(spec) < settings.shard_min_operations or settings.lint_workers < 2:
+        res, hit = run_spectral_cached(spec, cancel=cancel, source=source)
+        return res, hit, 1
+
+    key = content_hash(spec, SPECTRAL_RULESET, spectral_version())
+    cached = spectral_cache.get(key)
+    if cached is not None:
+        return cached, True, 1
+
+    chunks = split_spec(spec, settings.lint_workers)
+    # Каждый кусок — отдельный процесс spectral, так что потоков достаточно,
+    # чтобы загрузить все ядра. Куски тоже кэшируются: правка в одной группе
+    # путей не заставляет перелинтовывать остальные.
+    results: List[Optional[List[Dict]]] = [None] * len(chunks)
+    hits = [False] * len(chunks)
+    with ThreadPoolExecutor(max_workers=settings.lint_workers, thread_name_prefix="spectral") as pool:
+        # Упавшие куски перезапускаются один раз (удавшиеся уже в кэше и не трогаются)
+        for attempt in range(SHARD_ATTEMPTS):
+            todo = [n for n, res in enumerate(results) if res is None or is_spectral_error(res)]
+            if not todo or (cancel is not None and cancel.is_set()):
+                break
+            futures = {n: metrics.submit(pool, run_spectral_cached, chunks[n], cancel=cancel) for n in todo}
+            for n, f in futures.items():
+                results[n], hits[n] = f.result()
+
+    failed = [res for res in results if is_spectral_error(res)]
+    if failed:
+        # Неполный линт не выдаём за полный: только ошибки — стадия считается упавшей
+        # и повторяется целиком (_checked в pipeline.py)
+        return merge_issues(failed), False, len(chunks)
+    merged = merge_issues(results)
+    spectral_cache.put(key, merged)
+    return merged, all(hits), len(chunks)
@@ -0,0 +1,198 @@
+# backend/core/stages.py
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Как часто (секунды) граф стадий проверяет внешний cancel, пока ни одна стадия не завершилась
+CANCEL_POLL = 0.5
+
+
+class StageFailed(Exception):
+    # Инструмент отработал, но сообщил об ошибке (упал процесс, нет отчёта).
+    # Только такие стадии повторяются; result — находки стадии, если повторы не помогли.
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+class Retry:
+    # attempts — всего попыток; пауза перед повтором растёт экспоненциально от wait до max_wait
+    def __init__(self, attempts: int = 1, wait: float = 1.0, max_wait: float = 60.0):
+        self.attempts = attempts
+        self.wait = wait
+        self.max_wait = max_wait
+
+
+class Stage:
+    # fn(results, cancel) получает результаты своих зависимостей и Event отмены,
+    # который нужно пробрасывать в run_command, чтобы дочерние процессы убивались.
+    # on_error(msg) строит результат стадии, если она упала или не успела.
+    # retry — политика повторов при StageFailed; on_finish() вызывается один раз,
+    # чем бы стадия ни закончилась (в том числе восстановленная из чекпойнта).
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any], threading.Event], Any],
+        deps: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        on_error: Optional[Callable[[str], Any]] = None,
+        retry: Optional[Retry] = None,
+        on_finish: Optional[Callable[[], None]] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.on_error = on_error or (lambda msg: None)
+        self.retry = retry
+        self.on_finish = on_finish
+
+
+def _call(s: Stage, deps: Dict[str, Any], cancel: threading.Event, usage: Dict) -> Any:
+    # usage — rusage процессов, запущенных стадией (core/metrics.py)
+    with metrics.stage_usage(usage):
+        return _attempts(s, deps, cancel)
+
+
+def _attempts(s: Stage, deps: Dict[str, Any], cancel: threading.Event) -> Any:
+    if s.retry is None or s.retry.attempts <= 1:
+        return s.fn(deps, cancel)
+
+    def before_sleep(state):
+        logger.warning(f"Stage {s.name} failed (attempt {state.attempt_number}), retrying: {state.outcome.exception()}")
+
+    # Пауза между попытками прерывается отменой стадии; после отмены новых попыток нет
+    retrying = Retrying(
+        stop=stop_after_attempt(s.retry.attempts),
+        wait=wait_exponential(multiplier=s.retry.wait, max=s.retry.max_wait),
+        retry=retry_if_exception(lambda e: isinstance(e, StageFailed) and not cancel.is_set()),
+        sleep=cancel.wait,
+        before_sleep=before_sleep,
+        reraise=True
+    )
+    return retrying(s.fn, deps, cancel)
+
+
+def run_stage_graph(
+    stages: List[Stage],
+    deadline: float,
+    cancel: Optional[threading.Event] = None,
+    on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    restored: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    # Запускает независимые стадии параллельно, зависимые — по готовности deps.
+    # deadline — общий бюджет в секундах: по его истечении все стадии отменяются.
+    # on_event("stage", {...}) вызывается на старте и завершении каждой стадии;
+    # в событии завершения usage — CPU/пиковый RSS/число процессов стадии.
+    # restored — результаты стадий из чекпойнта прошлого запуска: они не выполняются.
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        for d in s.deps:
+            if d not in by_name:
+                raise ValueError(f"Stage {s.name} depends on unknown stage {d}")
+
+    cancel = cancel or threading.Event()
+    results: Dict[str, Any] = {}
+    pending = list(stages)
+    running = {}  # future -> (stage, started, stage_cancel)
+    usages: Dict[str, Dict] = {}
+    stage_cancels = {}
+    end = time.monotonic() + deadline
+
+    def finish(s: Stage, status: str, result: Any, started: Optional[float] = None, from_checkpoint: bool = False):
+        results[s.name] = result
+        elapsed = time.monotonic() - started if started is not None else 0.0
+        if started is not None:
+            metrics.stage_seconds.observe(elapsed, s.name, status)
+        if on_event is not None:
+            event = {
+                "stage": s.name,
+                "status": status,
+                "elapsed": round(elapsed, 3),
+                "result": result,
+                "done": len(results),
+                "total": len(stages)
+            }
+            if s.name in usages:
+                # Снимок: процессы зависшей стадии могут ещё дописывать usage
+                event["usage"] = dict(usages[s.name])
+            if from_checkpoint:
+                event["restored"] = True
+            on_event("stage", event)
+        if s.on_finish is not None:
+            s.on_finish()
+
+    for s in list(pending):
+        if restored and s.name in restored:
+            pending.remove(s)
+            finish(s, "done", restored[s.name], from_checkpoint=True)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, len(stages)), thread_name_prefix="stage")
+    try:
+        while pending or running:
+            for s in list(pending):
+                if all(d in results for d in s.deps):
+                    pending.remove(s)
+                    stage_cancel = threading.Event()
+                    stage_cancels[s.name] = stage_cancel
+                    deps = {d: results[d] for d in s.deps}
+                    usages[s.name] = {"processes": 0, "cpu": 0.0, "max_rss": 0}
+                    fut = metrics.submit(pool, _call, s, deps, stage_cancel, usages[s.name])
+                    running[fut] = (s, time.monotonic(), stage_cancel)
+                    if on_event is not None:
+                        on_event("stage", {"stage": s.name, "status": "started"})
+
+            if not running:
+                # Остались стадии с неразрешимыми зависимостями
+                for s in pending:
+                    finish(s, "failed", s.on_error("dependency failed"))
+                break
+
+            now = time.monotonic()
+            # Внешняя отмена (клиент отключился, задачу сняли) проверяется не реже раза в CANCEL_POLL
+            wake = min(end, now + CANCEL_POLL)
+            for s, started, _ in running.values():
+                if s.timeout is not None:
+                    wake = min(wake, started + s.timeout)
+            done, _ = wait(list(running), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                s, started, _ = running.pop(fut)
+                try:
+                    result = fut.result()
+                except StageFailed as e:
+                    logger.error(f"Stage {s.name} failed: {e}")
+                    finish(s, "failed", e.result if e.result is not None else s.on_error(str(e)), started)
+                except Exception as e:
+                    logger.error(f"Stage {s.name} failed: {e}")
+                    finish(s, "failed", s.on_error(str(e)), started)
+                else:
+                    finish(s, "done", result, started)
+
+            now = time.monotonic()
+            if cancel.is_set() or now >= end:
+                reason = "cancelled" if cancel.is_set() else f"scan deadline {deadline}s exceeded"
+                for fut, (s, started, stage_cancel) in running.items():
+                    stage_cancel.set()
+                    finish(s, "cancelled", s.on_error(reason), started)
+                for s in pending:
+                    finish(s, "cancelled", s.on_error(reason))
+                running.clear()
+                pending = []
+                break
+
+            for fut, (s, started, stage_cancel) in list(running.items()):
+                if s.timeout is not None and now - started >= s.timeout:
+                    stage_cancel.set()
+                    running.pop(fut)
+                    finish(s, "timeout", s.on_error(f"stage timeout {s.timeout}s exceeded"), started)
+    finally:
+        # Не ждём зависшие потоки: run_command увидит отмену и убьёт процессы сам
+        pool.shutdown(wait=False)
+    return results
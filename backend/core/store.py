@@ -0,0 +1,236 @@
+# backend/core/store.py
+import json
+import time
+import sqlite3
+import logging
+from contextlib import closing
+from typing import Dict, List, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    spec_hash TEXT,
+    target_url TEXT,
+    total INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scans_created ON scans(created_at);
+CREATE INDEX IF NOT EXISTS idx_scans_spec ON scans(spec_hash, created_at);
+
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    code TEXT,
+    severity TEXT,
+    path TEXT,
+    message TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_issues_scan ON issues(scan_id, id);
+CREATE INDEX IF NOT EXISTS idx_issues_severity ON issues(scan_id, severity, id);
+CREATE INDEX IF NOT EXISTS idx_issues_code ON issues(scan_id, code, id);
+CREATE INDEX IF NOT EXISTS idx_issues_path ON issues(scan_id, path, id);
+"""
+
+SEVERITIES = ("critical", "high", "medium", "low", "info")
+# Старые сканы удаляются не чаще раза в PRUNE_INTERVAL секунд, а не на каждое сохранение
+PRUNE_INTERVAL = 60
+GROUP_COLUMNS = ("severity", "code", "path", "source")
+
+
+class ScanStore:
+    # История сканов: отчёт без списков + все находки построчно, с индексами
+    # под фильтры и курсорную пагинацию (курсор — id последней отданной записи).
+    def __init__(self, db_path: str, max_age: int):
+        self.db_path = db_path
+        self.max_age = max_age
+        self._last_prune = 0.0
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def save(self, result: Dict, issues: List[Dict], spec_hash: Optional[str], target_url: Optional[str]):
+        # issues — уже без повторов (core/findings.py), у каждой есть source
+        report = {k: v for k, v in result.items() if k != "issues"}
+        rows = [
+            (result["id"], i.get("source", "static"), i.get("code"), str(i.get("severity", "info")).lower(),
+             i.get("path") or i.get("endpoint") or None, str(i.get("message", ""))[:500], json.dumps(i, ensure_ascii=False))
+            for i in issues
+        ]
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM issues WHERE scan_id = ?", (result["id"],))
+                db.execute(
+                    "INSERT OR REPLACE INTO scans (id, created_at, spec_hash, target_url, total, summary, report) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (result["id"], now, spec_hash, target_url, len(rows),
+                     json.dumps(result.get("summary", {})), json.dumps(report, ensure_ascii=False))
+                )
+                db.executemany(
+                    "INSERT INTO issues (scan_id, source, code, severity, path, message, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                db.execute("COMMIT")
+            except:
+                db.execute("ROLLBACK")
+                raise
+        if self.max_age > 0 and now - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = now
+            self._prune(now)
+
+    def _prune(self, now: float):
+        # Отдельной транзакцией: сохранение скана не ждёт удаления старых
+        cutoff = now - self.max_age
+        try:
+            with closing(self._connect()) as db:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    db.execute("DELETE FROM issues WHERE scan_id IN (SELECT id FROM scans WHERE created_at < ?)", (cutoff,))
+                    db.execute("DELETE FROM scans WHERE created_at < ?", (cutoff,))
+                    db.execute("COMMIT")
+                except:
+                    db.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.error(f"Scan history prune failed: {e}")
+
+    @staticmethod
+    def _scan(row: sqlite3.Row) -> Dict:
+        scan = dict(row)
+        scan["summary"] = json.loads(scan["summary"])
+        scan.pop("report", None)
+        scan.pop("cursor", None)
+        return scan
+
+    def list_scans(
+        self,
+        spec_hash: Optional[str] = None,
+        target_url: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[int] = None
+    ) -> Dict:
+        where, args = [], []
+        if spec_hash:
+            where.append("spec_hash = ?")
+            args.append(spec_hash)
+        if target_url:
+            where.append("target_url = ?")
+            args.append(target_url)
+        if cursor is not None:
+            where.append("rowid < ?")
+            args.append(cursor)
+        sql = "SELECT rowid AS cursor, id, created_at, spec_hash, target_url, total, summary FROM scans"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY rowid DESC LIMIT ?"
+        with closing(self._connect()) as db:
+            rows = db.execute(sql, args + [limit + 1]).fetchall()
+        return {
+            "items": [self._scan(r) for r in rows[:limit]],
+            "next_cursor": rows[limit - 1]["cursor"] if len(rows) > limit else None
+        }
+
+    def get_scan(self, scan_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        if row is None:
+            return None
+        scan = json.loads(row["report"])
+        scan.update(self._scan(row))
+        return scan
+
+    @staticmethod
+    def _filters(scan_id: str, severity: Optional[List[str]], code: Optional[str], path: Optional[str], source: Optional[str]):
+        where, args = ["scan_id = ?"], [scan_id]
+        if severity:
+            where.append(f"severity IN ({','.join('?' * len(severity))})")
+            args.extend(s.lower() for s in severity)
+        if code:
+            where.append("code = ?")
+            args.append(code)
+        if path:
+            # Префикс пути: «paths./users» найдёт всё под /users
+            where.append("path >= ? AND path < ?")
+            args.extend([path, path + "\uffff"])
+        if source:
+            where.append("source = ?")
+            args.append(source)
+        return where, args
+
+    def issues(
+        self,
+        scan_id: str,
+        severity: Optional[List[str]] = None,
+        code: Optional[str] = None,
+        path: Optional[str] = None,
+        source: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None
+    ) -> Dict:
+        where, args = self._filters(scan_id, severity, code, path, source)
+        if cursor is not None:
+            where.append("id > ?")
+            args.append(cursor)
+        sql = f"SELECT id, source, data FROM issues WHERE {' AND '.join(where)} ORDER BY id LIMIT ?"
+        with closing(self._connect()) as db:
+            rows = db.execute(sql, args + [limit + 1]).fetchall()
+        items = []
+        for r in rows[:limit]:
+            issue = json.loads(r["data"])
+            issue.setdefault("source", r["source"])
+            items.append(issue)
+        return {
+            "items": items,
+            "next_cursor": rows[limit - 1]["id"] if len(rows) > limit else None
+        }
+
+    def all_issues(self, scan_id: str) -> List[Dict]:
+        # Все находки скана по порядку — для выгрузок (SARIF)
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT source, data FROM issues WHERE scan_id = ? ORDER BY id", (scan_id,)).fetchall()
+        items = []
+        for r in rows:
+            issue = json.loads(r["data"])
+            issue.setdefault("source", r["source"])
+            items.append(issue)
+        return items
+
+    def summary(
+        self,
+        scan_id: str,
+        group_by: str = "severity",
+        severity: Optional[List[str]] = None,
+        code: Optional[str] = None,
+        path: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> Dict[str, int]:
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+        where, args = self._filters(scan_id, severity, code, path, source)
+        sql = (
+            f"SELECT {group_by} AS key, COUNT(*) AS n FROM issues WHERE {' AND '.join(where)} "
+            f"GROUP BY {group_by} ORDER BY n DESC"
+        )
+        with closing(self._connect()) as db:
+            rows = db.execute(sql, args).fetchall()
+        counts = {s: 0 for s in SEVERITIES} if group_by == "severity" else {}
+        for r in rows:
+            counts[r["key"] or ""] = r["n"]
+        return counts
+
+
+scan_store = ScanStore(settings.scans_db, settings.scan_history_max_age)
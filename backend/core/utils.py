@@ -1,18 +1,229 @@
+import os
+import time
+import queue
+import signal
 import subprocess
+import threading
 import json
-from typing import List, Dict
+from functools import lru_cache
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+from core.config import settings
+from core.cache import ResultCache, content_hash
+from core.ingest import Spec
+from core import metrics
 
-def run_spectral(spec_path: str) -> List[Dict]:
+SPECTRAL_RULESET = "@stoplight/spectral-rulesets/owasp-api-security"
+
+spectral_cache = ResultCache(
+    os.path.join(settings.cache_dir, "spectral"),
+    max_bytes=settings.cache_max_bytes,
+    max_age=settings.cache_max_age,
+    memory_items=settings.cache_memory_items
+)
+
+class Cancelled(Exception):
+    pass
+
+def _tool(cmd: List[str]) -> str:
+    return os.path.basename(cmd[0])
+
+class _Process:
+    # Процесс инструмента, которого ждём сами через os.wait4 (в отдельном потоке) —
+    # так есть его rusage: CPU и пиковый RSS вместе с дождавшимися его потомками, для метрик.
+    # Popen процесс не ждёт: его wait/poll/communicate не вызываются, пока exited не выставлен,
+    # код выхода кладётся в returncode. Пайпы читаются своими потоками.
+    def __init__(self, cmd: List[str], **kwargs):
+        self.popen = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True, **kwargs
+        )
+        self.pid = self.popen.pid
+        self.rusage = None
+        self.exited = threading.Event()
+        threading.Thread(target=self._reap, name=f"reap-{_tool(cmd)}", daemon=True).start()
+
+    def _reap(self):
+        try:
+            _, status, self.rusage = os.wait4(self.pid, 0)
+            self.popen.returncode = os.waitstatus_to_exitcode(status)
+        except ChildProcessError:
+            # Процесс забрал кто-то другой — как и Popen в этом случае, считаем код 0
+            self.popen.returncode = 0
+        finally:
+            self.exited.set()
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.popen.returncode if self.exited.is_set() else None
+
+    def read(self, stream, into: List[str]) -> threading.Thread:
+        t = threading.Thread(target=lambda: into.append(stream.read()), daemon=True)
+        t.start()
+        return t
+
+    def kill(self):
+        # Дочерние процессы (node, java) живут в своей группе — убиваем всю
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            if not self.exited.is_set():
+                os.kill(self.pid, signal.SIGKILL)
+        self.exited.wait()
+
+    def close(self):
+        self.popen.stdout.close()
+        self.popen.stderr.close()
+
+def run_command(
+    cmd: List[str],
+    timeout: float,
+    cancel: Optional[threading.Event] = None,
+    check: bool = False
+) -> subprocess.CompletedProcess:
+    # Аналог subprocess.run(capture_output=True, text=True), но с отменой извне
+    proc = _Process(cmd)
+    out: List[str] = []
+    err: List[str] = []
+    readers = [proc.read(proc.popen.stdout, out), proc.read(proc.popen.stderr, err)]
+    started = time.monotonic()
+    deadline = started + timeout
+    outcome = "error"
+
+    def finished() -> bool:
+        # Ждём и выхода процесса, и конца вывода: потомки могут держать пайпы открытыми
+        if not proc.exited.wait(0.5):
+            return False
+        for t in readers:
+            t.join(0.5)
+        return not any(t.is_alive() for t in readers)
+
+    try:
+        while not finished():
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                outcome = "cancelled"
+                raise Cancelled(f"{cmd[0]} cancelled")
+            if time.monotonic() >= deadline:
+                proc.kill()
+                outcome = "timeout"
+                raise subprocess.TimeoutExpired(cmd, timeout)
+        outcome = "ok" if proc.returncode == 0 else "failed"
+    finally:
+        metrics.record_process(_tool(cmd), time.monotonic() - started, proc.rusage, outcome)
+        for t in readers:
+            t.join(timeout=1)
+        proc.close()
+    out, err = "".join(out), "".join(err)
+    if check and proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+def stream_command(
+    cmd: List[str],
+    timeout: float,
+    cancel: Optional[threading.Event] = None
+) -> Iterator[str]:
+    # Как run_command, но stdout отдаётся построчно, пока процесс ещё работает.
+    # Ненулевой код выхода — CalledProcessError после последней строки.
+    proc = _Process(cmd, bufsize=1)
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+    err: List[str] = []
+
+    def pump():
+        for line in proc.popen.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    # stderr читаем отдельно, иначе процесс может встать на заполненном пайпе
+    readers = [threading.Thread(target=pump, daemon=True)]
+    readers[0].start()
+    readers.append(proc.read(proc.popen.stderr, err))
+    started = time.monotonic()
+    deadline = started + timeout
+    outcome = "error"
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                outcome = "cancelled"
+                raise Cancelled(f"{cmd[0]} cancelled")
+            if time.monotonic() >= deadline:
+                outcome = "timeout"
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            try:
+                line = lines.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if line is None:
+                break
+            yield line
+        if not proc.exited.wait(max(0.1, deadline - time.monotonic())):
+            outcome = "timeout"
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        outcome = "ok" if proc.returncode == 0 else "failed"
+    finally:
+        # Сюда же попадаем, если потребитель бросил генератор на середине
+        if not proc.exited.is_set():
+            proc.kill()
+        metrics.record_process(_tool(cmd), time.monotonic() - started, proc.rusage, outcome)
+        for t in readers:
+            t.join(timeout=1)
+        proc.close()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, None, "".join(err))
+
+# Spectral отдаёт severity числом (0 error, 1 warn, 2 info, 3 hint) — приводим к нашим уровням
+SPECTRAL_SEVERITY = {0: "high", 1: "medium", 2: "low", 3: "info"}
+
+def format_spectral_issues(raw: List) -> List[Dict]:
+    # Общий формат issue для Spectral и встроенного движка правил (core/rules.py)
+    return [{
+        "code": i.get("code", "SPECTRAL"),
+        "message": i.get("message", "")[:200],
+        "severity": SPECTRAL_SEVERITY.get(i.get("severity", 1), i.get("severity", 1)),
+        "path": ".".join(map(str, i.get("path", []))),
+        "range": i.get("range")
+    } for i in raw if isinstance(i, dict)]
+
+def run_spectral(spec_path: str, cancel: Optional[threading.Event] = None) -> List[Dict]:
     cmd = [
         "spectral", "lint", spec_path,
-        "--ruleset", "@stoplight/spectral-rulesets/owasp-api-security",
+        "--ruleset", SPECTRAL_RULESET,
         "--format", "json"
     ]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=180)
+        result = run_command(cmd, timeout=180, cancel=cancel)
         if result.returncode == 0:
             return json.loads(result.stdout)
         else:
             return [{"code": "SPECTRAL_ERROR", "message": result.stderr[:500], "severity": "high"}]
     except Exception as e:
-        return [{"code": "SPECTRAL_ERR", "message": str(e), "severity": "high"}]
\ No newline at end of file
+        return [{"code": "SPECTRAL_ERR", "message": str(e), "severity": "high"}]
+
+@lru_cache(maxsize=1)
+def spectral_version() -> str:
+    # Версия входит в ключ кэша: обновили Spectral — старые результаты не используем
+    try:
+        return run_command(["spectral", "--version"], timeout=30).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+def run_spectral_cached(
+    spec_data: Any,
+    cancel: Optional[threading.Event] = None,
+    source: Optional[Spec] = None
+) -> Tuple[List[Dict], bool]:
+    # Возвращает (результат, было ли попадание в кэш). Ошибки Spectral не кэшируем.
+    # Файл для Spectral пишем только при промахе; source — исходные байты той же спеки.
+    key = content_hash(spec_data, SPECTRAL_RULESET, spectral_version())
+    cached = spectral_cache.get(key)
+    if cached is not None:
+        return cached, True
+    with (source or Spec(spec_data)).file() as spec_path:
+        res = run_spectral(spec_path, cancel=cancel)
+    if not is_spectral_error(res):
+        spectral_cache.put(key, res)
+    return res, False
+
+def is_spectral_error(res: List) -> bool:
+    return any(isinstance(i, dict) and i.get("code") in ("SPECTRAL_ERROR", "SPECTRAL_ERR") for i in res)
\ No newline at end of file
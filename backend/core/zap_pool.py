@@ -0,0 +1,300 @@
+# backend/core/zap_pool.py
+import os
+import re
+import time
+import uuid
+import fcntl
+import queue
+import signal
+import socket
+import logging
+import secrets
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+import httpx
+from core.config import settings
+from core.utils import Cancelled
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0
+# Сколько процессов uvicorn могут держать свои пулы на одной машине
+MAX_SLOTS = 64
+
+
+class ZapError(Exception):
+    pass
+
+
+class _Daemon:
+    # Один ZAP в режиме -daemon, управляется через локальный REST API.
+    # Домашний каталог (настройки, аддоны) переживает перезапуск демона.
+    def __init__(self, port: int, home: str):
+        self.port = port
+        self.home = home
+        os.makedirs(home, exist_ok=True)
+        api_key = secrets.token_hex(16)
+        self.proc = subprocess.Popen(
+            [
+                "zap.sh", "-daemon", "-silent", "-host", "127.0.0.1", "-port", str(port), "-dir", home,
+                "-config", f"api.key={api_key}",
+                "-config", "api.addrs.addr.name=127.0.0.1",
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        self.client = httpx.Client(
+            base_url=f"http://127.0.0.1:{port}", headers={"X-ZAP-API-Key": api_key}, timeout=30
+        )
+        self.ready = False
+        self.base_rss = 0
+        self.scans = 0
+
+    def api(self, path: str, **params) -> Dict:
+        r = self.client.get(f"/JSON/{path}/", params=params)
+        if r.status_code != 200:
+            raise ZapError(f"ZAP API {path}: HTTP {r.status_code} {r.text[:200]}")
+        return r.json()
+
+    def wait_ready(self, timeout: float, cancel: Optional[threading.Event] = None):
+        # JVM и аддоны грузятся десятки секунд — но только при старте демона, а не на каждый скан
+        if self.ready:
+            return
+        end = time.monotonic() + timeout
+        while True:
+            if self.proc.poll() is not None:
+                raise ZapError(f"ZAP daemon exited with code {self.proc.returncode}")
+            if cancel is not None and cancel.is_set():
+                raise Cancelled("zap cancelled")
+            try:
+                self.api("core/view/version")
+                break
+            except (httpx.HTTPError, ZapError):
+                if time.monotonic() >= end:
+                    raise ZapError(f"ZAP daemon not ready after {timeout}s")
+                time.sleep(1)
+        self.ready = True
+        self.base_rss = self.rss()
+
+    def rss(self) -> int:
+        # zap.sh делает exec java — pid процесса и есть JVM
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def kill(self):
+        try:
+            if self.ready:
+                self.api("core/action/shutdown")
+                self.proc.wait(timeout=10)
+        except Exception:
+            pass
+        if self.proc.poll() is None:
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self.proc.kill()
+            self.proc.wait()
+        self.client.close()
+
+
+class ZapPool:
+    # Пул тёплых ZAP-демонов: скан получает свободный демон, сбрасывает сессию,
+    # заводит свой контекст, гоняет spider + active scan и забирает алерты по мере
+    # появления. Упавший демон заменяется, разросшийся по памяти — перезапускается.
+    # Демоны запускаются при первом скане. Каждый процесс uvicorn занимает свой слот
+    # (flock на home_dir/slot<N>.lock, отпускается со смертью процесса): у слота N
+    # порты base_port + N*size .. + size-1 и свои домашние каталоги.
+    def __init__(self, size: int, base_port: int, home_dir: str, start_timeout: float, max_scans: int, max_rss_growth_mb: int):
+        self.size = size
+        self.base_port = base_port
+        self.home_dir = home_dir
+        self.start_timeout = start_timeout
+        self.max_scans = max_scans
+        self.max_rss_growth = max_rss_growth_mb * 1024 * 1024
+        self._idle: "queue.Queue[_Daemon]" = queue.Queue()
+        self._daemons: List[_Daemon] = []
+        self._lock = threading.Lock()
+        self._failed = False
+        self._slot: Optional[int] = None
+        self._slot_file = None
+        self.recycled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and not self._failed
+
+    def _spawn(self, number: int) -> _Daemon:
+        # number — сквозной номер демона на машине: slot * size + индекс в пуле
+        return _Daemon(self.base_port + number, os.path.join(self.home_dir, f"daemon{number}"))
+
+    @staticmethod
+    def _port_free(port: int) -> bool:
+        with socket.socket() as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError:
+                return False
+        return True
+
+    def _claim_slot(self) -> int:
+        os.makedirs(self.home_dir, exist_ok=True)
+        for slot in range(MAX_SLOTS):
+            f = open(os.path.join(self.home_dir, f"slot{slot}.lock"), "w")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            first = self.base_port + slot * self.size
+            if all(self._port_free(p) for p in range(first, first + self.size)):
+                self._slot, self._slot_file = slot, f
+                return slot
+            # Порты слота занял кто-то посторонний — пробуем следующий
+            f.close()
+        raise OSError(f"no free ZAP port slot in {self.home_dir}")
+
+    def _release_slot(self):
+        if self._slot_file is not None:
+            self._slot_file.close()
+        self._slot, self._slot_file = None, None
+
+    def start(self):
+        # Вызывается первым сканом: JVM не стартует, пока динамика не нужна.
+        # Готовность демона ждём при первом скане на нём
+        with self._lock:
+            if self._daemons or not self.enabled:
+                return
+            try:
+                slot = self._claim_slot()
+                for i in range(self.size):
+                    d = self._spawn(slot * self.size + i)
+                    self._daemons.append(d)
+                    self._idle.put(d)
+            except OSError as e:
+                logger.warning(f"ZAP daemon pool disabled: {e}")
+                self._failed = True
+                for d in self._daemons:
+                    d.kill()
+                self._daemons = []
+                self._release_slot()
+
+    def stop(self):
+        with self._lock:
+            for d in self._daemons:
+                d.kill()
+            self._daemons = []
+            self._idle = queue.Queue()
+            self._release_slot()
+
+    def snapshot(self) -> Dict:
+        return {"daemons": len(self._daemons), "idle": self._idle.qsize(), "recycled": self.recycled, "slot": self._slot}
+
+    def _replace(self, d: _Daemon) -> _Daemon:
+        d.kill()
+        fresh = self._spawn(d.port - self.base_port)
+        with self._lock:
+            self._daemons = [fresh if x is d else x for x in self._daemons]
+        self.recycled += 1
+        return fresh
+
+    def _acquire(self, cancel: Optional[threading.Event]) -> _Daemon:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled("zap cancelled")
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def scan(
+        self,
+        target_url: str,
+        cancel: Optional[threading.Event] = None,
+        timeout: float = 900
+    ) -> Tuple[List[Dict], bool]:
+        # -> (алерты ZAP API, скан завершён). По таймауту сканы останавливаются
+        # и возвращается то, что успели найти.
+        self.start()
+        if not self.enabled:
+            raise ZapError("ZAP daemon pool is disabled")
+        d = self._acquire(cancel)
+        broken = False
+        try:
+            d.wait_ready(self.start_timeout, cancel)
+            return self._scan(d, target_url, cancel, time.monotonic() + timeout)
+        except (httpx.HTTPError, ZapError):
+            broken = True
+            raise
+        finally:
+            d.scans += 1
+            grown = d.ready and d.rss() - d.base_rss > self.max_rss_growth
+            if broken or grown or d.proc.poll() is not None or d.scans >= self.max_scans:
+                d = self._replace(d)
+            self._idle.put(d)
+
+    def _scan(self, d: _Daemon, target_url: str, cancel: Optional[threading.Event], end: float) -> Tuple[List[Dict], bool]:
+        # Новая сессия — чистая база HSQLDB без сайтов и алертов прошлого скана
+        d.api("core/action/newSession", name="", overwrite="true")
+        context = f"scan-{uuid.uuid4().hex[:12]}"
+        context_id = d.api("context/action/newContext", contextName=context)["contextId"]
+        base = target_url.rstrip("/")
+        d.api("context/action/includeInContext", contextName=context, regex=re.escape(base) + ".*")
+        d.api("core/action/accessUrl", url=target_url, followRedirects="true")
+
+        alerts: List[Dict] = []
+
+        def poll_alerts():
+            while True:
+                batch = d.api("core/view/alerts", baseurl=base, start=len(alerts), count=500).get("alerts", [])
+                alerts.extend(batch)
+                if len(batch) < 500:
+                    return
+
+        def wait(component: str, scan_id: str) -> bool:
+            while int(d.api(f"{component}/view/status", scanId=scan_id)["status"]) < 100:
+                if cancel is not None and cancel.is_set():
+                    d.api(f"{component}/action/stop", scanId=scan_id)
+                    raise Cancelled("zap cancelled")
+                if time.monotonic() >= end:
+                    d.api(f"{component}/action/stop", scanId=scan_id)
+                    return False
+                time.sleep(POLL_INTERVAL)
+                poll_alerts()
+            return True
+
+        try:
+            done = wait("spider", d.api("spider/action/scan", url=target_url, contextName=context, recurse="true")["scan"])
+            if done:
+                done = wait("ascan", d.api("ascan/action/scan", url=target_url, contextId=context_id, recurse="true")["scan"])
+            # Пассивный сканер дорабатывает очередь записей уже после active scan
+            while done and int(d.api("pscan/view/recordsToScan")["recordsToScan"]) > 0:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled("zap cancelled")
+                if time.monotonic() >= end:
+                    done = False
+                    break
+                time.sleep(POLL_INTERVAL)
+            poll_alerts()
+            return alerts, done
+        finally:
+            try:
+                d.api("context/action/removeContext", contextName=context)
+            except (httpx.HTTPError, ZapError):
+                pass
+
+
+zap_pool = ZapPool(
+    settings.zap_pool_size,
+    base_port=settings.zap_base_port,
+    home_dir=settings.zap_home_dir,
+    start_timeout=settings.zap_start_timeout,
+    max_scans=settings.zap_max_scans,
+    max_rss_growth_mb=settings.zap_max_rss_growth_mb
+)
@@ -0,0 +1,22 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Тесты запускаются из корня репозитория или из backend/: импорты идут от backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Базы, кэш и плагины — во временном каталоге, не в /tmp/vtb_* рабочего бэкенда.
+# Настройки читаются при импорте core.config, поэтому задаются до импорта тестов.
+_tmp = tempfile.mkdtemp(prefix="vtb-tests-")
+for _name, _value in {
+    "JOBS_DB": os.path.join(_tmp, "jobs.db"),
+    "RATELIMIT_DB": os.path.join(_tmp, "ratelimit.db"),
+    "SCANS_DB": os.path.join(_tmp, "scans.db"),
+    "CACHE_DIR": os.path.join(_tmp, "cache"),
+    "PLUGINS_DIR": os.path.join(_tmp, "plugins"),
+    "ZAP_HOME_DIR": os.path.join(_tmp, "zap"),
+    "ZAP_POOL_SIZE": "0",
+    "MIN_FREE_MEMORY_MB": "0",
+}.items():
+    os.environ.setdefault(_name, _value)
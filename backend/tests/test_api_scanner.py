@@ -0,0 +1,68 @@
+# backend/tests/test_api_scanner.py
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tools.api_scanner import scan_async
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # /admin и /actuator уводят редиректом на страницу 200, /debug — на чужой хост
+    redirects = {
+        "/admin": "/admin/login",
+        "/actuator": "http://{host}/actuator/",
+        "/debug": "http://other.example/debug",
+    }
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.hosts.append(self.headers.get("Host"))
+        if self.path in self.redirects:
+            self.send_response(302)
+            self.send_header("Location", self.redirects[self.path].format(host=self.headers.get("Host")))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path in ("/admin/login", "/actuator/"):
+            body = b"admin console"
+            self.send_response(200)
+        else:
+            body = b"not found"
+            self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_OPTIONS = do_GET
+
+
+def _scan(url, pin_ip=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.hosts = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        issues = asyncio.run(scan_async(url.format(port=server.server_address[1]), pin_ip=pin_ip))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return issues, server.hosts
+
+
+def test_same_host_redirects_are_followed():
+    issues, _ = _scan("http://127.0.0.1:{port}")
+    found = {(i["code"], i.get("endpoint")) for i in issues}
+    assert ("VTB_OPEN_ADMIN", "/admin") in found
+    assert ("VTB_DEBUG_EXPOSED", "/actuator") in found
+    # Редирект на другой хост не проходится
+    assert ("VTB_DEBUG_EXPOSED", "/debug") not in found
+    assert not [i for i in issues if i["code"] == "SCANNER_ERROR"]
+
+
+def test_redirect_hops_stay_pinned():
+    # Имя хоста не резолвится: каждый шаг должен идти на проверенный IP с исходным Host
+    issues, hosts = _scan("http://target.invalid:{port}", pin_ip="127.0.0.1")
+    found = {(i["code"], i.get("endpoint")) for i in issues}
+    assert ("VTB_OPEN_ADMIN", "/admin") in found
+    assert ("VTB_DEBUG_EXPOSED", "/actuator") in found
+    assert hosts and all(h.startswith("target.invalid:") for h in hosts)
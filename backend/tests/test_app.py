@@ -0,0 +1,14 @@
+# backend/tests/test_app.py
+from fastapi.testclient import TestClient
+from app import app
+from core.jobs import job_queue
+from core.plugin_pool import plugin_pool
+
+
+def test_lifespan_starts_and_stops_workers():
+    with TestClient(app) as client:
+        assert client.get("/health").json()["status"] == "ok"
+        assert job_queue._threads
+        assert plugin_pool.snapshot()["workers"] == plugin_pool.size
+    assert job_queue._threads == []
+    assert plugin_pool.snapshot()["workers"] == 0
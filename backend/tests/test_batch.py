@@ -0,0 +1,15 @@
+# backend/tests/test_batch.py
+from bench.specs import spec_bytes
+from core.batch import run_batch, aggregate
+
+
+def test_totals_cover_all_findings():
+    entries = run_batch([("api.json", spec_bytes(120))], {"selected_plugins": []}, workers=1)
+    result = entries[0]["result"]
+    assert result["total"] > len(result["issues"])
+    # Задачи API хранят только result с первыми 50 находками — без полного списка в памяти
+    entries[0].pop("issues")
+    report = aggregate(entries)
+    assert report["issues_total"] == result["total"]
+    assert sum(report["by_code"].values()) == result["total"]
+    assert sum(report["summary"].values()) == result["total"]
@@ -0,0 +1,46 @@
+# backend/tests/test_cache.py
+import os
+import time
+from core import cache
+from core.cache import ResultCache, content_hash
+
+
+def test_content_hash_ignores_formatting_but_not_content():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+    # Части разделены: ("ab", "c") и ("a", "bc") — разные ключи
+    assert content_hash("ab", "c") != content_hash("a", "bc")
+    assert content_hash(b"x", "y") == content_hash("x", "y")
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    c = ResultCache(str(tmp_path), max_bytes=10**6, max_age=60, memory_items=0)
+    c.put("k", {"v": 1})
+    assert c.get("k") == {"v": 1}
+    past = time.time() - 120
+    os.utime(c._path("k"), (past, past))
+    assert c.get("k") is None
+    assert not os.path.exists(c._path("k"))
+
+
+def test_oldest_entries_are_evicted_over_size(tmp_path):
+    c = ResultCache(str(tmp_path), max_bytes=10**6, max_age=3600, memory_items=0)
+    for n in range(3):
+        c.put(f"k{n}", {"v": "x" * 90})
+        # Порядок по mtime должен быть однозначным
+        t = time.time() - 100 + n
+        os.utime(c._path(f"k{n}"), (t, t))
+    # Каждая запись ~100 байт: после четвёртой влезают только две самые свежие
+    c.max_bytes = 250
+    c.put("k3", {"v": "x" * 90})
+    assert [c.get(f"k{n}") is not None for n in range(4)] == [False, False, True, True]
+
+
+def test_put_does_not_scan_directory_each_time(tmp_path, monkeypatch):
+    c = ResultCache(str(tmp_path), max_bytes=10**6, max_age=3600, memory_items=0)
+    scans = []
+    real = os.scandir
+    monkeypatch.setattr(cache.os, "scandir", lambda path: scans.append(path) or real(path))
+    for n in range(50):
+        c.put(f"k{n}", {"v": n})
+    assert len(scans) == 1
@@ -0,0 +1,102 @@
+# backend/tests/test_dns.py
+import socket
+import asyncio
+import pytest
+from core import dns
+from core.dns import Resolver, pinned_url
+from tools import kiterunner
+from tools.postman import generate_postman_collection
+
+RECORDS = {
+    "api.example": ["93.184.216.34", "2606:2800:220:1::"],
+    "rebind.example": ["93.184.216.35", "10.0.0.5"],
+}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        calls.append(host)
+        if host not in RECORDS:
+            raise socket.gaierror(socket.EAI_NONAME, "not found")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (ip, 0)) for ip in RECORDS[host]]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    return calls
+
+
+def test_answers_are_cached_until_ttl(lookups, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns.time, "monotonic", lambda: now[0])
+    r = Resolver(ttl=60, negative_ttl=5, timeout=1)
+
+    assert r.resolve_sync("api.example") == ["2606:2800:220:1::", "93.184.216.34"]
+    assert r.resolve_sync("api.example") == ["2606:2800:220:1::", "93.184.216.34"]
+    assert r.resolve_sync("missing.example") == []
+    assert r.resolve_sync("missing.example") == []
+    assert lookups == ["api.example", "missing.example"]
+    assert (r.hits, r.misses) == (2, 2)
+
+    # Отрицательный ответ живёт negative_ttl, положительный — ttl
+    now[0] += 10
+    r.resolve_sync("missing.example")
+    r.resolve_sync("api.example")
+    assert lookups == ["api.example", "missing.example", "missing.example"]
+    now[0] += 60
+    r.resolve_sync("api.example")
+    assert lookups[-1] == "api.example" and len(lookups) == 4
+
+
+def test_cache_is_bounded(lookups):
+    r = Resolver(ttl=60, negative_ttl=5, timeout=1, max_items=2)
+    for host in ("a.example", "b.example", "a.example", "c.example"):
+        r.resolve_sync(host)
+    assert list(r._cache) == ["a.example", "c.example"]
+
+
+def test_async_and_sync_share_cache(lookups):
+    r = Resolver(ttl=60, negative_ttl=5, timeout=1)
+    assert asyncio.run(r.pin("api.example")) == "93.184.216.34"
+    assert r.pin_sync("api.example") == "93.184.216.34"
+    assert lookups == ["api.example"]
+
+
+def test_pin_rejects_internal_and_literal_addresses(lookups):
+    r = Resolver(ttl=60, negative_ttl=5, timeout=1)
+    # Хоть одна внутренняя запись — хост запрещён целиком
+    assert r.pin_sync("rebind.example") is None
+    assert r.pin_sync("missing.example") is None
+    assert r.pin_sync("localhost") is None
+    assert r.pin_sync("127.0.0.1") is None
+    assert r.pin_sync("[::1]") is None
+    assert r.pin_sync("93.184.216.34") == "93.184.216.34"
+    assert asyncio.run(r.is_blocked("rebind.example")) is True
+    assert r.is_blocked_sync("API.example.") is False
+
+
+def test_pinned_url_keeps_port_and_host():
+    assert pinned_url("https://api.example:8443/v1/users?x=1", "93.184.216.34") == (
+        "https://93.184.216.34:8443/v1/users?x=1", "api.example:8443"
+    )
+    assert pinned_url("http://api.example/", "2606:2800:220:1::") == ("http://[2606:2800:220:1::]/", "api.example")
+
+
+def test_kiterunner_scans_pinned_address(monkeypatch):
+    commands = []
+
+    def stream_command(cmd, **kwargs):
+        commands.append(cmd)
+        return iter([])
+
+    monkeypatch.setattr(kiterunner, "stream_command", stream_command)
+    kiterunner.run_kiterunner("http://api.example:8080/", pin_ip="93.184.216.34")
+    assert commands == [["kiterunner", "scan", "http://93.184.216.34:8080/", "--json", "-H", "Host: api.example:8080"]]
+
+
+def test_newman_collection_uses_pinned_address():
+    item = generate_postman_collection(["http://api.example/v1/users"], pin_ip="93.184.216.34")["item"][0]
+    assert item["name"] == "/v1/users"
+    assert item["request"]["url"]["raw"] == "http://93.184.216.34/v1/users"
+    assert item["request"]["header"] == [{"key": "Host", "value": "api.example"}]
@@ -0,0 +1,85 @@
+# backend/tests/test_fetch.py
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core.dns import resolver
+from core.fetch import SpecFetcher
+from core.ingest import SpecError
+
+SPEC = json.dumps({"openapi": "3.0.3", "info": {"title": "t", "version": "1"}, "paths": {}}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        self.server.hosts.append(self.headers["Host"])
+        port = self.server.server_address[1]
+        redirects = {
+            "/moved": f"http://127.0.0.1:{port}/openapi.json",
+            "/internal": f"http://localhost:{port}/openapi.json",
+            "/loop": "/loop",
+        }
+        if self.path in redirects:
+            self.send_response(302)
+            self.send_header("Location", redirects[self.path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(SPEC)))
+        self.end_headers()
+        self.wfile.write(SPEC)
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    # 127.0.0.1 здесь изображает публичный адрес, localhost — внутренний;
+    # spec.example в настоящем DNS не резолвится — до сервера дойдёт только по закреплённому адресу
+    async def pin(host):
+        return "127.0.0.1" if host in ("127.0.0.1", "spec.example") else None
+
+    monkeypatch.setattr(resolver, "pin", pin)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.paths = []
+    httpd.hosts = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    fetcher = SpecFetcher(str(tmp_path), memory_items=8, timeout=5)
+    yield fetcher, httpd
+    fetcher.stop()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_redirect_is_followed(server):
+    fetcher, httpd = server
+    spec = fetcher.fetch_sync(f"http://127.0.0.1:{httpd.server_address[1]}/moved")
+    assert spec.data["openapi"] == "3.0.3"
+    assert httpd.paths == ["/moved", "/openapi.json"]
+
+
+def test_redirect_to_blocked_host_is_not_fetched(server):
+    fetcher, httpd = server
+    with pytest.raises(SpecError) as e:
+        fetcher.fetch_sync(f"http://127.0.0.1:{httpd.server_address[1]}/internal")
+    assert e.value.status == 403
+    assert httpd.paths == ["/internal"]
+
+
+def test_redirect_loop_is_cut(server):
+    fetcher, httpd = server
+    with pytest.raises(SpecError) as e:
+        fetcher.fetch_sync(f"http://127.0.0.1:{httpd.server_address[1]}/loop")
+    assert e.value.status == 400
+
+
+def test_request_goes_to_pinned_address(server):
+    fetcher, httpd = server
+    port = httpd.server_address[1]
+    spec = fetcher.fetch_sync(f"http://spec.example:{port}/openapi.json")
+    assert spec.data["openapi"] == "3.0.3"
+    assert httpd.hosts == [f"spec.example:{port}"]
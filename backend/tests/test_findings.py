@@ -0,0 +1,36 @@
+# backend/tests/test_findings.py
+from core.findings import FindingIndex
+
+
+def _blocked(plugin):
+    return {"code": "PLUGIN_BLOCKED", "message": "Plugin execution blocked: No analyze() function", "severity": "high", "plugin": plugin}
+
+
+def test_same_error_from_different_plugins_is_kept_apart():
+    index = FindingIndex()
+    index.add([_blocked("a")], "plugin:a", "static")
+    index.add([_blocked("b")], "plugin:b", "static")
+    findings = index.findings()
+    assert sorted(f["plugin"] for f in findings) == ["a", "b"]
+    assert all(f.get("count", 1) == 1 and "tools" not in f for f in findings)
+
+
+def test_same_error_from_one_source_is_merged():
+    index = FindingIndex()
+    index.add([_blocked("a")], "plugin:a", "static")
+    index.add([_blocked("a")], "plugin:a", "static")
+    error = {"code": "SCANNER_ERROR", "message": "timeout", "severity": "info"}
+    index.add([error], "api_scanner", "dynamic")
+    index.add([error], "kiterunner", "dynamic")
+    findings = index.findings()
+    assert [f.get("count", 1) for f in findings] == [2, 1, 1]
+
+
+def test_cross_tool_findings_are_merged():
+    index = FindingIndex()
+    index.add([{"code": "VTB_NO_HSTS", "message": "Нет HSTS", "severity": "medium", "endpoint": "/"}], "api_scanner", "dynamic")
+    index.add([{"code": "ZAP_ALERT", "plugin_id": "10035", "message": "Strict-Transport-Security Header Not Set", "severity": "low"}], "zap", "dynamic")
+    findings = index.findings()
+    assert len(findings) == 1
+    assert findings[0]["tools"] == ["api_scanner", "zap"]
+    assert findings[0]["count"] == 2
@@ -0,0 +1,135 @@
+# backend/tests/test_incremental.py
+import os
+import copy
+import uuid
+import pytest
+from core.config import settings
+from core.ingest import Spec
+from core.plugins import plugin_registry
+from core.pipeline import run_analysis
+from core.incremental import SpecUnits, api_key, incremental_static, reuse_plugins, save_plugins
+
+
+def _spec():
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Shop", "version": "1"},
+        "paths": {
+            "/users": {"get": {"responses": {"200": {"$ref": "#/components/responses/Users"}}}},
+            "/orders": {"get": {"responses": {"200": {"description": "ok"}}}},
+            "/items": {"get": {"responses": {"200": {"description": "ok"}}}},
+        },
+        "components": {
+            "responses": {"Users": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}}},
+            "schemas": {
+                "User": {"properties": {"address": {"$ref": "#/components/schemas/Address"}}},
+                "Address": {"properties": {"city": {"type": "string"}}},
+                "Unused": {"type": "object"},
+            },
+        },
+    }
+
+
+class Linter:
+    # Одна находка на каждый путь и компонент куска спеки; запоминает, что ему дали
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, spec):
+        self.calls.append(spec)
+        found = [{"code": "P", "path": ["paths", p], "message": p} for p in spec.get("paths", {})]
+        for section, items in spec.get("components", {}).items():
+            found += [{"code": "C", "path": ["components", section, n], "message": n} for n in items]
+        return found
+
+
+def test_transitive_ref_change_marks_only_dependent_paths():
+    spec = _spec()
+    before = SpecUnits(spec)
+    spec["components"]["schemas"]["Address"]["properties"]["zip"] = {"type": "string"}
+    after = SpecUnits(spec)
+    changed = {p for p in before.paths if before.paths[p] != after.paths[p]}
+    assert changed == {"/users"}
+    assert before.closure({"c:responses/Users"}) == {"c:responses/Users", "c:schemas/User", "c:schemas/Address"}
+
+
+def test_only_changed_units_are_rechecked():
+    key, lint = uuid.uuid4().hex, Linter()
+    spec = _spec()
+    baseline, stats = incremental_static(spec, key, lint, "test")
+    assert stats["baseline"] is True and len(baseline) == 7
+
+    spec["paths"]["/orders"]["get"]["summary"] = "changed"
+    spec["components"]["schemas"]["Address"]["type"] = "object"
+    issues, stats = incremental_static(spec, key, lint, "test")
+
+    part = lint.calls[-1]
+    assert sorted(part["paths"]) == ["/orders", "/users"]
+    assert sorted(part["components"]["schemas"]) == ["Address", "User"]
+    assert sorted(i["message"] for i in issues) == sorted(i["message"] for i in baseline)
+    assert stats["changed_paths"] == 2 and stats["changed_components"] == 1
+    assert (stats["new"], stats["fixed"], stats["unchanged"]) == (0, 0, 7)
+
+
+def test_removed_path_is_reported_fixed():
+    key, lint = uuid.uuid4().hex, Linter()
+    spec = _spec()
+    incremental_static(spec, key, lint, "test")
+    del spec["paths"]["/items"]
+    issues, stats = incremental_static(spec, key, lint, "test")
+    assert "/items" not in [i["message"] for i in issues]
+    assert stats["fixed"] == 1 and stats["fixed_issues"][0]["message"] == "/items"
+
+
+def test_api_key_uses_title_and_servers():
+    spec = _spec()
+    assert api_key(spec, "https://shop.example") == "https://shop.example"
+    key = api_key(spec, None)
+    assert api_key(copy.deepcopy(spec), None) == key
+    spec["servers"] = [{"url": "https://a.example"}]
+    assert api_key(spec, None) != key
+    spec["info"]["title"] = " "
+    assert api_key(spec, None) is None
+    assert api_key({"info": "x"}, None) is None
+
+
+@pytest.fixture
+def plugin():
+    os.makedirs(settings.plugins_dir, exist_ok=True)
+    path = plugin_registry.path("count_paths")
+
+    def write(source):
+        with open(path, "w") as f:
+            f.write(source)
+        plugin_registry.invalidate("count_paths")
+
+    write("def analyze(spec):\n    return [{'message': str(len(spec['paths']))}]\n")
+    return write
+
+
+def test_plugins_reused_only_for_same_spec_and_code(plugin):
+    key = uuid.uuid4().hex
+    issues = [{"message": "3", "plugin": "count_paths"}]
+    save_plugins(key, "hash1", {"count_paths": issues})
+    assert reuse_plugins(key, "hash1", ["count_paths"]) == ({"count_paths": issues}, [])
+    assert reuse_plugins(key, "hash2", ["count_paths"]) == ({}, ["count_paths"])
+
+    plugin("def analyze(spec):\n    return []\n")
+    assert reuse_plugins(key, "hash1", ["count_paths"]) == ({}, ["count_paths"])
+
+
+def test_blocked_plugin_result_is_not_saved(plugin):
+    key = uuid.uuid4().hex
+    save_plugins(key, "hash1", {"count_paths": [{"code": "PLUGIN_BLOCKED", "message": "timeout"}]})
+    assert reuse_plugins(key, "hash1", ["count_paths"]) == ({}, ["count_paths"])
+
+
+def test_untitled_spec_is_scanned_in_full():
+    spec = _spec()
+    del spec["info"]["title"]
+    result = run_analysis(Spec(spec), incremental=True)
+    assert result["incremental"] == {"skipped": "no target_url and no info.title to match the previous scan"}
+
+    spec["info"]["title"] = "Shop " + uuid.uuid4().hex
+    result = run_analysis(Spec(spec), incremental=True)
+    assert result["incremental"]["baseline"] is True
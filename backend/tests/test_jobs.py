@@ -0,0 +1,30 @@
+# backend/tests/test_jobs.py
+import threading
+import time
+from core.jobs import JobQueue
+
+
+def test_live_lease_is_not_taken_over(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    a, b = JobQueue(db, 1, lease=0.6), JobQueue(db, 1, lease=0.6)
+    job_id = a.submit(None, "http://example.com/openapi.json", {"dynamic_scan": False})
+    assert a._claim()["id"] == job_id
+    assert b._claim() is None
+
+    # Пока владелец продлевает аренду, задачу никто не забирает
+    heartbeat = threading.Thread(target=a._heartbeat, daemon=True)
+    heartbeat.start()
+    time.sleep(1.0)
+    assert b._claim() is None
+
+    # Владелец умер — после истечения аренды задачу берёт другой процесс
+    a._stop.set()
+    heartbeat.join()
+    time.sleep(0.8)
+    assert b._claim()["id"] == job_id
+
+    # Старый владелец не перезаписывает результат нового
+    a._finish(job_id, "done", result={"owner": "a"})
+    assert b.get(job_id)["status"] == "running"
+    b._finish(job_id, "done", result={"owner": "b"})
+    assert b.get(job_id)["result"] == {"owner": "b"}
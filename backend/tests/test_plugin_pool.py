@@ -0,0 +1,75 @@
+# backend/tests/test_plugin_pool.py
+import os
+import json
+import pytest
+from core.config import settings
+from core.plugins import plugin_registry
+from core.plugin_pool import PluginPool
+
+SPEC = {"openapi": "3.0.0", "paths": {"/users": {}, "/orders": {}}}
+
+PLUGINS = {
+    "paths": "def analyze(spec):\n    return [{'message': p} for p in spec['paths']]\n",
+    "spin": "def analyze(spec):\n    while True:\n        pass\n",
+}
+
+
+@pytest.fixture(autouse=True)
+def plugins():
+    os.makedirs(settings.plugins_dir, exist_ok=True)
+    for name, source in PLUGINS.items():
+        with open(plugin_registry.path(name), "w") as f:
+            f.write(source)
+    plugin_registry.invalidate()
+
+
+def _pool(**kwargs):
+    params = {"cpu_limit": 30, "memory_limit_mb": 0, "timeout": 30}
+    params.update(kwargs)
+    return PluginPool(1, **params)
+
+
+def _run(pool, names, spec_bytes=None):
+    return pool.run(names, SPEC, spec_bytes=spec_bytes or json.dumps(SPEC).encode())
+
+
+def test_cpu_limit_blocks_plugin_and_worker_survives():
+    pool = _pool(cpu_limit=1)
+    try:
+        issues = _run(pool, ["spin", "paths"])
+        assert issues[0]["code"] == "PLUGIN_BLOCKED"
+        assert "CPU time limit" in issues[0]["message"]
+        assert [i["message"] for i in issues[1:]] == ["/users", "/orders"]
+        assert pool.snapshot() == {"workers": 1, "idle": 1}
+    finally:
+        pool.stop()
+
+
+def test_wall_clock_timeout_replaces_worker():
+    pool = _pool(timeout=1)
+    try:
+        pool.start()
+        pid = pool._workers[0].proc.pid
+        issues = _run(pool, ["spin"])
+        assert issues[0]["code"] == "PLUGIN_BLOCKED"
+        assert "wall-clock limit" in issues[0]["message"]
+        assert pool._workers[0].proc.pid != pid
+
+        issues = _run(pool, ["paths"])
+        assert [i["message"] for i in issues] == ["/users", "/orders"]
+    finally:
+        pool.stop()
+
+
+def test_spec_parse_error_is_not_cached_in_worker():
+    pool = _pool()
+    try:
+        issues = _run(pool, ["paths", "paths"], spec_bytes=b"[1, 2]")
+        assert [i["code"] for i in issues] == ["PLUGIN_BLOCKED", "PLUGIN_BLOCKED"]
+        assert all("expected an object" in i["message"] for i in issues)
+        assert pool._workers[0].spec_key is None
+
+        issues = _run(pool, ["paths"])
+        assert [i["message"] for i in issues] == ["/users", "/orders"]
+    finally:
+        pool.stop()
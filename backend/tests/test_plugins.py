@@ -0,0 +1,48 @@
+# backend/tests/test_plugins.py
+import copy
+from core.plugins import PluginRegistry
+
+SPEC = {"openapi": "3.0.0", "paths": {"/users": {"get": {"responses": {"200": {"description": "ok"}}}}}}
+
+MUTATING = """
+def analyze(spec):
+    spec._data["paths"].clear()
+    return []
+"""
+
+ASSIGNING = """
+def analyze(spec):
+    spec["paths"]["/admin"] = {}
+    return []
+"""
+
+READING = """
+def analyze(spec):
+    return [{"message": path} for path in spec["paths"]]
+"""
+
+
+def _registry(tmp_path, **plugins):
+    for name, source in plugins.items():
+        (tmp_path / f"{name}.py").write_text(source)
+    return PluginRegistry(str(tmp_path))
+
+
+def test_plugin_cannot_mutate_spec(tmp_path):
+    registry = _registry(tmp_path, mutating=MUTATING, assigning=ASSIGNING, reading=READING)
+    spec = copy.deepcopy(SPEC)
+    issues = registry.run(["mutating", "assigning", "reading"], spec)
+
+    assert spec == SPEC
+    assert [(i["plugin"], i["code"]) for i in issues] == [
+        ("mutating", "PLUGIN_BLOCKED"), ("assigning", "PLUGIN_BLOCKED"), ("reading", "CUSTOM")
+    ]
+    assert "_data" in issues[0]["message"]
+    assert issues[2]["message"] == "/users"
+
+
+def test_private_attributes_are_rejected_at_compile_time(tmp_path):
+    registry = _registry(tmp_path, mutating=MUTATING)
+    plugin = registry.get("mutating")
+    assert plugin.code is None
+    assert "Forbidden attribute access: _data" in str(plugin.error)
@@ -0,0 +1,60 @@
+# backend/tests/test_ratelimit.py
+import os
+import sys
+import sqlite3
+import subprocess
+from core.ratelimit import RateLimiter, Rule
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Клиент в отдельном процессе: N проверок одного bucket-а, печатает число разрешённых
+CLIENT = """
+import sys
+from core.ratelimit import RateLimiter, Rule
+limiter = RateLimiter(sys.argv[1], [Rule("scan", "/api/jobs", 10, 3600)], None, 600, busy_timeout=5)
+print(sum(limiter.check("1.2.3.4", "POST", "/api/jobs")[0] for _ in range(int(sys.argv[2]))))
+"""
+
+
+def _limiter(db_path, **kwargs):
+    return RateLimiter(str(db_path), [Rule("scan", "/api/jobs", 3, 3600, methods=("POST",))], None, 600, **kwargs)
+
+
+def test_bucket_is_shared_between_processes(tmp_path):
+    db_path = str(tmp_path / "rl.db")
+    _limiter(db_path)
+    procs = [
+        subprocess.Popen([sys.executable, "-c", CLIENT, db_path, "8"], cwd=BACKEND, stdout=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    allowed = [int(p.communicate(timeout=60)[0]) for p in procs]
+    assert sum(allowed) == 10
+
+
+def test_busy_database_falls_back_to_process_bucket(tmp_path):
+    db_path = tmp_path / "rl.db"
+    limiter = _limiter(db_path, busy_timeout=0.01)
+    # Другой процесс держит блокировку записи
+    holder = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import sqlite3, sys\n"
+            f"db = sqlite3.connect({str(db_path)!r}, isolation_level=None)\n"
+            "db.execute('BEGIN IMMEDIATE')\n"
+            "print('locked', flush=True)\n"
+            "sys.stdin.read()\n"
+            "db.execute('COMMIT')\n"
+        )],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        results = [limiter.check("1.2.3.4", "POST", "/api/jobs") for _ in range(5)]
+    finally:
+        holder.communicate(timeout=10)
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False, False]
+    assert results[-1][1] > 0
+    # Пока база была занята, в неё ничего не записано
+    with sqlite3.connect(str(db_path)) as db:
+        assert db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0] == 0
+    assert limiter.check("1.2.3.4", "GET", "/api/jobs") == (True, 0.0)
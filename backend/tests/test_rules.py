@@ -0,0 +1,91 @@
+# backend/tests/test_rules.py
+import pytest
+from core.rules import run_native_rules
+
+SPEC = {
+    "openapi": "3.0.3",
+    "info": {"title": "Fixture", "version": "1"},
+    "servers": [{"url": "http://api.example.com", "description": "production"}],
+    "components": {
+        "securitySchemes": {
+            "basic": {"type": "http", "scheme": "basic"},
+            "key": {"type": "apiKey", "in": "query", "name": "api_key"},
+        },
+        "schemas": {
+            "User": {
+                "type": "object",
+                "additionalProperties": True,
+                "properties": {
+                    "name": {"type": "string"},
+                    "tags": {"type": "array", "items": {"type": "string", "maxLength": 10, "format": "x"}},
+                    "age": {"type": "integer", "format": "int32", "minimum": 0, "maximum": 150},
+                },
+            }
+        },
+    },
+    "security": [{"basic": []}],
+    "paths": {
+        "/users/{user_id}": {
+            "parameters": [{"name": "user_id", "in": "path", "required": True, "schema": {"type": "integer", "format": "int64", "minimum": 1, "maximum": 9}}],
+            "get": {
+                "parameters": [{"name": "token", "in": "query", "schema": {"type": "string", "enum": ["a"]}}],
+                "responses": {
+                    "200": {"description": "OK", "content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}}},
+                },
+            },
+            "delete": {
+                "security": [],
+                "responses": {
+                    "204": {"description": "gone"},
+                    "400": {"description": "bad"}, "401": {"description": "no"},
+                    "429": {"description": "slow"}, "500": {"description": "err"},
+                },
+            },
+        }
+    },
+}
+
+
+def _found(spec):
+    return {(i["code"], tuple(i["path"])) for i in run_native_rules(spec)}
+
+
+def test_fixture_findings():
+    found = _found(SPEC)
+    op = ("paths", "/users/{user_id}")
+    expected = {
+        ("owasp:api8:2023-no-server-http", ("servers", 0, "url")),
+        ("owasp:api9:2023-inventory-access", ("servers", 0)),
+        ("owasp:api2:2023-no-http-basic", ("components", "securitySchemes", "basic", "scheme")),
+        ("owasp:api2:2023-no-api-keys-in-url", ("components", "securitySchemes", "key", "in")),
+        ("owasp:api1:2023-no-numeric-ids", op + ("parameters", 0, "schema", "type")),
+        ("owasp:api2:2023-no-credentials-in-url", op + ("get", "parameters", 0, "name")),
+        ("owasp:api2:2023-write-restricted", op + ("delete",)),
+        ("owasp:api4:2023-rate-limit-responses-429", op + ("get", "responses")),
+        ("owasp:api8:2023-define-error-responses-401", op + ("get", "responses")),
+        ("owasp:api4:2023-rate-limit", op + ("get", "responses", "200")),
+        # Схема по $ref проверяется в месте определения
+        ("owasp:api4:2023-string-limit", ("components", "schemas", "User", "properties", "name", "type")),
+        ("owasp:api4:2023-array-limit", ("components", "schemas", "User", "properties", "tags", "type")),
+        ("owasp:api3:2023-no-additionalProperties", ("components", "schemas", "User", "additionalProperties")),
+    }
+    assert expected <= found
+    # Закрытая авторизацией операция и ограниченные схемы — без лишних находок
+    assert ("owasp:api2:2023-read-restricted", op + ("get",)) not in found
+    assert not [f for f in found if f[0] == "owasp:api4:2023-integer-limit"]
+    assert ("owasp:api8:2023-define-error-responses-401", op + ("delete", "responses")) not in found
+
+
+@pytest.mark.parametrize("broken", [
+    {"paths": []},
+    {"paths": "x", "components": []},
+    {"components": {"securitySchemes": [], "schemas": 1}},
+    {"servers": {"url": "http://x"}, "security": {"a": []}},
+    {"paths": {"/a": {"parameters": {"x": 1}, "get": {"security": 1, "responses": []}}}},
+    {"paths": {"/a": {"get": {"responses": {"200": {"headers": [], "content": {"a/b": {"schema": {
+        "type": {"x": 1}, "properties": [], "allOf": 3, "items": "x"}}}}}}}}},
+    None,
+    [],
+])
+def test_malformed_spec_does_not_raise(broken):
+    assert isinstance(run_native_rules(broken), list)
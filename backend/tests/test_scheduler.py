@@ -0,0 +1,152 @@
+# backend/tests/test_scheduler.py
+import os
+import time
+import threading
+import pytest
+from core import scheduler as scheduler_module
+from core.scheduler import Overloaded, Scheduler
+from core.utils import Cancelled
+from tools.kiterunner import run_kiterunner
+
+STUBS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "stubs")
+
+
+class Holder:
+    # Слот планировщика в отдельном потоке: granted — слот выдан, release() — отпустить
+    # (hold=False — отпустить сразу, как выдан)
+    def __init__(self, sched, tool, host, client=None, cancel=None, order=None, name=None, hold=True):
+        self.granted = threading.Event()
+        self._release = threading.Event()
+        if not hold:
+            self._release.set()
+        self.error = None
+
+        def run():
+            try:
+                with sched.slot(tool, host, client, cancel):
+                    if order is not None:
+                        order.append(name)
+                    self.granted.set()
+                    self._release.wait(10)
+            except Exception as e:
+                self.error = e
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def release(self):
+        self._release.set()
+        self.thread.join(5)
+
+
+def _queued(sched, tool, n):
+    deadline = time.monotonic() + 5
+    while sched.snapshot()["queued"][tool] != n:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    value = [None]
+    monkeypatch.setattr(scheduler_module, "available_memory", lambda: value[0])
+    return value
+
+
+def test_per_host_cap_spans_tools(memory):
+    sched = Scheduler({"zap": 4, "kiterunner": 4}, per_host=2, min_free_mb=0)
+    a1 = Holder(sched, "zap", "a")
+    a2 = Holder(sched, "kiterunner", "a")
+    assert a1.granted.wait(2) and a2.granted.wait(2)
+
+    a3 = Holder(sched, "zap", "a")
+    b1 = Holder(sched, "zap", "b")
+    # Заявка на перегруженный хост не держит очередь: b проходит, a ждёт
+    assert b1.granted.wait(2)
+    assert not a3.granted.wait(0.3)
+    assert sched.snapshot()["queued"]["zap"] == 1
+
+    # Слот хоста освободил другой инструмент — заявка zap всё равно получает его
+    a2.release()
+    assert a3.granted.wait(2)
+    for h in (a1, a3, b1):
+        h.release()
+    assert sched.snapshot()["running"] == {"zap": 0, "kiterunner": 0}
+    assert sched.snapshot()["hosts"] == 0
+
+
+def test_clients_are_served_round_robin(memory):
+    sched = Scheduler({"zap": 1}, per_host=0, min_free_mb=0)
+    order = []
+    blocker = Holder(sched, "zap", "h", client="other")
+    assert blocker.granted.wait(2)
+
+    waiters = []
+    for n, client in enumerate(["heavy", "heavy", "heavy", "light"]):
+        waiters.append(Holder(sched, "zap", "h", client=client, order=order, name=f"{client}{n}", hold=False))
+        _queued(sched, "zap", n + 1)
+
+    blocker.release()
+    for w in waiters:
+        w.thread.join(5)
+    assert order == ["heavy0", "light3", "heavy1", "heavy2"]
+
+
+def test_cancel_removes_queued_request(memory):
+    sched = Scheduler({"zap": 1}, per_host=0, min_free_mb=0)
+    blocker = Holder(sched, "zap", "h")
+    assert blocker.granted.wait(2)
+    cancel = threading.Event()
+    waiter = Holder(sched, "zap", "h", cancel=cancel)
+    _queued(sched, "zap", 1)
+    cancel.set()
+    waiter.thread.join(5)
+    assert isinstance(waiter.error, Cancelled)
+    assert sched.snapshot()["queued"]["zap"] == 0
+    blocker.release()
+
+
+def test_memory_pressure_rejects_scans_and_holds_slots(memory):
+    sched = Scheduler({"zap": 2}, per_host=0, min_free_mb=100)
+    memory[0] = 50 * 1024 * 1024
+    with pytest.raises(Overloaded):
+        sched.admit()
+    assert sched.snapshot()["rejected"] == 1
+
+    waiter = Holder(sched, "zap", "h")
+    assert not waiter.granted.wait(0.5)
+    # Память освободилась без release — заявка проходит на периодической перепроверке
+    memory[0] = 500 * 1024 * 1024
+    assert waiter.granted.wait(3)
+    sched.admit()
+    waiter.release()
+
+
+def test_tool_runs_are_capped_per_host(memory, monkeypatch):
+    # Настоящие процессы (заглушка kiterunner из bench/stubs) через слоты, как в пайплайне
+    monkeypatch.setenv("PATH", STUBS + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("BENCH_KITE_PATHS", "3")
+    monkeypatch.setenv("BENCH_LATENCY_KITERUNNER", "0.3")
+    sched = Scheduler({"kiterunner": 4}, per_host=2, min_free_mb=0)
+    lock = threading.Lock()
+    running, peak, found = {"a": 0, "b": 0}, {"a": 0, "b": 0}, []
+
+    def scan(host, client):
+        with sched.slot("kiterunner", host, client):
+            with lock:
+                running[host] += 1
+                peak[host] = max(peak[host], running[host])
+            found.append(len(run_kiterunner(f"http://{host}.example/")))
+            with lock:
+                running[host] -= 1
+
+    threads = [
+        threading.Thread(target=scan, args=(host, f"client{n}"))
+        for n, host in enumerate(["a", "a", "a", "a", "b"])
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(20)
+    assert found == [3] * 5
+    assert peak == {"a": 2, "b": 1}
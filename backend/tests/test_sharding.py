@@ -0,0 +1,108 @@
+# backend/tests/test_sharding.py
+import pytest
+from bench.specs import generate_spec
+from core import sharding
+from core.cache import ResultCache
+from core.config import settings
+from core.sharding import collect_refs, merge_issues, split_spec, lint_spec
+
+
+def _resolve(doc, ref):
+    node = doc
+    for part in ref[2:].split("/"):
+        node = node[part.replace("~1", "/").replace("~0", "~")]
+    return node
+
+
+def test_split_spec_covers_every_path_once_and_is_self_contained():
+    spec = generate_spec(120, ref_depth=3)
+    # Группы путей — по первому сегменту: /res0/..., /res1/...
+    spec["paths"] = {p.replace("/api/v1", ""): item for p, item in spec["paths"].items()}
+    spec["components"]["schemas"]["Orphan"] = {"type": "string"}
+    chunks = split_spec(spec, 4)
+    assert len(chunks) == 4
+    paths = [p for c in chunks for p in c["paths"]]
+    assert sorted(paths) == sorted(spec["paths"])
+    for chunk in chunks:
+        # Все $ref куска разрешаются внутри него, пути и схемы — те же объекты, что в исходной спеке
+        for ref in collect_refs(chunk["paths"]):
+            assert _resolve(chunk, ref) is _resolve(spec, ref)
+        assert chunk["components"]["securitySchemes"] == spec["components"]["securitySchemes"]
+        for path in chunk["paths"]:
+            assert chunk["paths"][path] is spec["paths"][path]
+    # Компонент без ссылок попадает ровно в один кусок
+    assert sum("Orphan" in c.get("components", {}).get("schemas", {}) for c in chunks) == 1
+
+
+def test_split_spec_keeps_path_groups_together():
+    spec = {"paths": {f"/{g}/{n}": {"get": {}} for g in ("users", "accounts", "cards") for n in range(3)}}
+    for chunk in split_spec(spec, 2):
+        groups = {p.split("/")[1] for p in chunk["paths"]}
+        for g in groups:
+            assert all(f"/{g}/{n}" in chunk["paths"] for n in range(3))
+
+
+def test_merge_issues_keeps_original_paths_and_drops_chunk_ranges():
+    issue = {"code": "c", "message": "m", "path": ["components", "schemas", "User"], "range": {"start": {"line": 3}}, "source": "/tmp/chunk1.json"}
+    other = {"code": "c", "message": "m", "path": ["paths", "/a", "get"]}
+    merged = merge_issues([[issue, other], [dict(issue, range={"start": {"line": 9}})], ["junk"]])
+    assert merged == [
+        {"code": "c", "message": "m", "path": ["components", "schemas", "User"]},
+        {"code": "c", "message": "m", "path": ["paths", "/a", "get"]},
+    ]
+    # Исходные issues не изменены
+    assert "range" in issue
+
+
+@pytest.fixture
+def sharded(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "shard_min_operations", 1)
+    monkeypatch.setattr(settings, "lint_workers", 3)
+    monkeypatch.setattr(sharding, "spectral_cache", ResultCache(str(tmp_path), 10**7, 3600))
+    monkeypatch.setattr(sharding, "spectral_version", lambda: "test")
+    calls = []
+
+    def lint(outcome):
+        # outcome(chunk, attempt) -> (issues, hit)
+        def run(chunk, cancel=None):
+            first = sorted(chunk["paths"])[0]
+            calls.append(first)
+            return outcome(first, calls.count(first))
+        monkeypatch.setattr(sharding, "run_spectral_cached", run)
+        return calls
+
+    return lint
+
+
+def _finding(path):
+    return [{"code": "rule", "message": "m", "path": ["paths", path]}]
+
+
+def _error():
+    return [{"code": "SPECTRAL_ERROR", "message": "boom", "severity": "high"}]
+
+
+SPEC = {"paths": {f"/{g}": {"get": {}} for g in ("a", "b", "c")}}
+
+
+def test_failed_shard_is_retried(sharded):
+    calls = sharded(lambda first, n: (_error(), False) if first == "/b" and n == 1 else (_finding(first), False))
+    issues, hit, shards = lint_spec(SPEC)
+    assert (hit, shards) == (False, 3)
+    assert sorted(i["path"][1] for i in issues) == ["/a", "/b", "/c"]
+    assert calls.count("/b") == 2 and calls.count("/a") == 1
+
+
+def test_persistent_shard_failure_fails_the_lint(sharded):
+    sharded(lambda first, n: (_error(), False) if first == "/b" else (_finding(first), False))
+    issues, hit, _ = lint_spec(SPEC)
+    assert issues and all(i["code"] == "SPECTRAL_ERROR" for i in issues)
+    assert not hit
+    # Неудачный результат не кэшируется
+    assert sharding.spectral_cache.get(sharding.content_hash(SPEC, sharding.SPECTRAL_RULESET, "test")) is None
+
+
+def test_all_chunks_cached_is_a_hit(sharded):
+    sharded(lambda first, n: (_finding(first), True))
+    _, hit, shards = lint_spec(SPEC)
+    assert (hit, shards) == (True, 3)
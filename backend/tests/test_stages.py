@@ -0,0 +1,28 @@
+# backend/tests/test_stages.py
+import time
+import threading
+from core.stages import Stage, run_stage_graph
+
+
+def test_outer_cancel_reaches_running_stages():
+    # Стадии без своих таймаутов и долгий дедлайн: отмена не должна ждать дедлайна
+    seen = {}
+
+    def slow(name):
+        def fn(results, cancel):
+            seen[name] = cancel
+            cancel.wait(30)
+            return "finished"
+        return fn
+
+    cancel = threading.Event()
+    stages = [Stage("zap", slow("zap"), on_error=lambda msg: msg), Stage("kiterunner", slow("kiterunner"), on_error=lambda msg: msg)]
+    threading.Timer(0.2, cancel.set).start()
+
+    started = time.monotonic()
+    results = run_stage_graph(stages, deadline=60, cancel=cancel)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2
+    assert results == {"zap": "cancelled", "kiterunner": "cancelled"}
+    assert all(event.is_set() for event in seen.values())
@@ -0,0 +1,91 @@
+# backend/tests/test_store.py
+import pytest
+from core import store
+from core.store import ScanStore
+
+ISSUES = [
+    {"code": "NO_AUTH", "severity": "high", "path": "paths./users.get", "message": "a", "source": "static"},
+    {"code": "NO_AUTH", "severity": "high", "path": "paths./users.post", "message": "b", "source": "static"},
+    {"code": "NO_HSTS", "severity": "medium", "endpoint": "/", "message": "c", "source": "dynamic"},
+    {"code": "KITE_FOUND", "severity": "INFO", "endpoint": "/admin", "message": "d", "source": "dynamic"},
+    {"code": "NO_LIMIT", "severity": "low", "path": "paths./orders.get", "message": "e", "source": "static"},
+]
+
+
+def _save(s, scan_id, issues=ISSUES, spec_hash="h1"):
+    s.save({"id": scan_id, "summary": {}, "issues": issues}, issues, spec_hash, None)
+
+
+def _pages(fetch, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.fixture
+def s(tmp_path):
+    return ScanStore(str(tmp_path / "scans.db"), max_age=0)
+
+
+def test_issue_pages_cover_all_rows_once(s):
+    _save(s, "a")
+    _save(s, "b", ISSUES[:1])
+    items, pages = _pages(lambda **kw: s.issues("a", **kw), 2)
+    assert [i["message"] for i in items] == ["a", "b", "c", "d", "e"]
+    assert pages == 3
+    # Ровно на границе страницы курсора дальше нет
+    assert s.issues("a", limit=5)["next_cursor"] is None
+
+
+def test_issue_filters_apply_across_pages(s):
+    _save(s, "a")
+    items, _ = _pages(lambda **kw: s.issues("a", severity=["HIGH", "info"], **kw), 1)
+    assert [i["message"] for i in items] == ["a", "b", "d"]
+    items, _ = _pages(lambda **kw: s.issues("a", path="paths./users", **kw), 1)
+    assert [i["message"] for i in items] == ["a", "b"]
+    assert [i["message"] for i in s.issues("a", source="dynamic", code="NO_HSTS")["items"]] == ["c"]
+
+
+def test_scan_pages_newest_first(s):
+    for n in range(5):
+        _save(s, f"scan{n}", spec_hash="h1" if n % 2 == 0 else "h2")
+    items, pages = _pages(lambda **kw: s.list_scans(**kw), 2)
+    assert [i["id"] for i in items] == ["scan4", "scan3", "scan2", "scan1", "scan0"]
+    assert pages == 3
+    items, _ = _pages(lambda **kw: s.list_scans(spec_hash="h1", **kw), 1)
+    assert [i["id"] for i in items] == ["scan4", "scan2", "scan0"]
+
+
+def test_summary_group_by(s):
+    _save(s, "a")
+    assert s.summary("a") == {"critical": 0, "high": 2, "medium": 1, "low": 1, "info": 1}
+    assert s.summary("a", "code") == {"NO_AUTH": 2, "NO_HSTS": 1, "KITE_FOUND": 1, "NO_LIMIT": 1}
+    assert s.summary("a", "source") == {"static": 3, "dynamic": 2}
+    assert s.summary("a", "path", path="paths./users") == {"paths./users.get": 1, "paths./users.post": 1}
+    assert s.summary("a", "code", severity=["high"]) == {"NO_AUTH": 2}
+    with pytest.raises(ValueError):
+        s.summary("a", "message")
+
+
+def test_prune_runs_at_most_once_per_interval(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(store.time, "time", lambda: now[0])
+    s = ScanStore(str(tmp_path / "scans.db"), max_age=20)
+
+    def ids():
+        return [i["id"] for i in s.list_scans()["items"]]
+
+    _save(s, "a")
+    now[0] = 1030
+    # «a» уже старше max_age, но с прошлой чистки не прошло PRUNE_INTERVAL
+    _save(s, "b")
+    assert ids() == ["b", "a"]
+    now[0] = 1070
+    _save(s, "c")
+    assert ids() == ["c"]
+    assert s.issues("a")["items"] == [] and s.issues("b")["items"] == []
@@ -0,0 +1,61 @@
+# backend/tests/test_stream.py
+import json
+import time
+import socket
+import threading
+import httpx
+import uvicorn
+import app as backend
+from core.stages import Stage, run_stage_graph
+
+SPEC = json.dumps({"openapi": "3.0.3", "info": {"title": "t", "version": "1"}, "paths": {}}).encode()
+
+
+def _serve():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(backend.app, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        assert thread.is_alive()
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", stop
+
+
+def test_client_disconnect_cancels_running_stages(monkeypatch):
+    stopped = threading.Event()
+
+    def zap(results, cancel):
+        # Долгая стадия без своего таймаута, как ZAP в пайплайне
+        cancel.wait(60)
+        if cancel.is_set():
+            stopped.set()
+        return []
+
+    def run_analysis(spec, target_url, emit=None, cancel=None, **options):
+        run_stage_graph([Stage("zap", zap, on_error=lambda msg: [])], deadline=600, cancel=cancel, on_event=emit)
+        return {"issues": []}
+
+    monkeypatch.setattr(backend, "run_analysis", run_analysis)
+    url, stop = _serve()
+    try:
+        with httpx.Client(timeout=10) as client:
+            with client.stream(
+                "POST", f"{url}/api/analyze-api/stream",
+                files={"openapi_file": ("openapi.json", SPEC, "application/json")}
+            ) as r:
+                assert r.status_code == 200
+                for line in r.iter_lines():
+                    if line.startswith("data:") and '"stage": "zap"' in line:
+                        break
+        # Соединение закрыто посреди стрима: стадия должна получить отмену сразу, а не к дедлайну
+        assert stopped.wait(5)
+    finally:
+        stop()
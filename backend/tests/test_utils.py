@@ -0,0 +1,24 @@
+# backend/tests/test_utils.py
+import sys
+import subprocess
+import pytest
+from core import metrics
+from core.utils import run_command, stream_command
+
+
+def test_run_command_reports_exit_code_and_usage():
+    usage = {"processes": 0, "cpu": 0.0, "max_rss": 0}
+    with metrics.stage_usage(usage):
+        r = run_command([sys.executable, "-c", "import sys; x = bytearray(32 * 2**20); print('ok'); sys.exit(3)"], timeout=30)
+    assert (r.returncode, r.stdout.strip()) == (3, "ok")
+    assert usage["processes"] == 1
+    assert usage["max_rss"] >= 32 * 2**20
+
+
+def test_stream_command_raises_on_failure():
+    lines = []
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        for line in stream_command(["sh", "-c", "echo a; echo b; exit 4"], timeout=30):
+            lines.append(line.strip())
+    assert lines == ["a", "b"]
+    assert e.value.returncode == 4
@@ -0,0 +1,97 @@
+# backend/tests/test_zap_pool.py
+import os
+import random
+import socket
+import httpx
+import pytest
+from core.zap_pool import ZapPool, ZapError
+
+STUBS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "stubs")
+TARGET = "http://target.example/"
+
+
+def _free_base(count: int) -> int:
+    for _ in range(100):
+        base = random.randrange(20000, 60000)
+        if all(ZapPool._port_free(p) for p in range(base, base + count)):
+            return base
+    raise RuntimeError("no free port range")
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    # Демоны — заглушка zap.sh из bench/stubs с минимальным REST API ZAP
+    monkeypatch.setenv("PATH", STUBS + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("BENCH_ZAP_START", "0.1")
+    monkeypatch.setenv("BENCH_LATENCY_ZAP", "0")
+    base = _free_base(8)
+    pools = []
+
+    def make(size=1, max_scans=50):
+        pool = ZapPool(size, base, str(tmp_path), start_timeout=20, max_scans=max_scans, max_rss_growth_mb=1024)
+        pools.append(pool)
+        return pool
+
+    make.base = base
+    yield make
+    for pool in pools:
+        pool.stop()
+
+
+def _ports(pool):
+    return sorted(d.port for d in pool._daemons)
+
+
+def test_processes_claim_separate_slots(make_pool):
+    base = make_pool.base
+    first, second = make_pool(size=2), make_pool(size=2)
+    assert first.scan(TARGET)[1] and second.scan(TARGET)[1]
+    assert (first.snapshot()["slot"], second.snapshot()["slot"]) == (0, 1)
+    assert _ports(first) == [base, base + 1]
+    assert _ports(second) == [base + 2, base + 3]
+
+    # Слот отпускается вместе с пулом и достаётся следующему
+    first.stop()
+    third = make_pool(size=2)
+    third.start()
+    assert third.snapshot()["slot"] == 0
+
+
+def test_slot_with_foreign_port_is_skipped(make_pool):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", make_pool.base + 1))
+        sock.listen()
+        pool = make_pool(size=2)
+        pool.start()
+        assert pool.snapshot()["slot"] == 1
+        assert _ports(pool) == [make_pool.base + 2, make_pool.base + 3]
+
+
+def test_daemon_is_recycled_after_max_scans(make_pool):
+    pool = make_pool(max_scans=2)
+    alerts, done = pool.scan(TARGET)
+    assert done and len(alerts) == 4
+    daemon = pool._daemons[0]
+    pool.scan(TARGET)
+
+    fresh = pool._daemons[0]
+    assert pool.snapshot()["recycled"] == 1
+    assert fresh is not daemon and fresh.port == daemon.port and fresh.home == daemon.home
+    assert daemon.proc.poll() is not None
+    assert pool.scan(TARGET)[1]
+    assert pool.snapshot() == {"daemons": 1, "idle": 1, "recycled": 1, "slot": 0}
+
+
+def test_dead_daemon_is_replaced(make_pool):
+    pool = make_pool()
+    assert pool.scan(TARGET)[1]
+    daemon = pool._daemons[0]
+    daemon.proc.kill()
+    daemon.proc.wait()
+
+    with pytest.raises((httpx.HTTPError, ZapError)):
+        pool.scan(TARGET)
+    assert pool.snapshot()["recycled"] == 1
+    assert pool._daemons[0] is not daemon
+    alerts, done = pool.scan(TARGET)
+    assert done and len(alerts) == 4
@@ -1,91 +1,227 @@
 # backend/tools/api_scanner.py
-import json
+import os
 import sys
-import requests
-from urllib.parse import urljoin
-from typing import List, Dict
+import json
+import asyncio
+import threading
+import httpx
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from typing import List, Dict, Optional
 
-def run_api_scanner(target_url: str) -> Dict[str, List[Dict]]:
-    issues = []
-    session = requests.Session()
-    session.verify = False
-    session.headers.update({"User-Agent": "VTB-Hackathon-Scanner/1.0"})
+# Проверки описаны данными: новая проверка = новая запись, без нового кода.
+#   paths   — пути относительно корня хоста ("" — сам target_url), {path} доступен в message
+#   repeat  — сколько раз подряд дёрнуть путь (проверяется последний ответ)
+#   when    — условия на ответ: status, status_not, body_contains, header_equals, header_missing
+PROBES = [
+    {
+        "code": "VTB_DEFAULT_CREDS", "severity": "critical",
+        "message": "УСПЕШНЫЙ ВХОД test/test — СЛАБЫЕ УЧЁТНЫЕ ДАННЫЕ!",
+        "method": "POST", "paths": ["/auth/login"], "json": {"login": "test", "password": "test"},
+        "timeout": 10, "when": {"status": 200}
+    },
+    {
+        "code": "VTB_OPEN_ADMIN", "severity": "high",
+        "message": "Панель /admin доступна без авторизации",
+        "method": "GET", "paths": ["/admin"],
+        "timeout": 10, "when": {"status": 200, "body_contains": "admin"}
+    },
+    {
+        "code": "VTB_DEBUG_EXPOSED", "severity": "high",
+        "message": "Debug-эндпоинт открыт: {path}",
+        "method": "GET", "paths": ["/debug", "/api/debug", "/_debug", "/healthz", "/metrics", "/actuator", "/env", "/config"],
+        "timeout": 5, "when": {"status": 200}
+    },
+    {
+        "code": "VTB_GRAPHQL_INTROSPECTION", "severity": "high",
+        "message": "GraphQL introspection включён — утечка схемы",
+        "method": "POST", "paths": ["/graphql"], "json": {"query": "{ __schema { types { name } } }"},
+        "timeout": 10, "when": {"status": 200, "body_contains": "__schema"}
+    },
+    {
+        "code": "VTB_CORS_WILDCARD", "severity": "medium",
+        "message": "CORS позволяет любой origin — риск XSS/CSRF",
+        "method": "OPTIONS", "paths": [""], "headers": {"Origin": "https://evil.com"},
+        "timeout": 5, "when": {"header_equals": {"Access-Control-Allow-Origin": "*"}}
+    },
+    {
+        "code": "VTB_NO_RATE_LIMIT", "severity": "medium",
+        "message": "Нет rate limiting — уязвим к DoS",
+        "method": "GET", "paths": [""], "repeat": 6,
+        "timeout": 2, "when": {"status_not": 429}
+    },
+    {
+        "code": "VTB_NO_HSTS", "severity": "medium",
+        "message": "Нет HSTS header — риск MITM",
+        "method": "GET", "paths": [""],
+        "timeout": 5, "when": {"header_missing": "strict-transport-security"}
+    },
+]
 
-    try:
-        # 1. Default creds test:test
-        login_url = urljoin(target_url, "/auth/login")
-        r = session.post(login_url, json={"login": "test", "password": "test"}, timeout=10)
-        if r.status_code == 200:
-            issues.append({
-                "code": "VTB_DEFAULT_CREDS",
-                "message": "УСПЕШНЫЙ ВХОД test/test — СЛАБЫЕ УЧЁТНЫЕ ДАННЫЕ!",
-                "severity": "critical"
-            })
-
-        # 2. Открытый /admin
-        admin = session.get(urljoin(target_url, "/admin"), timeout=10)
-        if admin.status_code == 200 and "admin" in admin.text.lower():
-            issues.append({
-                "code": "VTB_OPEN_ADMIN",
-                "message": "Панель /admin доступна без авторизации",
-                "severity": "high"
-            })
-
-        # 3. Debug эндпоинты
-        debug_paths = ["/debug", "/api/debug", "/_debug", "/healthz", "/metrics", "/actuator", "/env", "/config"]
-        for path in debug_paths:
-            r = session.get(urljoin(target_url, path), timeout=5)
-            if r.status_code == 200:
-                issues.append({
-                    "code": "VTB_DEBUG_EXPOSED",
-                    "message": f"Debug-эндпоинт открыт: {path}",
-                    "severity": "high"
-                })
-
-        # 4. GraphQL introspection
-        gql = session.post(urljoin(target_url, "/graphql"), json={"query": "{ __schema { types { name } } }"}, timeout=10)
-        if gql.status_code == 200 and "__schema" in gql.text:
-            issues.append({
-                "code": "VTB_GRAPHQL_INTROSPECTION",
-                "message": "GraphQL introspection включён — утечка схемы",
-                "severity": "high"
-            })
-
-        # НОВОЕ: 5. CORS misconfig (wildcard origin)
-        root = session.options(target_url, headers={"Origin": "https://evil.com"}, timeout=5)
-        if root.headers.get("Access-Control-Allow-Origin") == "*":
-            issues.append({
-                "code": "VTB_CORS_WILDCARD",
-                "message": "CORS позволяет любой origin — риск XSS/CSRF",
-                "severity": "medium"
-            })
-
-        # 6. No rate limiting (flood check)
-        for _ in range(5):
-            session.get(target_url, timeout=2)
-        r = session.get(target_url, timeout=2)
-        if r.status_code != 429:
-            issues.append({
-                "code": "VTB_NO_RATE_LIMIT",
-                "message": "Нет rate limiting — уязвим к DoS",
-                "severity": "medium"
-            })
-
-        # 7. Missing HSTS
-        r = session.get(target_url, timeout=5)
-        if "strict-transport-security" not in r.headers:
-            issues.append({
-                "code": "VTB_NO_HSTS",
-                "message": "Нет HSTS header — риск MITM",
-                "severity": "medium"
-            })
-
-    except Exception as e:
+
+def load_probes() -> List[Dict]:
+    # Дополнительные проверки можно подложить JSON-файлом (список в формате PROBES)
+    probes = list(PROBES)
+    extra = os.getenv("PROBES_FILE")
+    if extra and os.path.exists(extra):
+        with open(extra, "r", encoding="utf-8") as f:
+            probes.extend(json.load(f))
+    return probes
+
+
+def _matches(when: Dict, r: httpx.Response) -> bool:
+    if "status" in when and r.status_code != when["status"]:
+        return False
+    if "status_not" in when and r.status_code == when["status_not"]:
+        return False
+    if "body_contains" in when and when["body_contains"].lower() not in r.text.lower():
+        return False
+    for name, value in when.get("header_equals", {}).items():
+        if r.headers.get(name) != value:
+            return False
+    if "header_missing" in when and when["header_missing"] in r.headers:
+        return False
+    return True
+
+
+def _pin(url: str, ip: str):
+    # Запрос на заранее проверенный IP: Host и SNI — исходного хоста, DNS повторно не спрашиваем
+    parts = urlsplit(url)
+    netloc = f"[{ip}]" if ":" in ip else ip
+    if parts.port:
+        netloc += f":{parts.port}"
+    return (
+        urlunsplit(parts._replace(netloc=netloc)),
+        {"Host": parts.netloc},
+        {"sni_hostname": parts.hostname}
+    )
+
+
+# Как requests.Session: редиректы проходятся, но только в пределах хоста цели
+MAX_REDIRECTS = 5
+
+
+async def _request(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    kwargs: Dict,
+    headers: Dict,
+    pin_ip: Optional[str] = None
+) -> httpx.Response:
+    # Редирект на другой хост не проходим (это уже не цель скана) — проверяется сам ответ-редирект.
+    # Каждый шаг снова идёт на проверенный IP: DNS для Location не спрашиваем
+    host = urlsplit(url).hostname
+    kwargs = dict(kwargs)
+    for _ in range(MAX_REDIRECTS + 1):
+        request_kwargs = dict(kwargs)
+        request_headers = dict(headers)
+        request_url = url
+        if pin_ip:
+            request_url, host_header, request_kwargs["extensions"] = _pin(url, pin_ip)
+            request_headers.update(host_header)
+        if request_headers:
+            request_kwargs["headers"] = request_headers
+        r = await client.request(method, request_url, **request_kwargs)
+        if not r.has_redirect_location:
+            return r
+        next_url = urljoin(url, r.headers["location"])
+        if urlsplit(next_url).scheme not in ("http", "https") or urlsplit(next_url).hostname != host:
+            return r
+        if r.status_code in (301, 302, 303) and method != "HEAD":
+            # Как в браузере и requests: после 301/302/303 — GET без тела
+            method = "GET"
+            kwargs.pop("json", None)
+        url = next_url
+    return r
+
+
+async def _run_probe(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    target_url: str,
+    probe: Dict,
+    path: str,
+    pin_ip: Optional[str] = None
+) -> Optional[Dict]:
+    url = urljoin(target_url, path)
+    method = probe.get("method", "GET")
+    kwargs = {"timeout": probe.get("timeout", 5)}
+    if "json" in probe:
+        kwargs["json"] = probe["json"]
+    headers = dict(probe.get("headers", {}))
+
+    repeat = probe.get("repeat", 1)
+    if repeat > 1:
+        # Флуд — параллельно, проверяем ответ на запрос, отправленный после него
+        async def hit():
+            async with sem:
+                return await _request(client, method, url, kwargs, headers, pin_ip)
+        await asyncio.gather(*(hit() for _ in range(repeat - 1)))
+    async with sem:
+        r = await _request(client, method, url, kwargs, headers, pin_ip)
+
+    if not _matches(probe.get("when", {}), r):
+        return None
+    return {
+        "code": probe["code"],
+        "message": probe["message"].format(path=path or "/"),
+        "severity": probe.get("severity", "info"),
+        "endpoint": path or "/",
+        "method": probe.get("method", "GET")
+    }
+
+
+async def scan_async(
+    target_url: str,
+    concurrency: int = 8,
+    cancel: Optional[threading.Event] = None,
+    pin_ip: Optional[str] = None
+) -> List[Dict]:
+    probes = load_probes()
+    # Один keep-alive пул на весь скан; concurrency — сколько запросов одновременно к хосту
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        verify=False, limits=limits, headers={"User-Agent": "VTB-Hackathon-Scanner/1.0"}
+    ) as client:
+        sem = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.ensure_future(_run_probe(client, sem, target_url, probe, path, pin_ip))
+            for probe in probes for path in probe.get("paths", [""])
+        ]
+        done = asyncio.gather(*tasks, return_exceptions=True)
+        if cancel is not None:
+            while not done.done():
+                await asyncio.wait([done], timeout=0.5)
+                if cancel.is_set():
+                    done.cancel()
+                    raise asyncio.CancelledError("api_scanner cancelled")
+        results = await done
+
+    issues = [r for r in results if isinstance(r, dict)]
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
         issues.append({
             "code": "SCANNER_ERROR",
-            "message": f"Ошибка сканирования: {str(e)}",
+            "message": f"Ошибка сканирования ({len(errors)} из {len(results)} проверок): {errors[0]!r}"[:500],
             "severity": "info"
         })
+    return issues
+
+
+def run_api_scanner(
+    target_url: str,
+    cancel: Optional[threading.Event] = None,
+    concurrency: int = 8,
+    pin_ip: Optional[str] = None
+) -> Dict[str, List[Dict]]:
+    try:
+        issues = asyncio.run(scan_async(target_url, concurrency=concurrency, cancel=cancel, pin_ip=pin_ip))
+    except (Exception, asyncio.CancelledError) as e:
+        issues = [{
+            "code": "SCANNER_ERROR",
+            "message": f"Ошибка сканирования: {str(e) or type(e).__name__}",
+            "severity": "info"
+        }]
 
     result = {"issues": issues}
     print(json.dumps(result))
@@ -95,4 +231,4 @@ if __name__ == "__main__":
     if len(sys.argv) != 2:
         print(json.dumps({"error": "Usage: python api_scanner.py <url>"}))
         sys.exit(1)
-    run_api_scanner(sys.argv[1])
\ No newline at end of file
+    run_api_scanner(sys.argv[1])
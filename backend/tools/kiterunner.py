@@ -1,20 +1,61 @@
-import subprocess
 import json
-from typing import List, Dict
+import threading
+import subprocess
+from typing import Callable, Iterator, List, Dict, Optional
+from core.utils import stream_command
+from core.dns import pinned_url
+
+def _endpoints(doc) -> Iterator[Dict]:
+    # Строка JSON-вывода: либо один найденный путь, либо весь отчёт {"endpoints": [...]}
+    if not isinstance(doc, dict):
+        return
+    if isinstance(doc.get("endpoints"), list):
+        for ep in doc["endpoints"]:
+            yield from _endpoints(ep)
+    elif doc.get("path"):
+        yield {"path": doc["path"], "method": doc.get("method", "GET")}
+
+def iter_kiterunner(
+    target_url: str,
+    cancel: Optional[threading.Event] = None,
+    pin_ip: Optional[str] = None
+) -> Iterator[Dict]:
+    # Пути отдаются по мере появления в выводе, не дожидаясь конца перебора.
+    # pin_ip — перебор идёт на проверенный IP с заголовком Host, kiterunner не резолвит имя сам
+    url, headers = target_url, []
+    if pin_ip:
+        url, host = pinned_url(target_url, pin_ip)
+        headers = ["-H", f"Host: {host}"]
+    rest = []
+    for line in stream_command(["kiterunner", "scan", url, "--json", *headers], timeout=600, cancel=cancel):
+        try:
+            doc = json.loads(line)
+        except ValueError:
+            # Многострочный (отформатированный) отчёт — разбираем целиком в конце
+            rest.append(line)
+            continue
+        yield from _endpoints(doc)
+    if "".join(rest).strip():
+        yield from _endpoints(json.loads("".join(rest)))
 
-def run_kiterunner(target_url: str) -> List[Dict]:
+def run_kiterunner(
+    target_url: str,
+    cancel: Optional[threading.Event] = None,
+    on_endpoint: Optional[Callable[[Dict], None]] = None,
+    pin_ip: Optional[str] = None
+) -> List[Dict]:
+    # on_endpoint(ep) вызывается на каждый найденный путь — им пайплайн кормит Newman
+    issues = []
     try:
-        result = subprocess.run(
-            ["kiterunner", "scan", target_url, "--json"],
-            capture_output=True, text=True, timeout=600
-        )
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            return [
-                {"code": "KITE_FOUND", "message": f"Found: {ep['path']}", "severity": "info"}
-                for ep in data.get("endpoints", [])
-            ]
-        else:
-            return [{"code": "KITE_ERROR", "message": result.stderr[:200], "severity": "high"}]
+        for ep in iter_kiterunner(target_url, cancel=cancel, pin_ip=pin_ip):
+            if on_endpoint is not None:
+                on_endpoint(ep)
+            issues.append({
+                "code": "KITE_FOUND", "message": f"Found: {ep['path']}", "severity": "info",
+                "endpoint": ep["path"], "method": ep["method"]
+            })
+    except subprocess.CalledProcessError as e:
+        issues.append({"code": "KITE_ERROR", "message": (e.stderr or "")[:200], "severity": "high"})
     except Exception as e:
-        return [{"code": "KITE_EX", "message": str(e), "severity": "high"}]
\ No newline at end of file
+        issues.append({"code": "KITE_EX", "message": str(e), "severity": "high"})
+    return issues
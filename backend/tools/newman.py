@@ -1,22 +1,113 @@
-import subprocess
 import json
 import uuid
 import os
-from typing import Dict
+import time
+import queue
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, ContextManager, Dict, List, Optional
+from tenacity import Retrying, retry_if_result, stop_after_attempt, wait_exponential
+from core import metrics
+from core.utils import run_command
 from .postman import generate_postman_collection
 
-def run_newman(collection_path: str) -> Dict:
+def run_newman(collection_path: str, cancel: Optional[threading.Event] = None, pinned: bool = False) -> Dict:
+    # Упавшие проверки — failures; сбой самого newman (нет отчёта, исключение) — ещё и error.
+    # pinned — коллекция ходит на проверенный IP: редирект увёл бы на имя, которое newman
+    # резолвит сам, а сертификат выписан на имя, не на IP (как verify=False у api_scanner)
     report = f"/tmp/newman_{uuid.uuid4().hex}.json"
     try:
-        subprocess.run(
-            ["newman", "run", collection_path, "--reporters", "json", "--reporter-json-export", report],
-            timeout=600, check=True
+        # Ненулевой код выхода — это и проваленные проверки, поэтому смотрим на отчёт, а не на код
+        result = run_command(
+            ["newman", "run", collection_path, "--reporters", "json", "--reporter-json-export", report]
+            + (["--ignore-redirects", "--insecure"] if pinned else []),
+            timeout=600, cancel=cancel
         )
         if os.path.exists(report):
             with open(report) as f:
                 data = json.load(f)
-            os.unlink(report)
             return {"failures": data.get("run", {}).get("failures", [])}
+        if result.returncode != 0:
+            message = (result.stderr or f"newman exited with code {result.returncode}")[:200]
+            return {"failures": [{"error": {"message": message}}], "error": message}
         return {"failures": []}
     except Exception as e:
-        return {"failures": [{"error": {"message": str(e)}}]}
\ No newline at end of file
+        return {"failures": [{"error": {"message": str(e)}}], "error": str(e)}
+    finally:
+        if os.path.exists(report):
+            os.unlink(report)
+
+def _run_batch(
+    endpoints: List[str],
+    cancel: Optional[threading.Event],
+    attempts: int,
+    slot: Callable[[], ContextManager],
+    pin_ip: Optional[str] = None
+) -> List[Dict]:
+    coll_path = f"/tmp/coll_{uuid.uuid4().hex}.json"
+    with open(coll_path, "w") as f:
+        json.dump(generate_postman_collection(endpoints, pin_ip=pin_ip), f)
+    # Сбой newman повторяем только для этой пачки; проваленные проверки — не сбой
+    retrying = Retrying(
+        stop=stop_after_attempt(max(1, attempts)),
+        wait=wait_exponential(multiplier=1, max=10),
+        retry=retry_if_result(lambda res: "error" in res and not (cancel is not None and cancel.is_set())),
+        sleep=cancel.wait if cancel is not None else time.sleep,
+        retry_error_callback=lambda state: state.outcome.result()
+    )
+    try:
+        with slot():
+            return retrying(run_newman, coll_path, cancel=cancel, pinned=bool(pin_ip)).get("failures", [])
+    finally:
+        os.unlink(coll_path)
+
+def run_newman_stream(
+    endpoints: "queue.Queue[Optional[str]]",
+    cancel: Optional[threading.Event] = None,
+    batch_size: int = 25,
+    workers: int = 4,
+    batch_wait: float = 2.0,
+    attempts: int = 3,
+    slot: Optional[Callable[[], ContextManager]] = None,
+    pin_ip: Optional[str] = None
+) -> List[Dict]:
+    # Читает URL из очереди, пока поиск путей ещё идёт (None — поиск закончен),
+    # и гоняет Newman по пачкам до batch_size путей в workers процессах параллельно.
+    # Неполная пачка отправляется, если новых путей нет дольше batch_wait секунд.
+    # attempts — попыток на пачку при сбое самого newman; slot() — допуск планировщика на каждую пачку;
+    # pin_ip — проверенный IP цели (запросы коллекции идут на него).
+    slot = slot or contextlib.nullcontext
+    seen = set()
+    batch: List[str] = []
+    futures = []
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="newman")
+
+    def flush():
+        if batch:
+            futures.append(metrics.submit(pool, _run_batch, list(batch), cancel, attempts, slot, pin_ip))
+            batch.clear()
+
+    try:
+        last = time.monotonic()
+        while cancel is None or not cancel.is_set():
+            try:
+                url = endpoints.get(timeout=0.5)
+            except queue.Empty:
+                if batch and time.monotonic() - last >= batch_wait:
+                    flush()
+                continue
+            if url is None:
+                break
+            if url in seen:
+                continue
+            seen.add(url)
+            batch.append(url)
+            last = time.monotonic()
+            if len(batch) >= batch_size:
+                flush()
+        if cancel is None or not cancel.is_set():
+            flush()
+        return [fail for f in futures for fail in f.result()]
+    finally:
+        pool.shutdown(wait=False)
@@ -1,18 +1,25 @@
 # backend/tools/postman.py
 from urllib.parse import urlparse, urlunparse
-from typing import List
+from typing import List, Optional
+from core.dns import pinned_url
 
-def generate_postman_collection(endpoints: List[str]) -> dict:
+def generate_postman_collection(endpoints: List[str], pin_ip: Optional[str] = None) -> dict:
     items = []
     for ep in endpoints:
         parsed = urlparse(ep)
         if ".." in parsed.path or parsed.path.startswith("/etc") or parsed.path.startswith("/proc"):
             continue
+        header = []
+        if pin_ip:
+            # Запрос на проверенный IP, Host — исходного хоста
+            ep, host = pinned_url(ep, pin_ip)
+            header.append({"key": "Host", "value": host})
+            parsed = urlparse(ep)
         items.append({
             "name": parsed.path or "/",
             "request": {
                 "method": "GET",
-                "header": [],
+                "header": header,
                 "url": {
                     "raw": ep,
                     "protocol": parsed.scheme,
@@ -1,25 +1,59 @@
-import subprocess
 import json
 import uuid
 import os
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
+from core.utils import run_command
+from core.zap_pool import zap_pool
 
-def run_zap_scan(target_url: str) -> List[Dict]:
+# Риск в ZAP API — High/Medium/Low/Informational, последний у нас info
+RISK_SEVERITY = {"informational": "info"}
+
+def _alert_issues(alerts: List[Dict]) -> List[Dict]:
+    # ZAP API отдаёт алерт на каждый экземпляр (URL) — сворачиваем по pluginId, как в отчёте
+    grouped: Dict[str, Dict] = {}
+    for a in alerts:
+        key = a.get("pluginId") or a.get("alert")
+        if key in grouped:
+            grouped[key]["instances"] += 1
+            continue
+        risk = a.get("risk", "Informational")
+        grouped[key] = {
+            "code": f"ZAP_{risk}", "message": a.get("alert", ""),
+            "severity": RISK_SEVERITY.get(risk.lower(), risk.lower()),
+            "plugin_id": a.get("pluginId"), "instances": 1
+        }
+    return list(grouped.values())
+
+def _quick_scan(target_url: str, cancel: Optional[threading.Event]) -> List[Dict]:
+    # Холодный запуск zap.sh на каждый скан — если пул демонов выключен
     report = f"/tmp/zap_{uuid.uuid4().hex}.json"
+    run_command(
+        ["zap.sh", "-cmd", "-quickurl", target_url, "-quickout", report],
+        timeout=900, cancel=cancel, check=True
+    )
+    if os.path.exists(report):
+        with open(report) as f:
+            data = json.load(f)
+        os.unlink(report)
+        alerts = data.get("site", [{}])[0].get("alerts", [])
+        return [
+            {
+                "code": f"ZAP_{a['risk']}", "message": a['alert'], "severity": a['risk'].lower(),
+                "plugin_id": a.get("pluginid"), "instances": len(a.get("instances", []))
+            }
+            for a in alerts
+        ]
+    return [{"code": "ZAP_NO_REPORT", "message": "No report", "severity": "high"}]
+
+def run_zap_scan(target_url: str, cancel: Optional[threading.Event] = None) -> List[Dict]:
     try:
-        subprocess.run(
-            ["zap.sh", "-cmd", "-quickurl", target_url, "-quickout", report],
-            timeout=900, check=True
-        )
-        if os.path.exists(report):
-            with open(report) as f:
-                data = json.load(f)
-            os.unlink(report)
-            alerts = data.get("site", [{}])[0].get("alerts", [])
-            return [
-                {"code": f"ZAP_{a['risk']}", "message": a['alert'], "severity": a['risk'].lower()}
-                for a in alerts
-            ]
-        return [{"code": "ZAP_NO_REPORT", "message": "No report", "severity": "high"}]
+        if not zap_pool.enabled:
+            return _quick_scan(target_url, cancel)
+        alerts, done = zap_pool.scan(target_url, cancel=cancel, timeout=900)
+        issues = _alert_issues(alerts)
+        if not done:
+            issues.append({"code": "ZAP_PARTIAL", "message": "Scan stopped at timeout, results are partial", "severity": "info"})
+        return issues
     except Exception as e:
-        return [{"code": "ZAP_EX", "message": str(e), "severity": "high"}]
\ No newline at end of file
+        return [{"code": "ZAP_EX", "message": str(e), "severity": "high"}]